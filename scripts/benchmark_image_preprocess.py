@@ -0,0 +1,92 @@
+"""
+Reports vision payload size and latency before/after server-side image preprocessing.
+
+Usage: python scripts/benchmark_image_preprocess.py [photo.jpg ...] [--model MODEL] [--latency 0.0]
+Without arguments it synthesizes a 12MP phone-style JPEG (with an EXIF rotation) to test with.
+Upload latency is measured against the local stub OpenRouter server.
+"""
+import os
+import io
+import sys
+import json
+import time
+import base64
+import argparse
+import numpy as np
+from PIL import Image
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.image_preprocess import get_profile, preprocess_image, to_data_url
+from src.api.upstream import UpstreamClient
+from src.utils.stub_upstreams import start_stub_server
+
+
+def synthetic_photo(width=4000, height=3000, seed=0):
+    """Leafy-green noise at high JPEG quality, roughly the byte size of a real phone photo."""
+    rng = np.random.default_rng(seed)
+    base = np.zeros((height, width, 3), dtype=np.uint8)
+    base[..., 1] = np.linspace(60, 200, width, dtype=np.uint8)[None, :]
+    noise = rng.integers(0, 90, size=(height, width, 3), dtype=np.uint8)
+    img = Image.fromarray(base + noise)
+    exif = img.getexif()
+    exif[0x0112] = 6  # rotated 90° like a portrait phone shot
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=95, exif=exif)
+    return buf.getvalue()
+
+
+def _payload(data_url):
+    return {"model": "stub", "messages": [{"role": "user", "content": [
+        {"type": "text", "text": "Diagnose this leaf"},
+        {"type": "image_url", "image_url": {"url": data_url}}]}]}
+
+
+def _post_seconds(client, data_url, repeat=3):
+    body = json.dumps(_payload(data_url))
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.post("/chat/completions", data=body, headers={"Content-Type": "application/json"})
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*")
+    parser.add_argument("--model", default="qwen/qwen2.5-vl-32b-instruct")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub upstream latency (s)")
+    args = parser.parse_args()
+
+    samples = [(path, open(path, "rb").read()) for path in args.images] or [("synthetic-12MP", synthetic_photo())]
+    profile = get_profile(args.model)
+    server, url = start_stub_server(latency=args.latency)
+    client = UpstreamClient("stub", url + "/api/v1")
+
+    print(f"📷 Profile for {args.model}: max_side={profile.max_side} {profile.format} <= {profile.max_bytes} bytes")
+    for name, raw in samples:
+        start = time.perf_counter()
+        raw_url = f"data:image/jpeg;base64,{base64.b64encode(raw).decode('utf-8')}"
+        raw_encode_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        buf, mimetype, info = preprocess_image(io.BytesIO(raw), profile)
+        small_url = to_data_url(buf, mimetype)
+        prep_s = time.perf_counter() - start
+
+        raw_post_s, raw_body = _post_seconds(client, raw_url)
+        small_post_s, small_body = _post_seconds(client, small_url)
+
+        print(f"\n{name}: {info['original_size']} -> {info['output_size']}")
+        print(f"   image bytes    {info['original_bytes']:>12,} -> {info['output_bytes']:>10,}")
+        print(f"   JSON payload   {raw_body:>12,} -> {small_body:>10,}")
+        print(f"   encode+prep    {raw_encode_s * 1e3:>10.1f}ms -> {prep_s * 1e3:>8.1f}ms")
+        print(f"   upload (stub)  {raw_post_s * 1e3:>10.1f}ms -> {small_post_s * 1e3:>8.1f}ms")
+        print(f"   total          {(raw_encode_s + raw_post_s) * 1e3:>10.1f}ms -> {(prep_s + small_post_s) * 1e3:>8.1f}ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares the LightGBM path (LGBMRegressor.predict) against the exported NumPy tree predictor.
+
+Usage: python scripts/benchmark_predictor.py [--rows 10000] [--repeat 200]
+Run from the project root after the pipeline has produced models/best_model.joblib.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import joblib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.transform import load_transformer, TRANSFORMER_PATH
+from src.models.tree_predictor import export_tree_tables, load_tree_model, MODEL_PATH
+
+DATA_PATH = "data/processed/clean_data.csv"
+ENCODER_PATH = "models/encoders.joblib"
+
+
+def _time_per_call(fn, repeat):
+    fn()  # warmup
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def _make_batch(X, n_rows, seed=42):
+    """Resamples real rows with +/-5% numeric jitter to build a large batch."""
+    rng = np.random.default_rng(seed)
+    batch = X[rng.integers(0, len(X), n_rows)].copy()
+    batch[:, :9] *= rng.uniform(0.95, 1.05, size=(n_rows, 9)).astype(np.float32)
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_PATH)
+    transformer = load_transformer(TRANSFORMER_PATH, ENCODER_PATH, n_features=model.n_features_in_)
+    X = transformer.transform_frame(pd.read_csv(DATA_PATH))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = os.path.join(tmp, "model.npz")
+        start = time.perf_counter()
+        export_tree_tables(model, npz_path)
+        export_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predictor = load_tree_model(npz_path)
+        load_s = time.perf_counter() - start
+
+        batch = _make_batch(X, args.rows)
+        max_diff = float(np.max(np.abs(model.predict(batch) - predictor.predict(batch))))
+
+        row = X[:1]
+        results = {
+            "single_row_lightgbm_ms": _time_per_call(lambda: model.predict(row), args.repeat) * 1e3,
+            "single_row_numpy_ms": _time_per_call(lambda: predictor.predict(row), args.repeat) * 1e3,
+            f"batch_{args.rows}_lightgbm_ms": _time_per_call(lambda: model.predict(batch), 5) * 1e3,
+            f"batch_{args.rows}_numpy_ms": _time_per_call(lambda: predictor.predict(batch), 5) * 1e3,
+        }
+
+    print(f"🌳 {predictor.n_trees} trees, max depth {predictor.max_depth}")
+    print(f"   export {export_s * 1e3:.1f} ms, mmap load {load_s * 1e3:.2f} ms")
+    print(f"   max |lightgbm - numpy| on {args.rows} rows: {max_diff:.3e}")
+    for name, ms in results.items():
+        print(f"   {name:<28} {ms:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Real-time factor, memory footprint and word/character error rate of CPU Whisper configurations.
+
+Usage: python scripts/benchmark_whisper.py [--sizes tiny,base,small] [--quantize none,int8] [--threads 4]
+       [--fixtures scripts/whisper_fixtures] [--synthesize] [--json results.json]
+Clips and reference transcripts are listed in <fixtures>/manifest.json (English, Hindi, Tamil).
+--synthesize generates missing clips with ElevenLabs (ELEVENLABS_API_KEY), using the app's voices.
+Every configuration runs in a fresh process so memory numbers don't leak between them.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing as mp
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.transcription import decode_audio, SAMPLE_RATE
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "whisper_fixtures")
+TTS_MODEL_ID = "eleven_multilingual_v2"
+
+
+def load_manifest(fixtures_dir):
+    with open(os.path.join(fixtures_dir, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def synthesize_missing(fixtures_dir, manifest):
+    """Creates any missing clip from its reference text with ElevenLabs."""
+    from src.api.upstream import get_client
+    key = os.getenv("ELEVENLABS_API_KEY")
+    if not key:
+        raise SystemExit("--synthesize needs ELEVENLABS_API_KEY")
+    client = get_client("elevenlabs")
+    for clip in manifest["clips"]:
+        path = os.path.join(fixtures_dir, clip["file"])
+        if os.path.exists(path):
+            continue
+        voice = manifest["voices"][clip["language"]]
+        r = client.post(f"/text-to-speech/{voice}", json={"text": clip["text"], "model_id": TTS_MODEL_ID},
+                        headers={"xi-api-key": key, "Content-Type": "application/json"})
+        r.raise_for_status()
+        with open(path, "wb") as f:
+            f.write(r.content)
+        print(f"🔊 Synthesized {clip['file']}")
+
+
+def edit_distance(ref, hyp):
+    """Levenshtein distance between two token sequences."""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def _memory_mb():
+    """(current RSS, peak RSS) of this process in MB."""
+    status = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                status[key] = value.strip()
+        return int(status["VmRSS"].split()[0]) / 1024, int(status["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+        return peak, peak
+
+
+def run_config(size, quantize, threads, clips, download_root=None):
+    """Runs in a fresh process: load one configuration, transcribe every clip once after a warmup."""
+    from src.api.whisper_model import load_whisper_model, set_torch_threads
+    set_torch_threads(threads)
+    import numpy as np
+    from whisper.normalizers import BasicTextNormalizer, EnglishTextNormalizer
+
+    start = time.perf_counter()
+    model = load_whisper_model(size, quantize=quantize, download_root=download_root)
+    load_seconds = time.perf_counter() - start
+    rss_loaded, _ = _memory_mb()
+    model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), language="en", fp16=False)
+
+    normalizers = {"en": EnglishTextNormalizer()}
+    results = []
+    for clip in clips:
+        with open(clip["path"], "rb") as f:
+            audio = decode_audio(f.read())
+        start = time.perf_counter()
+        text = model.transcribe(audio, language=clip["language"], fp16=False)["text"]
+        seconds = time.perf_counter() - start
+        normalize = normalizers.get(clip["language"]) or BasicTextNormalizer()
+        ref, hyp = normalize(clip["text"]), normalize(text)
+        results.append({
+            "id": clip["id"], "language": clip["language"], "text": text.strip(),
+            "audio_seconds": len(audio) / SAMPLE_RATE, "seconds": seconds,
+            "word_errors": edit_distance(ref.split(), hyp.split()), "words": len(ref.split()),
+            "char_errors": edit_distance(ref.replace(" ", ""), hyp.replace(" ", "")),
+            "chars": len(ref.replace(" ", "")),
+        })
+    _, rss_peak = _memory_mb()
+    return {"size": size, "quantize": quantize, "threads": threads, "load_seconds": load_seconds,
+            "rss_mb": rss_loaded, "peak_rss_mb": rss_peak, "clips": results}
+
+
+def summarize(run):
+    """Overall RTF and per-language WER/CER (errors over reference words/chars, pooled over clips)."""
+    clips = run["clips"]
+    by_lang = defaultdict(list)
+    for clip in clips:
+        by_lang[clip["language"]].append(clip)
+    summary = {k: run[k] for k in ("size", "quantize", "threads", "load_seconds", "rss_mb", "peak_rss_mb")}
+    summary["rtf"] = sum(c["seconds"] for c in clips) / sum(c["audio_seconds"] for c in clips)
+    for lang, group in sorted(by_lang.items()):
+        summary[f"wer_{lang}"] = sum(c["word_errors"] for c in group) / max(1, sum(c["words"] for c in group))
+        summary[f"cer_{lang}"] = sum(c["char_errors"] for c in group) / max(1, sum(c["chars"] for c in group))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="tiny,base,small")
+    parser.add_argument("--quantize", default="none,int8")
+    parser.add_argument("--threads", default=str(os.cpu_count() or 1), help="comma-separated intra-op thread counts")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--languages", default=None, help="e.g. hi,ta (default: every clip)")
+    parser.add_argument("--synthesize", action="store_true", help="create missing clips with ElevenLabs")
+    parser.add_argument("--download-root", default=None)
+    parser.add_argument("--json", default=None, help="also write the full results here")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.fixtures)
+    if args.synthesize:
+        synthesize_missing(args.fixtures, manifest)
+    languages = set(args.languages.split(",")) if args.languages else None
+    clips = [{**clip, "path": os.path.join(args.fixtures, clip["file"])} for clip in manifest["clips"]
+             if languages is None or clip["language"] in languages]
+    missing = [clip["file"] for clip in clips if not os.path.exists(clip["path"])]
+    if missing:
+        raise SystemExit(f"Missing fixture clips: {', '.join(missing)} (record them or pass --synthesize)")
+
+    configs = list(itertools.product(args.sizes.split(","), args.quantize.split(","),
+                                     [int(t) for t in args.threads.split(",")]))
+    ctx = mp.get_context("spawn")
+    runs = []
+    for size, quantize, threads in configs:
+        print(f"🎙️ {size} / {quantize} / {threads} thread(s)...")
+        with ctx.Pool(1) as pool:
+            runs.append(pool.apply(run_config, (size, quantize, threads, clips, args.download_root)))
+
+    summaries = [summarize(run) for run in runs]
+    metric_cols = [k for k in summaries[0] if k.startswith(("wer_", "cer_"))]
+    header = f"{'size':<8}{'quant':<6}{'thr':>4}{'load s':>8}{'RSS MB':>8}{'peak MB':>9}{'RTF':>7}"
+    print("\n" + header + "".join(f"{col:>9}" for col in metric_cols))
+    for s in summaries:
+        print(f"{s['size']:<8}{s['quantize']:<6}{s['threads']:>4}{s['load_seconds']:>8.2f}{s['rss_mb']:>8.0f}"
+              f"{s['peak_rss_mb']:>9.0f}{s['rtf']:>7.3f}" + "".join(f"{s[col]:>9.1%}" for col in metric_cols))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summaries, "runs": runs}, f, indent=2, ensure_ascii=False)
+        print(f"\n📝 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+#!/usr/bin/env bash
+# Runs the benchmark suite (src/benchmarks) and compares it against the saved baseline.
+#
+#   scripts/run_experiments.sh                        # everything
+#   SUITES=micro,load scripts/run_experiments.sh      # skip the (slow) pipeline sizes
+#   scripts/run_experiments.sh --sizes 1000,10000     # extra flags go to `run`
+#   UPDATE_BASELINE=1 scripts/run_experiments.sh      # accept this run as the new baseline
+#
+# Exits non-zero when a metric regressed by more than THRESHOLD (default 0.10).
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+SUITES=${SUITES:-micro,load,pipeline}
+RESULTS_DIR=${RESULTS_DIR:-data/benchmarks}
+BASELINE=${BASELINE:-$RESULTS_DIR/baseline.json}
+THRESHOLD=${THRESHOLD:-0.10}
+OUT="$RESULTS_DIR/results-$(date +%Y%m%d-%H%M%S).json"
+
+python src/benchmarks/run.py run --suites "$SUITES" --out "$OUT" "$@"
+
+if [[ ! -f "$BASELINE" || "${UPDATE_BASELINE:-0}" == "1" ]]; then
+    cp "$OUT" "$BASELINE"
+    echo "📌 Baseline set to $OUT"
+    exit 0
+fi
+python src/benchmarks/run.py compare "$BASELINE" "$OUT" --threshold "$THRESHOLD"
@@ -1,65 +1,320 @@
+import io
 import os
 import sys
-import io
-import joblib
+import hmac
+import json
+import time
 import base64
-import tempfile
+import threading
+from contextlib import ExitStack
 import pandas as pd
 import numpy as np
-import requests
-import whisper
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # --- CONFIGURATION ---
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 load_dotenv()
 
+from src.features.transform import CAT_COLS, NUMERIC_INPUT_COLS, REQUIRED_INPUT_COLS
+from src.models.registry import list_versions
+from src.models.forecast import load_forecast
+from src.api.model_loader import LazyComponent
+from src.api.model_manager import ModelManager
+from src.api.transcription import TranscriptionPool, TranscriptionBusy, TranscriptionTimeout
+from src.api.upstream import get_client, upstream_settings, UpstreamBusy
+from src.api.tts_cache import TTSCache, tts_cache_key
+from src.api.response_cache import ResponseCache, FlightTimeout, vision_cache_key
+from src.api.image_preprocess import get_profile, preprocess_image, sha256_stream, to_data_url
+from src.utils import telemetry
+
 # API Keys
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://127.0.0.1:5000")
+PORT = int(os.getenv("PORT", "5000"))
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # This sets BASE_DIR to the root '/app' folder
 
-MODEL_PATH = os.path.join(BASE_DIR, "models", "best_model.joblib")
-ENCODER_PATH = os.path.join(BASE_DIR, "models", "encoders.joblib")
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+ENCODER_PATH = os.path.join(MODELS_DIR, "encoders.joblib")
+# Versioned registry (src/models/registry.py); without one the flat files in models/ are served
+REGISTRY_DIR = os.path.join(MODELS_DIR, "registry")
+# Next-day forecasts precomputed by the pipeline's forecast stage (src/models/forecast.py)
+FORECAST_PATH = os.path.join(MODELS_DIR, "forecast.npz")
 print("Success")
 
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "5000"))
+
+# Model loading: components listed here start loading in the background at boot,
+# anything else loads on first use. Requests wait at most *_WAIT_SECONDS for a component.
+PRELOAD_COMPONENTS = [c.strip() for c in os.getenv("PRELOAD_COMPONENTS", "price_model,whisper").split(",") if c.strip()]
+PRICE_MODEL_WAIT_SECONDS = float(os.getenv("PRICE_MODEL_WAIT_SECONDS", "10"))
+WHISPER_WAIT_SECONDS = float(os.getenv("WHISPER_WAIT_SECONDS", "120"))
+# Size ("tiny", "base", "small", ...) or a checkpoint path (python src/api/whisper_model.py base models/whisper/base-fp16.pt)
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+# "none": fp32 as shipped; "int8": dynamic int8 Linear layers (opt-in, not yet validated: compare
+# accuracy and latency on your hardware with scripts/benchmark_whisper.py before enabling it).
+WHISPER_QUANTIZE = os.getenv("WHISPER_QUANTIZE", "none")
+WHISPER_DOWNLOAD_ROOT = os.getenv("WHISPER_DOWNLOAD_ROOT") or None
+
+# Model hot-swap: the registry's CURRENT pointer is polled every MODEL_POLL_SECONDS (0 = only
+# /admin/reload). Admin endpoints need the X-Admin-Token header and are off when ADMIN_TOKEN is unset.
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "10"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Optional candidate version scored alongside production on /predict
+SHADOW_VERSION = os.getenv("SHADOW_VERSION")
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH", os.path.join(BASE_DIR, "data", "cache", "shadow", "predictions.jsonl"))
+
+# Speech-to-text worker pool (each worker process holds its own Whisper model)
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+TRANSCRIBE_THREADS = int(os.getenv("TRANSCRIBE_THREADS", "0")) or None  # torch intra-op threads, default: cpu_count // workers
+TRANSCRIBE_INTEROP_THREADS = int(os.getenv("TRANSCRIBE_INTEROP_THREADS", "1"))
+TRANSCRIBE_MAX_QUEUE = int(os.getenv("TRANSCRIBE_MAX_QUEUE", "4"))
+TRANSCRIBE_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIBE_TIMEOUT_SECONDS", "60"))
+
+# Text-to-speech audio cache (memory LRU + disk), keyed on (text, language, voice, model)
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, "data", "cache", "tts"))
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "512"))
+TTS_STREAM_CHUNK_BYTES = 16 * 1024
+
+# Vision model + response cache (retries of the same photo/question are answered once)
+VISION_MODEL = os.getenv("VISION_MODEL", "qwen/qwen2.5-vl-32b-instruct")
+VISION_CACHE_TTL_SECONDS = float(os.getenv("VISION_CACHE_TTL_SECONDS", "3600"))
+VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "512"))
+# Longest a coalesced request waits on the call it joined (a read timeout per upstream attempt), then 504
+_OPENROUTER = upstream_settings("openrouter")
+VISION_CACHE_WAIT_SECONDS = float(os.getenv("VISION_CACHE_WAIT_SECONDS",
+                                            _OPENROUTER["read_timeout"] * (_OPENROUTER["max_retries"] + 1)))
+DEFAULT_VISION_PROMPT = "Analyze this crop image. Diagnose any diseases and suggest treatments."
+
+# Instrumentation: one JSON timing line per request (REQUEST_LOG=0 turns it off; /metrics stays on)
+REQUEST_LOG = os.getenv("REQUEST_LOG", "1").lower() not in ("0", "false", "no")
+UNLOGGED_ENDPOINTS = {"/metrics", "/healthz", "/readyz"}
+# Written by run_pipeline.py after each run; appended to /metrics
+PIPELINE_METRICS_PATH = os.getenv("PIPELINE_METRICS_PATH", os.path.join(BASE_DIR, "data", "metrics", "pipeline.prom"))
+
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# --- LOAD MODELS ---
-print("⏳ Loading KsetrikahGPT Brain...")
-try:
-    # 1. Load ML Price Model
-    if os.path.exists(MODEL_PATH) and os.path.exists(ENCODER_PATH):
-        print("📦 Loading ML models...")
-        print("MODEL PATH:", MODEL_PATH, "exists:", os.path.exists(MODEL_PATH))
-        print("ENCODER PATH:", ENCODER_PATH, "exists:", os.path.exists(ENCODER_PATH))
-
-        model = joblib.load(MODEL_PATH)
-        encoders = joblib.load(ENCODER_PATH)
-
-        print("✅ Models loaded successfully")
-    else:
-        print("⚠️ Warning: Price models not found. Prediction will fail.")
-        model, encoders = None, None
-
-    # 2. Load Whisper (Speech-to-Text)
+def load_model_manager():
+    # Model, transformer and feature store of one version, swapped together
+    manager = ModelManager(REGISTRY_DIR, MODELS_DIR, ENCODER_PATH, poll_seconds=MODEL_POLL_SECONDS,
+                           shadow_log=SHADOW_LOG_PATH).load_initial()
+    if SHADOW_VERSION:
+        try:
+            manager.set_shadow(SHADOW_VERSION)
+        except Exception as e:
+            print(f"⚠️ Shadow model {SHADOW_VERSION} not loaded: {e}")
+    return manager
+
+def load_whisper():
+    # Whisper/torch live only in the worker processes, never in the Flask process
     # Note: Requires 'ffmpeg' installed on the system
-    print("⏳ Loading Whisper Model (this may take a moment)...")
-    whisper_model = whisper.load_model("base")
-    print("✅ Whisper Model Ready.")
+    return TranscriptionPool(model_size=WHISPER_MODEL_SIZE, workers=TRANSCRIBE_WORKERS,
+                             threads_per_worker=TRANSCRIBE_THREADS, max_queue=TRANSCRIBE_MAX_QUEUE,
+                             timeout=TRANSCRIBE_TIMEOUT_SECONDS, quantize=WHISPER_QUANTIZE,
+                             interop_threads=TRANSCRIBE_INTEROP_THREADS, download_root=WHISPER_DOWNLOAD_ROOT)
+
+# --- LOAD MODELS ---
+# Each component loads independently; warmups trigger one-time setup (lazy init, page faults on mmaps).
+# (the price model's warmup runs inside load_bundle, so hot-swapped versions get it too)
+price_model = LazyComponent("price_model", load_model_manager)
+whisper_component = LazyComponent("whisper", load_whisper, warmup=lambda pool: pool.warmup())
+COMPONENTS = {c.name: c for c in (price_model, whisper_component)}
+# Components that must be up before /readyz reports ready (Whisper keeps loading behind them)
+READY_REQUIRES = ["price_model"]
+
+# Transcription workers are spawned processes that re-import this file as __mp_main__;
+# they must not start loading (and spawning) components themselves.
+if __name__ != "__mp_main__":
+    print("⏳ Loading KsetrikahGPT Brain in the background...")
+    for name in PRELOAD_COMPONENTS:
+        if name in COMPONENTS:
+            COMPONENTS[name].start()
+
+tts_cache = TTSCache(TTS_CACHE_DIR, int(TTS_CACHE_MEMORY_MB * 2**20), int(TTS_CACHE_DISK_MB * 2**20))
+vision_cache = ResponseCache(max_entries=VISION_CACHE_MAX_ENTRIES, ttl=VISION_CACHE_TTL_SECONDS,
+                             wait_timeout=VISION_CACHE_WAIT_SECONDS)
+
+# --- INSTRUMENTATION ---
+# Each request gets a trace (request ID from X-Request-ID or a fresh one) that the handlers' spans
+# land on. It's closed when the response is, i.e. after the last byte of a streamed body.
+HTTP_SECONDS = telemetry.REGISTRY.histogram("http_request_duration_seconds",
+                                            "Request latency until the response body is fully sent.",
+                                            ("method", "endpoint"))
+HTTP_REQUESTS = telemetry.REGISTRY.counter("http_requests_total", "Finished requests.", ("method", "endpoint", "status"))
+HTTP_IN_FLIGHT = telemetry.REGISTRY.gauge("http_requests_in_flight", "Requests being handled or streamed.", ("endpoint",))
+
+def _queue_seconds(header):
+    """Time since a proxy stamped X-Request-Start (t=<unix time in s, ms or us>), if it's sane."""
+    try:
+        started = float(header.strip().removeprefix("t="))
+    except ValueError:
+        return None
+    while started > 1e11:
+        started /= 1000
+    waited = time.time() - started
+    return waited if 0 <= waited < 3600 else None
+
+@app.before_request
+def start_request_trace():
+    g.trace = telemetry.start_trace(request.headers.get("X-Request-ID", "")[:128] or None)
+    g.endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_IN_FLIGHT.inc(g.endpoint)
+    if "X-Request-Start" in request.headers:
+        waited = _queue_seconds(request.headers["X-Request-Start"])
+        if waited is not None:
+            telemetry.record("http.queue", waited)
+
+@app.after_request
+def finish_request_trace(response):
+    trace = g.get("trace")
+    if trace is None:
+        return response
+    response.headers["X-Request-ID"] = trace.request_id
+    method, endpoint, path = request.method, g.endpoint, request.path
+    cache = {"cache": response.headers["X-Cache"]} if "X-Cache" in response.headers else {}
+
+    def on_close():
+        seconds = trace.elapsed()
+        HTTP_SECONDS.observe(seconds, method, endpoint)
+        HTTP_REQUESTS.inc(method, endpoint, response.status_code)
+        HTTP_IN_FLIGHT.dec(endpoint)
+        if REQUEST_LOG and endpoint not in UNLOGGED_ENDPOINTS:
+            telemetry.log_event("request", request_id=trace.request_id, method=method, path=path,
+                                status=response.status_code, duration_ms=round(seconds * 1000, 3),
+                                spans=trace.span_ms(), **cache)
+        telemetry.end_trace()
+
+    response.call_on_close(on_close)
+    return response
+
+# Scrape-time views of the counters the subsystems already keep (no per-request cost)
+def _pool_stats():
+    pool = whisper_component.value
+    return pool.stats() if pool else {}
+
+def _by_key(stats, keys):
+    return {(key,): stats[key] for key in keys if key in stats}
 
-except Exception as e:
-    import traceback
-    print(f"❌ Critical Error Loading Models: {e}")
-    traceback.print_exc()
-    model, encoders, whisper_model = None, None, None
+def _model_info():
+    manager = price_model.value
+    bundle = manager.current if manager else None
+    return {(bundle.version,): 1} if bundle else None
+
+telemetry.REGISTRY.gauge("transcription_in_flight", "Transcription jobs running or queued.",
+                         fn=lambda: _pool_stats().get("in_flight"))
+telemetry.REGISTRY.gauge("transcription_queue_depth", "Transcription jobs waiting for a worker.",
+                         fn=lambda: _pool_stats().get("queue_depth"))
+telemetry.REGISTRY.counter("transcription_jobs_total", "Transcription jobs by outcome.", ("outcome",),
+                           fn=lambda: _by_key(_pool_stats(), ("completed", "failed", "rejected", "timeouts")))
+telemetry.REGISTRY.counter("tts_cache_lookups_total", "TTS cache lookups by result.", ("result",),
+                           fn=lambda: _by_key(tts_cache.stats(), ("memory_hits", "disk_hits", "misses")))
+telemetry.REGISTRY.gauge("tts_cache_bytes", "TTS cache size per tier.", ("tier",),
+                         fn=lambda: {("memory",): tts_cache.memory.size, ("disk",): tts_cache.disk.size})
+telemetry.REGISTRY.counter("vision_cache_lookups_total", "Vision cache lookups by result.", ("result",),
+                           fn=lambda: _by_key(vision_cache.stats(), ("hits", "misses", "coalesced", "errors", "timeouts")))
+telemetry.REGISTRY.gauge("vision_cache_in_flight", "Upstream vision calls in progress.",
+                         fn=lambda: vision_cache.stats()["in_flight"])
+telemetry.REGISTRY.gauge("model_info", "Serving model version.", ("version",), fn=_model_info)
+
+def get_model_manager():
+    return price_model.get(timeout=PRICE_MODEL_WAIT_SECONDS)
+
+def get_model_bundle():
+    # Read once per request: a concurrent hot-swap can't mix two versions in one prediction
+    manager = get_model_manager()
+    return manager.current if manager else None
+
+# Forecast table, re-mapped whenever the pipeline replaces the file (one stat() per request)
+_forecast_lock = threading.Lock()
+_forecast_table = None
+
+def get_forecast():
+    global _forecast_table
+    try:
+        st = os.stat(FORECAST_PATH)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    table = _forecast_table
+    if table is None or table.stamp != stamp:
+        with _forecast_lock:
+            if _forecast_table is None or _forecast_table.stamp != stamp:
+                try:
+                    _forecast_table = load_forecast(FORECAST_PATH)
+                except Exception as e:
+                    print(f"⚠️ Could not load forecast table: {e}")
+            table = _forecast_table
+    return table
+
+# Fields a /predict request can have and still be answered from the forecast table
+FORECAST_KEY_FIELDS = {"Commodity_Group", "Commodity", "Variety"}
+
+def _forecast_for(record, bundle):
+    """(prediction, last price) from the forecast table if it was scored by this exact model and snapshot."""
+    if not record.keys() <= FORECAST_KEY_FIELDS:
+        return None
+    table = get_forecast()
+    if table is None or table.model_version != bundle.version or bundle.store is None \
+            or table.as_of != bundle.store.as_of:
+        return None
+    i = table.lookup(record.get("Commodity"), record.get("Variety"))
+    if i is None:
+        return None
+    return float(table.predicted[i]), float(table.last_price[i])
+
+# Per-thread preallocated feature row for /predict
+_row_buffers = threading.local()
+
+def _feature_row(transformer):
+    buf = getattr(_row_buffers, 'row', None)
+    if buf is None or buf.shape[1] != transformer.n_features:
+        buf = _row_buffers.row = transformer.empty(1)
+    return buf
+
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return jsonify({"status": "ok"})
+
+@app.route('/stats')
+def stats():
+    """Runtime counters for the heavier subsystems."""
+    pool = whisper_component.value
+    manager = price_model.value
+    bundle = manager.current if manager else None
+    store = bundle.store if bundle else None
+    forecast = get_forecast()
+    return jsonify({"transcription": pool.stats() if pool else None, "tts_cache": tts_cache.stats(),
+                    "vision_cache": vision_cache.stats(), "feature_store": store.stats() if store else None,
+                    "model_version": bundle.version if bundle else None,
+                    "forecast": forecast.info() if forecast else None})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: this process's metrics plus the last pipeline run's stage timings."""
+    body = telemetry.REGISTRY.render()
+    try:
+        with open(PIPELINE_METRICS_PATH) as f:
+            body += f.read()
+    except OSError:
+        pass
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route('/readyz')
+def readyz():
+    """Readiness with per-component state; ready once the price path can serve."""
+    components = {name: c.status() for name, c in COMPONENTS.items()}
+    ready = all(COMPONENTS[name].ready for name in READY_REQUIRES)
+    return jsonify({"ready": ready, "components": components}), 200 if ready else 503
 
 
 # --- THE FRONTEND (Updated with AI Assistant UI) ---
@@ -69,100 +324,399 @@ def home():
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    if not model or not encoders:
-        return jsonify({"error": "Model not loaded"}), 500
+    manager = get_model_manager()
+    bundle = manager.current if manager else None
+    if bundle is None:
+        return jsonify({"error": "Model not loaded"}), 503
     try:
-        data = request.json
-        input_data = {
-            'MSP': [data['MSP']], 'Price_1DayAgo': [data['Price_1DayAgo']],
-            'Price_2DaysAgo': [data['Price_2DaysAgo']], 'Arrival_Today': [data['Arrival_Today']],
-            'Arrival_1DayAgo': [data['Arrival_1DayAgo']], 'Arrival_2DaysAgo': [data['Arrival_2DaysAgo']]
-        }
-        df = pd.DataFrame(input_data)
-        
-        # Features
-        df['msp_premium'] = df['Price_1DayAgo'] - df['MSP']
-        df['price_momentum'] = (df['Price_1DayAgo'] - df['Price_2DaysAgo']) / (df['Price_2DaysAgo'] + 1e-9)
-        df['price_volatility'] = df[['Price_1DayAgo', 'Price_2DaysAgo']].std(axis=1).fillna(0)
-
-        # Encoders
-        cat_cols = ['Commodity_Group', 'Commodity', 'Variety']
-        for col in cat_cols:
-            raw_val = data.get(col, "Unknown")
-            if col in encoders:
-                le = encoders[col]
-                df[f'{col}_Encoded'] = le.transform([raw_val]) if raw_val in le.classes_ else 0
-            else:
-                df[f'{col}_Encoded'] = 0
-
-        pred = model.predict(df)[0]
-        trend = "UP" if pred > data['Price_1DayAgo'] else "DOWN"
-        return jsonify({"predicted_price_tomorrow": round(float(pred), 2), "trend": trend})
+        start = time.perf_counter()
+        with telemetry.span("predict.parse"):
+            raw = data = request.json
+        # Plain Commodity + Variety requests are already scored in the forecast table;
+        # only what-if inputs need the model
+        with telemetry.span("predict.forecast_lookup"):
+            cached = _forecast_for(raw, bundle)
+        if cached is not None:
+            pred, last_price = cached
+        else:
+            with telemetry.span("predict.features"):
+                if bundle.store is not None:
+                    # Fields the client sent win; everything else comes from the latest history
+                    data = bundle.store.fill(data)
+                missing = [col for col in REQUIRED_INPUT_COLS if data.get(col) is None]
+                if missing:
+                    return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
+
+                X = _feature_row(bundle.transformer)
+                bundle.transformer.transform_row(data, out=X[0])
+            with telemetry.span("predict.model"):
+                pred = float(bundle.model.predict(X)[0])
+            last_price = float(data['Price_1DayAgo'])
+        shadow = manager.shadow
+        if shadow is not None:
+            shadow.submit(dict(raw), bundle.version, pred, time.perf_counter() - start,
+                          bundle.store.as_of if bundle.store is not None else None)
+        trend = "UP" if pred > last_price else "DOWN"
+        return jsonify({"predicted_price_tomorrow": round(pred, 2), "trend": trend, "model_version": bundle.version})
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
-@app.route('/assistant/analyze', methods=['POST'])
-def assistant_analyze():
-    # 1. Handle Voice Input (Whisper)
-    prompt = request.form.get('prompt', '').strip()
-    language = request.form.get('language', 'en')
-    
-    if 'audio' in request.files and whisper_model:
-        audio_file = request.files['audio']
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-            audio_path = tmp.name
-            audio_file.save(audio_path)
+def _read_batch_rows():
+    """Accepts a JSON array (or {"rows": [...]}) or a CSV upload shaped like clean_data.csv."""
+    if 'file' in request.files:
+        return pd.read_csv(request.files['file'])
+    rows = request.get_json(silent=True)
+    if isinstance(rows, dict):
+        rows = rows.get('rows')
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError("Expected a JSON array of row objects or a CSV upload in 'file'")
+    return pd.DataFrame.from_records(rows)
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    bundle = get_model_bundle()
+    if bundle is None:
+        return jsonify({"error": "Model not loaded"}), 503
+    try:
+        df = _read_batch_rows()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    if len(df) > MAX_BATCH_ROWS:
+        return jsonify({"error": f"Batch too large: {len(df)} rows (max {MAX_BATCH_ROWS})"}), 413
+
+    df = df.reset_index(drop=True)
+    if bundle.store is not None:
+        df = bundle.store.fill_frame(df)
+    for col in NUMERIC_INPUT_COLS:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    # Validate every row in one pass: unparsable values and missing required prices
+    raw = df[NUMERIC_INPUT_COLS]
+    numeric = raw.apply(pd.to_numeric, errors='coerce')
+    bad_values = numeric.isna() & raw.notna()
+    bad_values[REQUIRED_INPUT_COLS] |= numeric[REQUIRED_INPUT_COLS].isna()
+    row_ok = ~bad_values.any(axis=1)
+    df[NUMERIC_INPUT_COLS] = numeric
+
+    preds = np.full(len(df), np.nan)
+    if row_ok.any():
         try:
-            result = whisper_model.transcribe(audio_path, language=language if language != 'en' else None)
-            prompt = result['text']
+            preds[row_ok.to_numpy()] = bundle.model.predict(bundle.transformer.transform_frame(df[row_ok]))
         except Exception as e:
-            print(f"Whisper Error: {e}")
-        finally:
-            if os.path.exists(audio_path): os.remove(audio_path)
+            return jsonify({"error": str(e)}), 400
 
-    # 2. Handle Image
-    if 'image' not in request.files:
-        return jsonify({"error": "Please upload an image for the Agronomist to analyze."}), 400
-    
-    image = request.files['image']
-    image_bytes = image.read()
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+    results = []
+    price_1 = df['Price_1DayAgo'].to_numpy()
+    labels = {col: df[col].astype(object).where(df[col].notna(), None).tolist() if col in df.columns
+              else [None] * len(df) for col in CAT_COLS}
+    for i, ok in enumerate(row_ok.to_numpy()):
+        row = {"row": i}
+        row.update({col: labels[col][i] for col in CAT_COLS if labels[col][i] is not None})
+        if ok:
+            pred = float(preds[i])
+            row["predicted_price_tomorrow"] = round(pred, 2)
+            row["trend"] = "UP" if pred > price_1[i] else "DOWN"
+        else:
+            cols = bad_values.columns[bad_values.iloc[i].to_numpy()]
+            row["error"] = "Missing or non-numeric: " + ", ".join(cols)
+        results.append(row)
 
-    # 3. Call Vision Model
-    if not prompt: prompt = "Analyze this crop image. Diagnose any diseases and suggest treatments."
-    
-    headers = {
+    return jsonify({"count": len(results), "failed": int((~row_ok).sum()), "results": results,
+                    "model_version": bundle.version})
+
+@app.route('/forecast')
+def forecast():
+    """
+    Precomputed next-day prices for the latest report. ?commodity=&variety= returns one variety;
+    ?group= and/or ?commodity= alone return every matching variety; no filters return all of them.
+    """
+    table = get_forecast()
+    if table is None:
+        return jsonify({"error": "Forecast not available"}), 503
+    group, commodity, variety = request.args.get("group"), request.args.get("commodity"), request.args.get("variety")
+    if variety is not None:
+        if commodity is None:
+            return jsonify({"error": "variety needs commodity"}), 400
+        i = table.lookup(commodity, variety)
+        if i is None:
+            return jsonify({"error": f"No forecast for {commodity} / {variety}"}), 404
+        return jsonify({**table.info(), **table.records([i])[0]})
+    rows = table.rows(group=group, commodity=commodity)
+    return jsonify({**table.info(), "count": len(rows), "forecasts": table.records(rows)})
+
+def _admin_error():
+    """None if the request carries the admin token, else the error response."""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (set ADMIN_TOKEN)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Invalid admin token"}), 401
+    return None
+
+@app.route('/admin/models')
+def admin_models():
+    """Serving version, registry versions, reload state and shadow-scoring stats."""
+    denied = _admin_error()
+    if denied:
+        return denied
+    manager = get_model_manager()
+    if manager is None:
+        return jsonify({"error": "Model not loaded"}), 503
+    return jsonify(manager.status())
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Loads {"version": "v0007"} (default: the registry's CURRENT) in the background and swaps it in;
+    requests keep being served by the old version meanwhile. ?wait=1 blocks until the swap is done.
+    """
+    denied = _admin_error()
+    if denied:
+        return denied
+    manager = get_model_manager()
+    if manager is None:
+        return jsonify({"error": "Model not loaded"}), 503
+    version = (request.get_json(silent=True) or {}).get("version")
+    if version and version not in list_versions(REGISTRY_DIR):
+        return jsonify({"error": f"Unknown model version: {version}"}), 404
+    wait = request.args.get("wait") == "1"
+    if not manager.reload(version, wait=wait):
+        return jsonify({"error": "A reload is already in progress", "loading": manager.loading}), 409
+    if wait:
+        return jsonify(manager.status()), 500 if manager.last_error else 200
+    return jsonify({"loading": manager.loading or version}), 202
+
+@app.route('/admin/shadow', methods=['POST'])
+def admin_shadow():
+    """Starts shadow-scoring {"version": "v0008"} next to production; {"version": null} stops it."""
+    denied = _admin_error()
+    if denied:
+        return denied
+    manager = get_model_manager()
+    if manager is None:
+        return jsonify({"error": "Model not loaded"}), 503
+    version = (request.get_json(silent=True) or {}).get("version")
+    if version and version not in list_versions(REGISTRY_DIR):
+        return jsonify({"error": f"Unknown model version: {version}"}), 404
+    try:
+        shadow = manager.set_shadow(version)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"shadow": shadow.stats() if shadow else None})
+
+def openrouter_headers():
+    return {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
         "HTTP-Referer": FRONTEND_URL,
     }
-    
+
+def image_data_url(stream, mimetype):
+    """Downscaled/recompressed data URL for the vision model; falls back to the raw upload."""
+    with telemetry.span("analyze.image_encode"):
+        return _image_data_url(stream, mimetype)
+
+def _image_data_url(stream, mimetype):
+    try:
+        buf, out_mimetype, info = preprocess_image(stream, get_profile(VISION_MODEL))
+        return to_data_url(buf, out_mimetype)
+    except Exception as e:
+        print(f"Image preprocessing skipped: {e}")
+        stream.seek(0)
+        return f"data:{mimetype};base64,{base64.b64encode(stream.read()).decode('utf-8')}"
+
+def build_vision_payload(prompt, language, image_url):
     # Map codes to full language names for the System Prompt
     lang_map = {"hi": "Hindi", "ta": "Tamil", "en": "English"}
     target_lang = lang_map.get(language, "English")
 
-    payload = {
-        "model": "qwen/qwen2.5-vl-32b-instruct",
+    return {
+        "model": VISION_MODEL,
         "messages": [
             {"role": "system", "content": f"You are an expert agricultural AI. Analyze the crop image and answer the user's question. Reply ONLY in {target_lang}. Keep it helpful and concise for a farmer."},
             {"role": "user", "content": [
                 {"type": "text", "text": prompt},
-                {"type": "image_url", "image_url": {"url": f"data:{image.mimetype};base64,{base64_image}"}}
+                {"type": "image_url", "image_url": {"url": image_url}}
             ]}
         ]
     }
 
+def transcribe_audio(audio_bytes, language):
+    """Whisper transcription via the worker pool; None if the model isn't available."""
+    with telemetry.span("analyze.whisper_wait"):
+        pool = whisper_component.get(timeout=WHISPER_WAIT_SECONDS)
+    if not pool:
+        return None
     try:
-        r = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=payload)
-        r.raise_for_status()
-        reply = r.json()["choices"][0]["message"]["content"]
-        return jsonify({"response": reply, "transcribed_prompt": prompt})
+        with telemetry.span("analyze.transcribe"):
+            result = pool.transcribe(audio_bytes, language=language if language != 'en' else None)
+        # Worker-side split; the rest of analyze.transcribe is queueing for a worker and IPC
+        telemetry.record("analyze.transcribe.decode", result["decode_seconds"])
+        telemetry.record("analyze.transcribe.whisper", result["transcribe_seconds"])
+        return result['text']
+    except (TranscriptionBusy, TranscriptionTimeout):
+        raise
+    except Exception as e:
+        print(f"Whisper Error: {e}")
+        return None
+
+def wants_event_stream():
+    return request.form.get('stream', '').lower() in ('1', 'true', 'yes') or \
+        request.accept_mimetypes.best == 'text/event-stream'
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def iter_completion_deltas(r):
+    """Content deltas from an OpenAI-style `stream: true` chat completion (SSE lines)."""
+    for line in r.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue  # blank separators and ": OPENROUTER PROCESSING" keep-alives
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        choices = json.loads(data).get("choices") or [{}]
+        text = (choices[0].get("delta") or {}).get("content")
+        if text:
+            yield text
+
+def analyze_events(prompt, language, audio_bytes, image_stream, image_mimetype, image_sha256):
+    """
+    SSE stream for /assistant/analyze: the transcription goes out first, then tokens as the
+    vision model generates them. If the client disconnects the generator is closed, which
+    exits the upstream stream block and drops the OpenRouter connection mid-generation.
+    Identical concurrent questions share one upstream call: the first request leads the
+    vision cache's flight and the rest replay its tokens as they arrive.
+    """
+    if audio_bytes is not None:
+        yield sse_event("status", {"stage": "transcribing"})
+        try:
+            prompt = transcribe_audio(audio_bytes, language) or prompt
+        except TranscriptionBusy as e:
+            yield sse_event("error", {"error": f"Voice service busy, please retry: {e}"})
+            return
+        except TranscriptionTimeout as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+    if not prompt: prompt = DEFAULT_VISION_PROMPT
+    yield sse_event("transcription", {"transcribed_prompt": prompt})
+
+    key = vision_cache_key(image_sha256, prompt, language, VISION_MODEL)
+    with telemetry.span("analyze.cache_lookup"):
+        source, found = vision_cache.begin(key)
+    if source == "hit":
+        yield sse_event("token", {"text": found})
+        yield sse_event("done", {"response": found, "cache": "HIT"})
+        return
+    if source == "coalesced":
+        # The same question is already in flight: replay its tokens as they arrive
+        streamed = False
+        try:
+            with telemetry.span("analyze.coalesced_wait"):
+                for text in vision_cache.follow(found):
+                    streamed = True
+                    yield sse_event("token", {"text": text})
+        except FlightTimeout as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        except Exception as e:
+            yield sse_event("error", {"error": f"AI Error: {str(e)}"})
+            return
+        if not streamed and found.value:
+            yield sse_event("token", {"text": found.value})  # the leader was a non-streaming request
+        yield sse_event("done", {"response": found.value, "cache": "COALESCED"})
+        return
+
+    # Leader: followers (streaming or not) wait on this flight until it completes or fails
+    flight, reply, error = found, None, None
+    try:
+        yield sse_event("status", {"stage": "analyzing"})
+        payload = build_vision_payload(prompt, language, image_data_url(image_stream, image_mimetype))
+        payload["stream"] = True
+        parts = []
+        try:
+            with telemetry.span("analyze.upstream"):
+                upstream_start = time.perf_counter()
+                with get_client("openrouter").stream("POST", "/chat/completions", headers=openrouter_headers(), json=payload) as r:
+                    r.raise_for_status()
+                    telemetry.record("analyze.upstream_connect", time.perf_counter() - upstream_start)
+                    for text in telemetry.time_first(iter_completion_deltas(r), "analyze.first_token", upstream_start):
+                        parts.append(text)
+                        flight.append(text)
+                        yield sse_event("token", {"text": text})
+        except Exception as e:
+            error = e
+            yield sse_event("error", {"error": f"AI Error: {str(e)}"})
+            return
+        reply = "".join(parts)
+    finally:
+        if reply is None:
+            vision_cache.fail(key, flight, error or ConnectionAbortedError("Request that was generating this reply disconnected"))
+        else:
+            vision_cache.complete(key, flight, reply, store=bool(reply))
+    yield sse_event("done", {"response": reply, "cache": "MISS"})
+
+@app.route('/assistant/analyze', methods=['POST'])
+def assistant_analyze():
+    with telemetry.span("analyze.parse"):
+        prompt = request.form.get('prompt', '').strip()
+        language = request.form.get('language', 'en')
+        has_image = 'image' in request.files
+
+    if not has_image:
+        return jsonify({"error": "Please upload an image for the Agronomist to analyze."}), 400
+
+    image = request.files['image']
+
+    if wants_event_stream():
+        # Werkzeug closes uploads when the view returns, so the generator gets its own copies
+        audio_bytes = request.files['audio'].read() if 'audio' in request.files else None
+        image_stream = io.BytesIO(image.read())
+        with telemetry.span("analyze.image_hash"):
+            image_sha256 = sha256_stream(image_stream)
+        events = analyze_events(prompt, language, audio_bytes, image_stream, image.mimetype, image_sha256)
+        return Response(stream_with_context(events),
+                        mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    # 1. Handle Voice Input (Whisper)
+    if 'audio' in request.files:
+        try:
+            prompt = transcribe_audio(request.files['audio'].read(), language) or prompt
+        except TranscriptionBusy as e:
+            return jsonify({"error": f"Voice service busy, please retry: {e}"}), 503, {"Retry-After": "5"}
+        except TranscriptionTimeout as e:
+            return jsonify({"error": str(e)}), 504
+
+    # 2. Call Vision Model
+    if not prompt: prompt = DEFAULT_VISION_PROMPT
+
+    def call_vision_model():
+        payload = build_vision_payload(prompt, language, image_data_url(image.stream, image.mimetype))
+        with telemetry.span("analyze.upstream"):
+            r = get_client("openrouter").post("/chat/completions", headers=openrouter_headers(), json=payload)
+            r.raise_for_status()
+            return r.json()["choices"][0]["message"]["content"]
+
+    try:
+        with telemetry.span("analyze.image_hash"):
+            image_sha256 = sha256_stream(image.stream)
+        key = vision_cache_key(image_sha256, prompt, language, VISION_MODEL)
+        # Includes image_encode + upstream on a miss, or the wait for a coalesced in-flight call
+        with telemetry.span("analyze.vision"):
+            reply, source = vision_cache.get_or_compute(key, call_vision_model)
+        return jsonify({"response": reply, "transcribed_prompt": prompt}), 200, {"X-Cache": source.upper()}
+    except UpstreamBusy as e:
+        return jsonify({"error": f"AI Error: {str(e)}"}), 503
+    except FlightTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         return jsonify({"error": f"AI Error: {str(e)}"}), 500
 
 @app.route('/assistant/text-to-speech', methods=['POST'])
 def assistant_tts():
-    data = request.get_json()
+    with telemetry.span("tts.parse"):
+        data = request.get_json()
     text = data.get("text")
     language = data.get("language", "en")
     
@@ -174,16 +728,43 @@ def assistant_tts():
     }
     voice_id = voice_ids.get(language, voice_ids["en"])
 
+    if not text:
+        return jsonify({"error": "No text provided"}), 400
+
+    key = tts_cache_key(text, language, voice_id, TTS_MODEL_ID)
+    with telemetry.span("tts.cache_lookup"):
+        cached = tts_cache.get(key)
+    if cached is not None:
+        return Response(cached, mimetype="audio/mpeg", headers={"X-Cache": "HIT"})
+
+    # Miss: relay ElevenLabs' streaming endpoint chunk by chunk while filling the cache
+    upstream_start = time.perf_counter()
+    # The stack owns the upstream stream (and its concurrency slot) until the response is closed,
+    # whether or not the body generator ever starts
+    upstream = ExitStack()
     try:
-        r = requests.post(
-            f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}",
-            json={"text": text, "model_id": "eleven_multilingual_v2"},
-            headers={"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
-        )
-        r.raise_for_status()
-        return send_file(io.BytesIO(r.content), mimetype="audio/mpeg")
+        with telemetry.span("tts.upstream_connect"):
+            r = upstream.enter_context(get_client("elevenlabs").stream(
+                "POST", f"/text-to-speech/{voice_id}/stream",
+                json={"text": text, "model_id": TTS_MODEL_ID},
+                headers={"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
+            ))
+            r.raise_for_status()
+    except UpstreamBusy as e:
+        upstream.close()
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
+        upstream.close()
         return jsonify({"error": str(e)}), 500
 
+    def generate():
+        chunks = telemetry.time_first(r.iter_content(TTS_STREAM_CHUNK_BYTES), "tts.first_byte", upstream_start)
+        with telemetry.span("tts.stream"):
+            yield from tts_cache.stream_through(key, chunks)
+
+    response = Response(stream_with_context(generate()), mimetype="audio/mpeg", headers={"X-Cache": "MISS"})
+    response.call_on_close(upstream.close)
+    return response
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import io
+import base64
+import hashlib
+from PIL import Image, ImageOps
+
+HASH_CHUNK_BYTES = 1 << 20
+_ORIENTATION_TAG = 0x0112
+
+
+class ImageProfile:
+    """How images are shrunk before being sent to one vision model."""
+
+    def __init__(self, max_side=1280, format="JPEG", max_bytes=400_000, quality=85, min_quality=50, quality_step=10):
+        self.max_side = max_side
+        self.format = format
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.min_quality = min_quality
+        self.quality_step = quality_step
+
+    @property
+    def mimetype(self):
+        return f"image/{self.format.lower()}"
+
+
+# Per-model profiles; models not listed use DEFAULT_PROFILE
+DEFAULT_PROFILE = ImageProfile()
+IMAGE_PROFILES = {
+    # Qwen2.5-VL tiles images into 28px patches; ~1280px keeps leaf lesions visible at a sane token cost
+    "qwen/qwen2.5-vl-32b-instruct": ImageProfile(max_side=1280, format="JPEG", max_bytes=400_000, quality=85),
+}
+
+
+def get_profile(model):
+    return IMAGE_PROFILES.get(model, DEFAULT_PROFILE)
+
+
+def sha256_stream(stream):
+    """Hashes a seekable upload in chunks (no full in-memory copy) and rewinds it."""
+    h = hashlib.sha256()
+    for block in iter(lambda: stream.read(HASH_CHUNK_BYTES), b""):
+        h.update(block)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def _needs_work(img, size_bytes, profile):
+    if size_bytes > profile.max_bytes or max(img.size) > profile.max_side:
+        return True
+    if img.format != profile.format:
+        return True
+    return img.getexif().get(_ORIENTATION_TAG, 1) != 1
+
+
+def _encode(img, profile, quality):
+    buf = io.BytesIO()
+    options = {"quality": quality}
+    if profile.format == "JPEG":
+        options.update(optimize=True, progressive=True)
+    elif profile.format == "WEBP":
+        options.update(method=4)
+    img.save(buf, format=profile.format, **options)
+    return buf
+
+
+def preprocess_image(stream, profile=DEFAULT_PROFILE):
+    """
+    Bounded-resolution downscale, EXIF orientation fix and recompression to profile.max_bytes.
+    Reads straight from the (seekable) upload stream. JPEGs are decoded at reduced DCT scale
+    via draft(), so a 12MP photo is never fully decoded just to be thrown away.
+    Returns (buffer, mimetype, info). Images already within the profile pass through untouched.
+    """
+    stream.seek(0, io.SEEK_END)
+    original_bytes = stream.tell()
+    stream.seek(0)
+
+    img = Image.open(stream)  # header only; pixels are decoded lazily
+    original_size = img.size
+    if not _needs_work(img, original_bytes, profile):
+        stream.seek(0)
+        buf = io.BytesIO(stream.read())
+        return buf, Image.MIME.get(img.format, profile.mimetype), {
+            "original_bytes": original_bytes, "output_bytes": original_bytes,
+            "original_size": original_size, "output_size": original_size, "passthrough": True,
+        }
+
+    if img.format == "JPEG":
+        img.draft("RGB", (profile.max_side, profile.max_side))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "L"):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        rgba = img.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        img = background
+    img.thumbnail((profile.max_side, profile.max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    # Step quality down until the budget is met, then shrink the resolution if still too big
+    quality = profile.quality
+    while True:
+        buf = _encode(img, profile, quality)
+        if buf.getbuffer().nbytes <= profile.max_bytes:
+            break
+        if quality - profile.quality_step >= profile.min_quality:
+            quality -= profile.quality_step
+        elif min(img.size) > 256:
+            img = img.resize((int(img.width * 0.75), int(img.height * 0.75)), Image.Resampling.LANCZOS)
+            quality = profile.quality
+        else:
+            break
+
+    return buf, profile.mimetype, {
+        "original_bytes": original_bytes, "output_bytes": buf.getbuffer().nbytes,
+        "original_size": original_size, "output_size": img.size,
+        "quality": quality, "passthrough": False,
+    }
+
+
+def to_data_url(buf, mimetype):
+    """Base64-encodes a BytesIO in one pass over its buffer (no intermediate bytes copy)."""
+    encoded = base64.b64encode(buf.getbuffer()).decode("ascii")
+    return f"data:{mimetype};base64,{encoded}"
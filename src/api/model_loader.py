@@ -0,0 +1,77 @@
+import time
+import threading
+import traceback
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class LazyComponent:
+    """
+    One independently loaded model component (price model, encoders, Whisper...).
+    Loads in a background thread (start) or on first use (get), then runs an optional
+    warmup call so one-time setup cost isn't paid by the first real request.
+    """
+
+    def __init__(self, name, loader, warmup=None):
+        self.name = name
+        self._loader = loader
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self.value = None
+        self.state = PENDING
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    def start(self):
+        """Kicks off loading in a daemon thread (no-op if already started)."""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            self.state = LOADING
+            self._thread = threading.Thread(target=self._load, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        print(f"⏳ Loading component '{self.name}'...")
+        start = time.perf_counter()
+        try:
+            value = self._loader()
+            self.load_seconds = time.perf_counter() - start
+            if value is not None and self._warmup is not None:
+                warm_start = time.perf_counter()
+                self._warmup(value)
+                self.warmup_seconds = time.perf_counter() - warm_start
+            self.value = value
+            self.state = READY if value is not None else FAILED
+            if value is None:
+                self.error = "not available"
+                print(f"⚠️ Component '{self.name}' not available")
+            else:
+                print(f"✅ Component '{self.name}' ready in {self.load_seconds:.2f}s")
+        except Exception as e:
+            self.state, self.error = FAILED, str(e)
+            print(f"❌ Failed to load component '{self.name}': {e}")
+            traceback.print_exc()
+        finally:
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def get(self, timeout=None):
+        """Returns the loaded value, starting the load on first use. None if not ready within timeout."""
+        self.start()
+        self._done.wait(timeout)
+        return self.value if self.ready else None
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 3),
+            "warmup_seconds": None if self.warmup_seconds is None else round(self.warmup_seconds, 3),
+            "error": self.error,
+        }
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import queue
+import threading
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+import joblib
+import numpy as np
+
+from src.features.transform import load_transformer
+from src.features.feature_store import load_feature_store
+from src.models.tree_predictor import load_tree_model, file_sha256
+from src.models.registry import current_version, version_dir, load_metadata, list_versions
+
+
+class ModelBundle:
+    """Everything /predict needs from one model version. Never mutated after loading."""
+
+    def __init__(self, version, model, transformer, store, metadata, source):
+        self.version = version
+        self.model = model
+        self.transformer = transformer
+        self.store = store
+        self.metadata = metadata
+        self.source = source
+        self.loaded_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def features(self, record):
+        """Store-filled record and its (1, n_features) float32 row."""
+        if self.store is not None:
+            record = self.store.fill(record)
+        X = self.transformer.empty(1)
+        self.transformer.transform_row(record, out=X[0])
+        return record, X
+
+    def info(self):
+        return {"version": self.version, "source": self.source, "loaded_at": self.loaded_at,
+                "metrics": self.metadata.get("metrics"),
+                "feature_store": self.store.stats() if self.store is not None else None}
+
+
+def load_bundle(directory, version, encoder_path=None):
+    """
+    Loads model + transformer + feature store from one directory and warms them up.
+    Serves best_model.joblib: LightGBM's predict beats the NumPy tree tables on single rows and
+    batches alike (scripts/benchmark_predictor.py). best_model.npz is only the fallback for hosts
+    without lightgbm, and only while it still matches best_model.joblib.
+    """
+    model_path = os.path.join(directory, "best_model.joblib")
+    tree_path = os.path.join(directory, "best_model.npz")
+    model = None
+    if os.path.exists(model_path):
+        try:
+            model = joblib.load(model_path)
+        except ImportError as e:
+            if not os.path.exists(tree_path):
+                raise
+            print(f"⚠️ Could not load {model_path} ({e}), using the exported tree tables")
+    if model is None:
+        if not os.path.exists(tree_path):
+            raise FileNotFoundError(f"No model in {directory}")
+        model = load_tree_model(tree_path)
+        if os.path.exists(model_path) and model.source_sha256 != file_sha256(model_path):
+            raise ValueError(f"{tree_path} is stale (exported from a different best_model.joblib)")
+
+    transformer = load_transformer(os.path.join(directory, "feature_transformer.joblib"),
+                                   encoder_path or os.path.join(directory, "encoders.joblib"),
+                                   n_features=model.n_features_in_)
+    if transformer is None:
+        raise FileNotFoundError(f"No feature transformer or encoders in {directory}")
+    if model.n_features_in_ != transformer.n_features:
+        raise ValueError(f"Model expects {model.n_features_in_} features, transformer builds {transformer.n_features}")
+    store = load_feature_store(os.path.join(directory, "feature_store.npz"))
+
+    # Warmup: lazy init and page faults on the mmaps happen here, not in the first request
+    model.predict(transformer.transform_row({}).reshape(1, -1))
+    if store is not None:
+        store.features.sum()
+    metadata = load_metadata(version, os.path.dirname(directory)) if version.startswith("v") else {}
+    return ModelBundle(version, model, transformer, store, metadata, directory)
+
+
+class ShadowScorer:
+    """
+    Scores a candidate bundle on the same requests as production, on a background thread so the
+    request path only pays for a queue put. Every pair is appended to a JSONL log (joined with the
+    actual prices later by `registry.py shadow-report`); latency and agreement are kept in memory.
+    """
+
+    def __init__(self, bundle, log_path=None, max_pending=256, window=1000):
+        self.bundle = bundle
+        self.log_path = log_path
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._prod_latency = deque(maxlen=window)
+        self._shadow_latency = deque(maxlen=window)
+        self._abs_diff = deque(maxlen=window)
+        self.scored = self.dropped = self.errors = 0
+        self._stopped = False
+        if log_path:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        threading.Thread(target=self._run, name=f"shadow-{bundle.version}", daemon=True).start()
+
+    def submit(self, record, production_version, production_pred, production_seconds, as_of):
+        try:
+            self._queue.put_nowait((record, production_version, production_pred, production_seconds, as_of))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def stop(self):
+        self._stopped = True
+        self._queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None or self._stopped:
+                return
+            record, prod_version, prod_pred, prod_seconds, as_of = item
+            try:
+                start = time.perf_counter()
+                _, X = self.bundle.features(record)
+                pred = float(self.bundle.model.predict(X)[0])
+                seconds = time.perf_counter() - start
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"⚠️ Shadow model {self.bundle.version} failed: {e}")
+                continue
+            with self._lock:
+                self.scored += 1
+                self._prod_latency.append(prod_seconds)
+                self._shadow_latency.append(seconds)
+                self._abs_diff.append(abs(pred - prod_pred))
+            if self.log_path:
+                line = json.dumps({"ts": time.time(), "as_of": as_of, "Commodity": record.get("Commodity"),
+                                   "Variety": record.get("Variety"), "production": prod_version,
+                                   "production_pred": prod_pred, "production_ms": round(prod_seconds * 1000, 3),
+                                   "shadow": self.bundle.version, "shadow_pred": pred,
+                                   "shadow_ms": round(seconds * 1000, 3)})
+                with open(self.log_path, "a") as f:
+                    f.write(line + "\n")
+
+    def stats(self):
+        def pct(values, q):
+            return round(float(np.percentile(values, q)) * 1000, 3) if values else None
+        with self._lock:
+            prod, shadow, diff = list(self._prod_latency), list(self._shadow_latency), list(self._abs_diff)
+            return {
+                "version": self.bundle.version, "scored": self.scored, "dropped": self.dropped, "errors": self.errors,
+                "production_ms": {"p50": pct(prod, 50), "p95": pct(prod, 95)},
+                "shadow_ms": {"p50": pct(shadow, 50), "p95": pct(shadow, 95)},
+                "mean_abs_diff": round(float(np.mean(diff)), 4) if diff else None,
+                "log": self.log_path,
+            }
+
+
+class ModelManager:
+    """
+    Serves the registry's CURRENT version and hot-swaps newer ones. A new version is loaded and
+    warmed up on a background thread while requests keep using the old bundle; the swap is a single
+    reference assignment, and a request that already holds the old bundle finishes with it.
+    Without a registry it serves the flat files in `fallback_dir` (version "local").
+    """
+
+    def __init__(self, registry_dir, fallback_dir, encoder_path=None, poll_seconds=10.0, shadow_log=None):
+        self.registry_dir = registry_dir
+        self.fallback_dir = fallback_dir
+        self.encoder_path = encoder_path
+        self.poll_seconds = poll_seconds
+        self.shadow_log = shadow_log
+        self.current = None
+        self.shadow = None
+        self.loading = None
+        self.last_error = None
+        self.swaps = 0
+        self._seen_current = None
+        self._reload_lock = threading.Lock()
+
+    def _load(self, version):
+        if version is None:
+            return load_bundle(self.fallback_dir, "local", self.encoder_path)
+        return load_bundle(version_dir(version, self.registry_dir), version)
+
+    def load_initial(self):
+        self._seen_current = current_version(self.registry_dir)
+        try:
+            self.current = self._load(self._seen_current)
+        except Exception as e:
+            if self._seen_current is None:
+                raise
+            # A broken CURRENT shouldn't take the API down if the flat files still work
+            print(f"⚠️ Could not load registry version {self._seen_current}: {e}; using {self.fallback_dir}")
+            self.last_error = str(e)
+            self.current = self._load(None)
+        print(f"🧠 Serving model {self.current.version}")
+        if self.poll_seconds:
+            threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+        return self
+
+    def reload(self, version=None, wait=False):
+        """
+        Loads `version` (default: the registry's CURRENT) in the background and swaps it in.
+        Returns False if a reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        version = version or current_version(self.registry_dir)
+        self.loading = version
+        thread = threading.Thread(target=self._reload, args=(version,), name="model-reload", daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _reload(self, version):
+        try:
+            start = time.perf_counter()
+            bundle = self._load(version)
+            old, self.current = self.current, bundle
+            self.swaps += 1
+            self.last_error = None
+            print(f"🔄 Swapped model {old.version if old else None} -> {bundle.version} "
+                  f"(loaded in {time.perf_counter() - start:.2f}s)")
+        except Exception as e:
+            self.last_error = f"{version}: {e}"
+            print(f"❌ Model reload of {version} failed, still serving {self.current.version}: {e}")
+            traceback.print_exc()
+        finally:
+            self.loading = None
+            self._reload_lock.release()
+
+    def _watch(self):
+        """Polls the registry's CURRENT pointer and reloads when it changes."""
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                version = current_version(self.registry_dir)
+            except OSError:
+                continue
+            if version and version != self._seen_current and self.reload(version):
+                self._seen_current = version
+
+    def set_shadow(self, version):
+        """Starts shadow-scoring `version` next to production (None stops it). Loads synchronously."""
+        old = self.shadow
+        self.shadow = ShadowScorer(self._load(version), self.shadow_log) if version else None
+        if old is not None:
+            old.stop()
+        return self.shadow
+
+    def status(self):
+        return {
+            "current": self.current.info() if self.current else None,
+            "registry_current": current_version(self.registry_dir),
+            "versions": list_versions(self.registry_dir),
+            "loading": self.loading,
+            "swaps": self.swaps,
+            "last_error": self.last_error,
+            "shadow": self.shadow.stats() if self.shadow else None,
+        }
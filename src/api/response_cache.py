@@ -0,0 +1,191 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def vision_cache_key(image_sha256, prompt, language, model):
+    """Exact content hash of the image (hex sha256) plus everything else that shapes the answer."""
+    h = hashlib.sha256()
+    h.update(image_sha256.encode("ascii"))
+    for part in (prompt, language, model):
+        h.update(b"\0" + (part or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+class FlightTimeout(TimeoutError):
+    """A coalesced caller gave up waiting on the in-flight computation it joined."""
+
+
+class _Flight:
+    """One in-flight computation. A streaming leader appends parts as they arrive so followers can replay them."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self._cond = threading.Condition()
+        self.parts = []
+        self.value = None
+        self.error = None
+
+    def append(self, part):
+        with self._cond:
+            self.parts.append(part)
+            self._cond.notify_all()
+
+    def finish(self, value=None, error=None):
+        with self._cond:
+            self.value, self.error = value, error
+            self.done.set()
+            self._cond.notify_all()
+
+    def follow(self, timeout=None):
+        """
+        Yields the leader's parts from the first one, live, until it finishes; raises its error.
+        `timeout` bounds the whole replay, not each wait, and raises FlightTimeout when it runs out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sent = 0
+        while True:
+            with self._cond:
+                while sent == len(self.parts) and not self.done.is_set():
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise FlightTimeout(f"Gave up after {timeout:g}s waiting for the in-flight request")
+                    self._cond.wait(remaining)
+                new, finished = self.parts[sent:], self.done.is_set()
+            yield from new
+            sent += len(new)
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache with single-flight deduplication: concurrent callers asking for the
+    same key wait on one in-flight computation instead of each calling the upstream.
+    Only successful results are cached; an error is handed to every waiter of that flight.
+    Waiters give up after wait_timeout seconds (FlightTimeout), so a stuck leader can't hold them forever.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600.0, wait_timeout=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._items = OrderedDict()  # key -> (expires_at, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "timeouts": 0,
+                         "evictions": 0, "expired": 0}
+
+    def _lookup(self, key, now):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        if item[0] <= now:
+            del self._items[key]
+            self.counters["expired"] += 1
+            return None
+        self._items.move_to_end(key)
+        return item
+
+    def _store(self, key, value, now):
+        self._items[key] = (now + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get(self, key):
+        """Plain lookup (counted as a hit or miss) for callers that fill the cache themselves."""
+        with self._lock:
+            item = self._lookup(key, time.monotonic())
+            self.counters["hits" if item is not None else "misses"] += 1
+            return item[1] if item is not None else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def begin(self, key):
+        """
+        For callers that produce the value themselves (e.g. from a token stream). Returns
+        ('hit', value), ('miss', flight) for the leader, which must end with complete() or fail(),
+        or ('coalesced', flight) for a follower, which replays it with follow().
+        """
+        with self._lock:
+            item = self._lookup(key, time.monotonic())
+            if item is not None:
+                self.counters["hits"] += 1
+                return "hit", item[1]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.counters["coalesced"] += 1
+                return "coalesced", flight
+            flight = self._flights[key] = _Flight()
+            self.counters["misses"] += 1
+            return "miss", flight
+
+    def complete(self, key, flight, value, store=True):
+        with self._lock:
+            if store:
+                self._store(key, value, time.monotonic())
+            self._flights.pop(key, None)
+        flight.finish(value=value)
+
+    def _timed_out(self):
+        with self._lock:
+            self.counters["timeouts"] += 1
+
+    def follow(self, flight):
+        """A follower's live replay of `flight`, bounded by wait_timeout."""
+        try:
+            yield from flight.follow(self.wait_timeout)
+        except FlightTimeout:
+            self._timed_out()
+            raise
+
+    def fail(self, key, flight, error):
+        """Ends the flight without caching; every follower gets `error`."""
+        with self._lock:
+            self.counters["errors"] += 1
+            self._flights.pop(key, None)
+        flight.finish(error=error)
+
+    def get_or_compute(self, key, compute):
+        """Returns (value, source) where source is 'hit', 'miss' or 'coalesced'."""
+        source, found = self.begin(key)
+        if source == "hit":
+            return found, source
+        if source == "coalesced":
+            if not found.done.wait(self.wait_timeout):
+                self._timed_out()
+                raise FlightTimeout(f"Gave up after {self.wait_timeout:g}s waiting for the in-flight request")
+            if found.error is not None:
+                raise found.error
+            return found.value, source
+
+        try:
+            value = compute()
+        except Exception as e:
+            self.fail(key, found, e)
+            raise
+        except BaseException as e:
+            self.fail(key, found, RuntimeError(f"Computation aborted: {e!r}"))
+            raise
+        self.complete(key, found, value)
+        return value, source
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            entries, in_flight = len(self._items), len(self._flights)
+        lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+        return {
+            **counters,
+            "entries": entries,
+            "in_flight": in_flight,
+            # coalesced callers also avoided an upstream call
+            "saved_ratio": (counters["hits"] + counters["coalesced"]) / lookups if lookups else None,
+        }
@@ -173,6 +173,33 @@ async function toggleRecording() {
     }
 }
 
+// Reads an SSE response body, calling handlers[event](data) per event; resolves with the 'done' payload
+async function readAnalyzeStream(res, handlers) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, sep);
+            buffer = buffer.slice(sep + 2);
+            let event = "message", data = "";
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            }
+            const payload = data ? JSON.parse(data) : {};
+            if (event === "error") throw new Error(payload.error || 'Analysis failed');
+            if (event === "done") return payload;
+            if (handlers[event]) handlers[event](payload);
+        }
+    }
+    throw new Error('Analysis stream ended unexpectedly');
+}
+
 async function analyzeCrop() {
     const imgInput = document.getElementById('cropImage');
     const audInput = document.getElementById('voiceNote');
@@ -213,22 +240,25 @@ async function analyzeCrop() {
 
         formData.append('prompt', promptRef.value);
         formData.append('language', langRef.value);
+        formData.append('stream', '1');
 
-        // 1. Analyze
+        // 1. Analyze (Server-Sent Events: transcription first, then tokens as they are generated)
         const res = await fetch('/assistant/analyze', {
             method: 'POST',
             body: formData
         });
 
-        const data = await res.json();
-        if (!res.ok) throw new Error(data.error || 'Analysis failed');
+        if (!res.ok) {
+            const data = await res.json();
+            throw new Error(data.error || 'Analysis failed');
+        }
 
-        // Show Text
         resBox.classList.remove('hidden');
-        txtBox.innerText = data.response;
-        if (data.transcribed_prompt) {
-            promptBox.innerText = "User Query: " + data.transcribed_prompt;
-        }
+        txtBox.innerText = "";
+        const data = await readAnalyzeStream(res, {
+            transcription: (d) => { promptBox.innerText = "User Query: " + d.transcribed_prompt; },
+            token: (d) => { txtBox.innerText += d.text; }
+        });
 
         // 2. TTS
         try {
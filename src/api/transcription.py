@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+import subprocess
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from src.api.whisper_model import load_whisper_model, set_torch_threads
+
+SAMPLE_RATE = 16000
+FFMPEG_TIMEOUT_SECONDS = 30
+
+
+class TranscriptionBusy(Exception):
+    """Raised when the queue is full; callers should shed load (503) instead of piling up."""
+
+
+class TranscriptionTimeout(Exception):
+    pass
+
+
+def decode_audio(data, sample_rate=SAMPLE_RATE):
+    """Decodes an in-memory upload (webm/ogg/mp3/wav...) to mono float32 PCM via ffmpeg pipes, no temp files."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "1", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    proc = subprocess.run(cmd, input=data, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+# --- Worker process side ---
+_worker_model = None
+
+
+def _init_worker(model_size, threads, quantize, interop_threads, download_root):
+    """Runs once per worker process: pin thread counts before torch starts, then load Whisper."""
+    global _worker_model
+    set_torch_threads(threads, interop_threads)
+    _worker_model = load_whisper_model(model_size, quantize=quantize, download_root=download_root)
+
+
+def _transcribe_task(audio_bytes, language):
+    start = time.perf_counter()
+    audio = decode_audio(audio_bytes) if audio_bytes is not None else np.zeros(SAMPLE_RATE, dtype=np.float32)
+    decoded = time.perf_counter()
+    result = _worker_model.transcribe(audio, language=language, fp16=False)
+    done = time.perf_counter()
+    return {
+        "text": result["text"],
+        "warmup": audio_bytes is None,
+        "audio_seconds": len(audio) / SAMPLE_RATE,
+        "decode_seconds": decoded - start,
+        "transcribe_seconds": done - decoded,
+    }
+
+
+# --- Server side ---
+class TranscriptionPool:
+    """
+    Bounded pool of worker processes, each holding its own Whisper model.
+    At most workers + max_queue jobs are admitted; anything beyond that is rejected
+    immediately (backpressure). Each job has a timeout.
+    """
+
+    def __init__(self, model_size="base", workers=1, threads_per_worker=None, max_queue=4, timeout=60.0,
+                 quantize="none", interop_threads=1, download_root=None):
+        self.model_size = model_size
+        self.quantize = quantize
+        self.interop_threads = interop_threads
+        self.download_root = download_root
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"completed": 0, "failed": 0, "rejected": 0, "timeouts": 0}
+        self._timings = {"decode_seconds": 0.0, "transcribe_seconds": 0.0, "audio_seconds": 0.0}
+        self._max_timings = {"decode_seconds": 0.0, "transcribe_seconds": 0.0}
+
+    def _new_executor(self):
+        # spawn: workers must not inherit the Flask process's threads/locks via fork
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_size, self.threads_per_worker, self.quantize, self.interop_threads,
+                      self.download_root),
+        )
+
+    def _submit(self, audio_bytes, language):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise TranscriptionBusy(f"Transcription queue full ({self.workers + self.max_queue} jobs)")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(_transcribe_task, audio_bytes, language)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool and retry once
+            print("⚠️ Transcription pool broken, restarting workers")
+            self._executor = self._new_executor()
+            try:
+                future = self._executor.submit(_transcribe_task, audio_bytes, language)
+            except Exception:
+                self._release_unsubmitted()
+                raise
+        # The slot is freed when the worker actually finishes, even if the caller already timed out
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _release_unsubmitted(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._counters["failed"] += 1
+        self._slots.release()
+
+    def _on_done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._counters["failed"] += 1
+            elif not future.result()["warmup"]:
+                result = future.result()
+                self._counters["completed"] += 1
+                for key in self._timings:
+                    self._timings[key] += result[key]
+                for key in self._max_timings:
+                    self._max_timings[key] = max(self._max_timings[key], result[key])
+        self._slots.release()
+
+    def transcribe(self, audio_bytes, language=None, timeout=None):
+        """Blocks the calling request thread only, until the text is ready or the timeout hits."""
+        future = self._submit(audio_bytes, language)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise TranscriptionTimeout(f"Transcription took longer than {timeout or self.timeout}s")
+
+    def warmup(self):
+        """Spawns every worker (model load happens in the initializer) and runs one silent clip each."""
+        futures = [self._submit(None, "en") for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def stats(self):
+        with self._lock:
+            completed = self._counters["completed"]
+            return {
+                "model": self.model_size,
+                "quantize": self.quantize,
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "queue_capacity": self.workers + self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                **self._counters,
+                "avg_decode_seconds": self._timings["decode_seconds"] / completed if completed else None,
+                "avg_transcribe_seconds": self._timings["transcribe_seconds"] / completed if completed else None,
+                "max_decode_seconds": self._max_timings["decode_seconds"],
+                "max_transcribe_seconds": self._max_timings["transcribe_seconds"],
+                "real_time_factor": (self._timings["transcribe_seconds"] / self._timings["audio_seconds"]
+                                     if self._timings["audio_seconds"] else None),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
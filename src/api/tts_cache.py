@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def tts_cache_key(text, language, voice_id, model_id):
+    """Content address for one synthesized clip."""
+    raw = json.dumps([text, language, voice_id, model_id], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryLRU:
+    """In-memory LRU bounded by total bytes rather than entry count."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskStore:
+    """
+    On-disk tier: one file per key under a two-char fan-out directory.
+    Reads bump the file mtime, and the least recently used files are evicted once the
+    directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(self.suffix):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            existed = os.path.exists(path)
+            os.replace(tmp_path, path)
+            if not existed:
+                self.size += len(data)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Full scan only when over budget; evict down to 90% to avoid thrashing at the edge
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self.size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+                self.size -= size
+            except FileNotFoundError:
+                pass
+
+
+class TTSCache:
+    """Two-tier (memory LRU + disk) audio cache with stream-through fill on misses."""
+
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.memory = MemoryLRU(memory_bytes)
+        self.disk = DiskStore(directory, disk_bytes)
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "aborted": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key):
+        data = self.memory.get(key)
+        if data is not None:
+            self._count("memory_hits")
+            return data
+        data = self.disk.get(key)
+        if data is not None:
+            self._count("disk_hits")
+            self.memory.put(key, data)
+            return data
+        self._count("misses")
+        return None
+
+    def put(self, key, data):
+        self.memory.put(key, data)
+        self.disk.put(key, data)
+        self._count("stored")
+
+    def stream_through(self, key, chunks):
+        """Yields upstream chunks to the client as they arrive and caches the clip once complete."""
+        parts = []
+        completed = False
+        try:
+            for chunk in chunks:
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            # Never cache a partial clip (client disconnect or upstream error mid-stream)
+            if completed and parts:
+                self.put(key, b"".join(parts))
+            elif not completed:
+                self._count("aborted")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": (counters["memory_hits"] + counters["disk_hits"]) / lookups if lookups else None,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size,
+            "disk_bytes": self.disk.size,
+        }
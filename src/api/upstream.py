@@ -0,0 +1,260 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Upstream defaults; every value can be overridden with <NAME>_<SETTING> env vars,
+# e.g. OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1 to point at the local stub server.
+UPSTREAMS = {
+    "openrouter": {"base_url": "https://openrouter.ai/api/v1", "read_timeout": 120.0, "max_concurrency": 8},
+    "elevenlabs": {"base_url": "https://api.elevenlabs.io/v1", "read_timeout": 60.0, "max_concurrency": 4},
+}
+DEFAULTS = {
+    "connect_timeout": 3.05,
+    "read_timeout": 60.0,
+    "max_concurrency": 8,
+    "queue_timeout": 30.0,   # max wait for a free concurrency slot
+    "max_retries": 2,
+    "backoff_base": 0.5,
+    "backoff_max": 8.0,
+}
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class UpstreamBusy(UpstreamError):
+    """No concurrency slot became free within queue_timeout."""
+
+
+def upstream_settings(name):
+    settings = dict(DEFAULTS, **UPSTREAMS.get(name, {}))
+    for key, default in settings.items():
+        env = os.getenv(f"{name.upper()}_{key.upper()}")
+        if env is not None:
+            settings[key] = type(default)(env)
+    return settings
+
+
+def connect_failed(error):
+    """
+    True when a requests.ConnectionError means the request never left: a connect timeout, a refused
+    connection or a DNS failure. Anything later (reset mid-request, dropped response) may have
+    reached the upstream and been billed, so it isn't safe to resend a POST.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """Full-jitter exponential backoff; honours a numeric Retry-After header (capped)."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, min(cap, float(retry_after)))
+        except ValueError:
+            pass
+    return delay
+
+
+class UpstreamClient:
+    """
+    Pooled, keep-alive HTTP client for one upstream API.
+    Bounded concurrency (callers wait for a slot), connect/read timeouts and jittered retries on
+    429/5xx and on connect-phase failures. A slot is held per attempt, never through a backoff sleep.
+    """
+
+    def __init__(self, name, base_url, connect_timeout=3.05, read_timeout=60.0, max_concurrency=8,
+                 queue_timeout=30.0, max_retries=2, backoff_base=0.5, backoff_max=8.0):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _url(self, path):
+        return path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise UpstreamBusy(f"{self.name}: no free connection slot after {self.queue_timeout}s")
+
+    def _send(self, method, path, stream, kwargs):
+        """
+        Attempt loop; returns the first non-retryable response with its slot still held (the caller
+        releases it). Each attempt takes its own slot and gives it back before sleeping.
+        """
+        url = self._url(path)
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            self._acquire()
+            try:
+                resp = self.session.request(method, url, stream=stream, **kwargs)
+            except requests.ConnectionError as e:
+                # ReadTimeout is not a ConnectionError: a slow upstream is not retried either
+                self._slots.release()
+                if last or not connect_failed(e):
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                continue
+            except BaseException:
+                self._slots.release()
+                raise
+            if resp.status_code in RETRY_STATUSES and not last:
+                retry_after = resp.headers.get("Retry-After")
+                resp.close()
+                self._slots.release()
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after))
+                continue
+            return resp
+
+    def request(self, method, path, **kwargs):
+        """Buffered request (body fully read before the slot is released)."""
+        resp = self._send(method, path, False, kwargs)
+        try:
+            resp.content  # read body while holding the slot
+        finally:
+            self._slots.release()
+        return resp
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    @contextmanager
+    def stream(self, method, path, **kwargs):
+        """Streaming request; the concurrency slot is held until the block exits."""
+        resp = self._send(method, path, True, kwargs)
+        try:
+            yield resp
+        finally:
+            resp.close()
+            self._slots.release()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncUpstreamClient:
+    """
+    asyncio variant (httpx) so one worker can keep many upstream calls in flight. Same policy as
+    UpstreamClient: per-upstream slots, (connect, read) timeouts, retries on 429/5xx and on
+    connect-phase failures only, no slot held through a backoff sleep.
+    """
+
+    def __init__(self, name, base_url, connect_timeout=3.05, read_timeout=60.0, max_concurrency=8,
+                 queue_timeout=30.0, max_retries=2, backoff_base=0.5, backoff_max=8.0):
+        import httpx  # optional dependency, only needed for the async client
+        self._httpx = httpx
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._slots = asyncio.BoundedSemaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    def _url(self, path):
+        return path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+
+    async def _acquire(self):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamBusy(f"{self.name}: no free connection slot after {self.queue_timeout}s")
+
+    async def _send(self, method, path, stream, kwargs):
+        """Attempt loop, as UpstreamClient._send: returns the response with its slot still held."""
+        httpx = self._httpx
+        url = self._url(path)
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            await self._acquire()
+            try:
+                resp = await self.client.send(self.client.build_request(method, url, **kwargs), stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # raised before anything was sent; read/write errors and ReadTimeout are not retried
+                self._slots.release()
+                if last:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                continue
+            except BaseException:
+                self._slots.release()
+                raise
+            if resp.status_code in RETRY_STATUSES and not last:
+                retry_after = resp.headers.get("Retry-After")
+                try:
+                    await resp.aclose()
+                finally:
+                    self._slots.release()
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after))
+                continue
+            return resp
+
+    async def request(self, method, path, **kwargs):
+        """Buffered request (body fully read before the slot is released)."""
+        resp = await self._send(method, path, False, kwargs)
+        try:
+            await resp.aread()  # read body while holding the slot
+        finally:
+            self._slots.release()
+        return resp
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method, path, **kwargs):
+        """Streaming request; the concurrency slot is held until the block exits."""
+        resp = await self._send(method, path, True, kwargs)
+        try:
+            yield resp
+        finally:
+            try:
+                await resp.aclose()
+            finally:
+                self._slots.release()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """Process-wide shared client per upstream (connection pool reused across requests)."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = UpstreamClient(name, **upstream_settings(name))
+        return _clients[name]
+
+
+
+def get_async_client(name):
+    """New async client for the current event loop (httpx clients are bound to their loop)."""
+    return AsyncUpstreamClient(name, **upstream_settings(name))
@@ -0,0 +1,88 @@
+import os
+import argparse
+
+# CPU Whisper loading for the transcription workers (src/api/transcription.py) and
+# scripts/benchmark_whisper.py. torch and whisper are only imported inside these functions,
+# so the Flask process never loads them.
+QUANTIZE_MODES = ("none", "int8")
+
+
+def set_torch_threads(threads, interop_threads=1):
+    """Pins intra-op and inter-op thread counts. Call before torch runs anything in this process."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:
+        pass  # can only be set once per process, before any inter-op work
+
+
+def quantize_int8(model):
+    """
+    Dynamic int8 quantization of every Linear layer: weights stored as int8, activations quantized
+    per batch at run time. Embeddings, convolutions and layer norms stay fp32.
+    """
+    import torch
+    import whisper.model
+
+    engines = torch.backends.quantized.supported_engines
+    torch.backends.quantized.engine = "fbgemm" if "fbgemm" in engines else "qnnpack"
+    # whisper.model.Linear only overrides forward() to cast its weights to the input dtype, and
+    # quantize_dynamic matches exact module types: swap in plain nn.Linear sharing the same parameters.
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if type(child) is whisper.model.Linear:
+                linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(parent, name, linear)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_whisper_model(name="base", quantize="none", download_root=None):
+    """
+    Loads Whisper for CPU inference. `name` is a model size ("tiny", "base", "small", ...) or the
+    path of a checkpoint file (e.g. one written by export_fp16).
+    """
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown Whisper quantization {quantize!r} (expected one of {', '.join(QUANTIZE_MODES)})")
+    import whisper
+
+    model = whisper.load_model(name, device="cpu", download_root=download_root)
+    model.eval()
+    if quantize == "int8":
+        model = quantize_int8(model)
+    return model
+
+
+def export_fp16(name, path, download_root=None):
+    """
+    Writes `name`'s weights as an fp16 checkpoint in Whisper's own format, loadable with
+    load_whisper_model(path): half the size of an fp32 (e.g. fine-tuned) checkpoint, and one
+    self-contained file to ship in models/. Weights are upcast to fp32 when loaded on CPU.
+    Word-level timestamps need the alignment heads of a named model and aren't kept.
+    """
+    import torch
+    import whisper
+
+    model = whisper.load_model(name, device="cpu", download_root=download_root)
+    state = {k: v.half() if v.is_floating_point() else v for k, v in model.state_dict().items()}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save({"dims": model.dims.__dict__, "model_state_dict": state}, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a Whisper model as an fp16 checkpoint")
+    parser.add_argument("name", help="model size or checkpoint path")
+    parser.add_argument("output", help="e.g. models/whisper/base-fp16.pt")
+    parser.add_argument("--download-root", default=None)
+    args = parser.parse_args()
+    path = export_fp16(args.name, args.output, args.download_root)
+    print(f"💾 Wrote {path} ({os.path.getsize(path) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
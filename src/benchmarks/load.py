@@ -0,0 +1,190 @@
+import io
+import os
+import sys
+import time
+import socket
+import tempfile
+import itertools
+import threading
+import subprocess
+import numpy as np
+import requests
+
+from src.benchmarks.results import latency_summary
+from src.utils.stub_upstreams import start_stub_server
+
+# HTTP load generator: a closed loop of `concurrency` clients, each sending its next request as
+# soon as the previous one returns, for `duration` seconds per (scenario, concurrency) pair.
+# By default it boots the API (src/api/app.py) in a subprocess with OpenRouter/ElevenLabs pointed
+# at the local stub server; pass a URL to load-test an API that is already running instead.
+CONCURRENCY = (1, 8, 32)
+DURATION_SECONDS = 10.0
+WARMUP_SECONDS = 1.0
+BOOT_TIMEOUT_SECONDS = 120.0
+SCENARIOS = ("predict", "predict_whatif", "predict_batch", "forecast", "analyze", "analyze_cached",
+             "tts", "tts_cached")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _small_jpeg():
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def _varieties(base_url):
+    """(Commodity, Variety) pairs the API has forecasts for, to spread /predict traffic over."""
+    try:
+        r = requests.get(f"{base_url}/forecast", timeout=10)
+        if r.ok:
+            return [(f["Commodity"], f["Variety"]) for f in r.json()["forecasts"]]
+    except requests.RequestException:
+        pass
+    return []
+
+
+def build_scenarios(base_url):
+    """name -> make_request(session, i): one request per call; `i` is unique across all clients."""
+    varieties = _varieties(base_url) or [("Onion", "Red")]
+    image = _small_jpeg()
+
+    def pick(i):
+        commodity, variety = varieties[i % len(varieties)]
+        return {"Commodity": commodity, "Variety": variety}
+
+    def analyze(session, prompt):
+        return session.post(f"{base_url}/assistant/analyze", data={"prompt": prompt, "language": "en"},
+                            files={"image": ("leaf.jpg", image, "image/jpeg")})
+
+    return {
+        # Served from the precomputed forecast table
+        "predict": lambda s, i: s.post(f"{base_url}/predict", json=pick(i)),
+        # Explicit inputs: store fill + encode + model on every call
+        "predict_whatif": lambda s, i: s.post(f"{base_url}/predict", json={**pick(i), "Arrival_1DayAgo": 50.0 + i % 100}),
+        "predict_batch": lambda s, i: s.post(f"{base_url}/predict/batch", json=[pick(i + k) for k in range(100)]),
+        "forecast": lambda s, i: s.get(f"{base_url}/forecast", params=dict(zip(("commodity", "variety"),
+                                                                              varieties[i % len(varieties)]))),
+        # Unique prompts miss the vision cache and go to the (stub) upstream; a fixed one hits it
+        "analyze": lambda s, i: analyze(s, f"What is wrong with this leaf? #{i}"),
+        "analyze_cached": lambda s, i: analyze(s, "What is wrong with this leaf?"),
+        "tts": lambda s, i: s.post(f"{base_url}/assistant/text-to-speech",
+                                   json={"text": f"Onion prices will rise tomorrow. #{i}", "language": "en"}),
+        "tts_cached": lambda s, i: s.post(f"{base_url}/assistant/text-to-speech",
+                                          json={"text": "Onion prices will rise tomorrow.", "language": "en"}),
+    }
+
+
+def run_level(make_request, concurrency, duration=DURATION_SECONDS, warmup=WARMUP_SECONDS):
+    """Closed-loop load at one concurrency level; returns latency percentiles, throughput and errors."""
+    counter = itertools.count()
+    latencies, errors, lock = [], [0], threading.Lock()
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def client():
+        session = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                r = make_request(session, next(counter))
+                _ = r.content  # read streamed bodies to the end
+                ok = r.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if measuring.is_set():
+                with lock:
+                    latencies.append(elapsed)
+                    errors[0] += not ok
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    measuring.set()
+    start = time.perf_counter()
+    time.sleep(duration)
+    measuring.clear()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in threads:
+        t.join(timeout=30)
+
+    n = len(latencies)
+    return {**latency_summary(latencies), "requests": n, "requests_per_second": n / elapsed,
+            "errors": errors[0], "error_rate": errors[0] / n if n else 1.0, "concurrency": concurrency}
+
+
+class ApiServer:
+    """src/api/app.py in a subprocess on a free port, with upstreams pointed at a local stub server."""
+
+    def __init__(self, stub_latency=0.05, token_delay=0.005, env=None):
+        self.stub, stub_url = start_stub_server(latency=stub_latency, token_delay=token_delay)
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._tmp = tempfile.TemporaryDirectory(prefix="bench-api-")
+        self.env = {**os.environ,
+                    "PORT": str(self.port),
+                    "OPENROUTER_BASE_URL": f"{stub_url}/api/v1",
+                    "ELEVENLABS_BASE_URL": f"{stub_url}/v1",
+                    "OPENROUTER_API_KEY": "bench", "ELEVENLABS_API_KEY": "bench",
+                    "PRELOAD_COMPONENTS": "price_model",
+                    "MODEL_POLL_SECONDS": "0",
+                    "TTS_CACHE_DIR": os.path.join(self._tmp.name, "tts"),
+                    **(env or {})}
+        self.proc = None
+
+    def __enter__(self):
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+        self.proc = subprocess.Popen([sys.executable, os.path.join(root, "src", "api", "app.py")], cwd=root,
+                                     env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + BOOT_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"API exited with code {self.proc.returncode} during startup")
+            try:
+                if requests.get(f"{self.url}/readyz", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"API not ready after {BOOT_TIMEOUT_SECONDS:.0f}s")
+
+    def __exit__(self, *exc):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.stub.shutdown()
+        self._tmp.cleanup()
+
+
+def run(scenarios=SCENARIOS, concurrency=CONCURRENCY, duration=DURATION_SECONDS, url=None, stub_latency=0.05):
+    """Returns {"load.<scenario>.c<N>": metrics}. Starts its own API + stubs unless `url` is given."""
+    def measure(base_url):
+        available = build_scenarios(base_url)
+        results = {}
+        for name in scenarios:
+            for level in concurrency:
+                result = run_level(available[name], level, duration)
+                results[f"load.{name}.c{level}"] = result
+                print(f"🌐 {name:<15} c={level:<3} {result['requests_per_second']:8.1f} req/s  "
+                      f"p50 {result.get('p50_ms', 0):7.1f}ms  p95 {result.get('p95_ms', 0):7.1f}ms  "
+                      f"p99 {result.get('p99_ms', 0):7.1f}ms  errors {result['errors']}")
+        return results
+
+    if url:
+        return measure(url.rstrip("/"))
+    with ApiServer(stub_latency=stub_latency) as server:
+        print(f"🌐 API on {server.url} (upstream stub latency {stub_latency * 1000:.0f}ms)")
+        return measure(server.url)
@@ -0,0 +1,106 @@
+import os
+import time
+import tempfile
+import numpy as np
+import lightgbm as lgb
+
+from src.benchmarks.synthetic import history_frame
+from src.features.transform import FeatureTransformer, CAT_COLS, ENCODED_COLS
+from src.features.feature_store import build_training_table, build_online_store, load_feature_store
+from src.models.tree_predictor import export_tree_tables, load_tree_model
+
+# In-process micro-benchmarks of the /predict building blocks: feature building (offline table and
+# online store), encoding (single row and batch) and model.predict (LightGBM vs. the NumPy tree
+# predictor), all on synthetic history so they run without the pipeline's artifacts.
+HISTORY_ROWS = 100_000
+BATCH_ROWS = 10_000
+N_ESTIMATORS = 300
+ROUNDS = 5
+
+
+def time_calls(fn, repeat, warmup=3):
+    """Per-call durations (seconds) of `repeat` calls after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    out = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        out[i] = time.perf_counter() - start
+    return out
+
+
+def _bench(fn, repeat, rows=None, rounds=ROUNDS):
+    """
+    Best of `rounds` rounds (like timeit): the lowest per-round median and p95 in ms. Slower rounds
+    measure whatever else the machine was doing, which is what makes run-to-run comparisons noisy.
+    """
+    per_round = max(1, -(-repeat // rounds))
+    samples = [time_calls(fn, per_round, warmup=1 if r else 3) * 1000 for r in range(rounds)]
+    p50 = min(float(np.median(s)) for s in samples)
+    result = {"p50_ms": p50, "p95_ms": min(float(np.percentile(s, 95)) for s in samples),
+              "calls": per_round * rounds}
+    if rows:
+        result["rows"] = rows
+        result["rows_per_second"] = rows / (p50 / 1000)
+    return result
+
+
+def run(history_rows=HISTORY_ROWS, batch_rows=BATCH_ROWS, repeat=200, seed=0):
+    """Returns {benchmark name: metrics}."""
+    results = {}
+    history = history_frame(history_rows, seed)
+    print(f"🔬 Micro-benchmarks on {len(history):,} synthetic history rows")
+
+    results["features.training_table"] = _bench(lambda: build_training_table(history), max(5, repeat // 40),
+                                                 rows=len(history))
+    table = build_training_table(history)
+    maps = {col: {label: i for i, label in enumerate(sorted(history[col].astype(str).unique()))} for col in CAT_COLS}
+    transformer = FeatureTransformer(maps)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "feature_store.npz")
+        results["features.online_store"] = _bench(lambda: build_online_store(history, store_path),
+                                                  max(5, repeat // 40), rows=len(history))
+        store = load_feature_store(store_path)
+        keys = [(c, v) for _, c, v in store.keys]
+        rng = np.random.default_rng(seed)
+        requests = [{"Commodity": c, "Variety": v} for c, v in (keys[i] for i in rng.integers(0, len(keys), 1000))]
+        it = iter(range(10 ** 9))
+
+        def fill_one():
+            return store.fill(requests[next(it) % len(requests)])
+        results["encoding.store_fill"] = _bench(fill_one, repeat * 5)
+
+        filled = [store.fill(r) for r in requests]
+        row = transformer.empty()
+        results["encoding.transform_row"] = _bench(
+            lambda: transformer.transform_row(filled[next(it) % len(filled)], out=row), repeat * 5)
+        batch = table.sample(min(batch_rows, len(table)), replace=len(table) < batch_rows, random_state=seed)
+        results["encoding.transform_frame"] = _bench(lambda: transformer.transform_frame(batch), max(10, repeat // 10),
+                                                     rows=len(batch))
+
+        X = transformer.transform_frame(table)
+        model = lgb.LGBMRegressor(n_estimators=N_ESTIMATORS, learning_rate=0.05, num_leaves=31, verbose=-1,
+                                  random_state=seed)
+        model.fit(transformer.to_frame(X), table['Price_Today'], categorical_feature=ENCODED_COLS)
+        tree_path = os.path.join(tmp, "model.npz")
+        export_tree_tables(model, tree_path)
+        predictor = load_tree_model(tree_path)
+
+        single = X[:1]
+        X_batch = transformer.transform_frame(batch)
+        results["predict.lightgbm_single"] = _bench(lambda: model.predict(single), repeat)
+        results["predict.numpy_single"] = _bench(lambda: predictor.predict(single), repeat)
+        results["predict.lightgbm_batch"] = _bench(lambda: model.predict(X_batch), max(10, repeat // 10),
+                                                   rows=len(X_batch))
+        results["predict.numpy_batch"] = _bench(lambda: predictor.predict(X_batch), max(10, repeat // 10),
+                                                rows=len(X_batch))
+
+        # The whole /predict compute path minus HTTP: store fill + encode + NumPy predict
+        def predict_path():
+            record = store.fill(requests[next(it) % len(requests)])
+            transformer.transform_row(record, out=row)
+            return predictor.predict(row.reshape(1, -1))
+        results["predict.end_to_end_single"] = _bench(predict_path, repeat)
+    return results
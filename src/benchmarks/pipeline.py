@@ -0,0 +1,71 @@
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+
+from src.benchmarks import synthetic
+
+# Stage timings of the daily pipeline on synthetic Agmarknet-shaped raw CSVs. Each size runs in
+# its own scratch directory (the stages use project-relative paths): a cold run over the whole
+# history, then one new daily report to time the incremental path the scheduler normally takes.
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+STAGES = ("clean", "features", "train", "forecast")
+
+
+@contextmanager
+def _scratch_project():
+    """Runs the block inside an empty project directory with its own (file-based) MLflow store."""
+    cwd = os.getcwd()
+    overrides = {"MLFLOW_ALLOW_FILE_STORE": "true"}
+    saved = {key: os.environ.get(key) for key in ("MLFLOW_TRACKING_URI", *overrides)}
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+        os.chdir(tmp)
+        os.environ.update(overrides, MLFLOW_TRACKING_URI=f"file://{os.path.join(tmp, 'mlruns')}")
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def _stage_functions():
+    # Imported lazily: train pulls in mlflow and lightgbm
+    from src.data.preprocess import clean_data
+    from src.features.build_features import build_features
+    from src.models.train import train
+    from src.models.forecast import build_forecast
+    return {"clean": clean_data, "features": build_features,
+            "train": lambda: train(incremental_mode=True), "forecast": build_forecast}
+
+
+def _time_stages(funcs, stages, prefix, rows, results):
+    for name in stages:
+        start = time.perf_counter()
+        ok = funcs[name]()
+        seconds = time.perf_counter() - start
+        results[f"pipeline.{prefix}.{name}"] = {"seconds": seconds, "rows": rows, "rows_per_second": rows / seconds,
+                                                "failed": ok is False}
+        print(f"⏱️  {prefix} {name}: {seconds:.2f}s{' (FAILED)' if ok is False else ''}")
+
+
+def run(sizes=SIZES, stages=STAGES, seed=0):
+    """Returns {"pipeline.<rows>.<stage>": metrics, "pipeline.<rows>_daily.<stage>": metrics}."""
+    funcs = _stage_functions()
+    results = {}
+    for n_rows in sizes:
+        varieties, days = synthetic.shape_for(n_rows)
+        print(f"\n🚜 Pipeline on {n_rows:,} raw rows ({varieties} varieties x {days} daily reports)")
+        with _scratch_project():
+            start = time.perf_counter()
+            synthetic.write_raw_reports("data/raw", n_rows, seed)
+            results[f"pipeline.{n_rows}.generate"] = {"seconds": time.perf_counter() - start, "rows": n_rows}
+            _time_stages(funcs, stages, n_rows, n_rows, results)
+
+            # One more day on top of the cold run
+            synthetic.write_raw_reports("data/raw", n_rows, seed, next_day=True)
+            _time_stages(funcs, stages, f"{n_rows}_daily", varieties, results)
+    return results
@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+import numpy as np
+
+RESULTS_DIR = "data/benchmarks"
+REGRESSION_THRESHOLD = 0.10  # relative change that counts as a regression
+# Metric direction by name: *_ms / *_seconds / *_mb / error_rate lower is better, *_per_second higher.
+# Anything else (counts, sizes) is recorded but not compared, and so are maxima (one slow sample).
+LOWER_IS_BETTER = ("_ms", "_seconds", "_mb", "error_rate")
+HIGHER_IS_BETTER = ("_per_second",)
+# Below these the difference is noise (timer resolution, scheduler jitter), whatever the ratio
+ABSOLUTE_FLOOR = {"_ms": 0.05, "_seconds": 0.01, "_mb": 5.0, "error_rate": 0.001, "_per_second": 1.0}
+
+
+def latency_summary(seconds, prefix=""):
+    """p50/p95/p99/mean/max in ms of a list of durations in seconds."""
+    a = np.asarray(seconds, dtype=np.float64) * 1000
+    if not len(a):
+        return {}
+    return {f"{prefix}p50_ms": float(np.percentile(a, 50)), f"{prefix}p95_ms": float(np.percentile(a, 95)),
+            f"{prefix}p99_ms": float(np.percentile(a, 99)), f"{prefix}mean_ms": float(a.mean()),
+            f"{prefix}max_ms": float(a.max())}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {"git_commit": _git_commit(), "python": sys.version.split()[0], "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__}
+
+
+def save_results(results, path=None, options=None):
+    """Writes {"created_at", "environment", "options", "results": {name: {metric: value}}}; returns the path."""
+    created = datetime.now(timezone.utc)
+    path = path or os.path.join(RESULTS_DIR, f"results-{created.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"created_at": created.isoformat(timespec="seconds"), "environment": environment(),
+                   "options": options or {}, "results": results}, f, indent=2, sort_keys=True, default=str)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _direction(metric):
+    if metric.endswith("max_ms"):
+        return 0
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def _floor(metric):
+    return next((v for suffix, v in ABSOLUTE_FLOOR.items() if metric.endswith(suffix)), 0.0)
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Every comparable metric present in both runs: [{benchmark, metric, baseline, current, change,
+    status}] where change is relative (positive = worse) and status is regression/improvement/ok.
+    """
+    rows = []
+    base_results, cur_results = baseline["results"], current["results"]
+    for name in sorted(set(base_results) & set(cur_results)):
+        for metric in sorted(set(base_results[name]) & set(cur_results[name])):
+            direction = _direction(metric)
+            old, new = base_results[name][metric], cur_results[name][metric]
+            if not direction or not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+                continue
+            worse_by = (old - new) if direction > 0 else (new - old)
+            change = worse_by / abs(old) if old else (np.inf if worse_by > 0 else 0.0)
+            significant = abs(worse_by) > _floor(metric)
+            status = "ok"
+            if significant and change > threshold:
+                status = "regression"
+            elif significant and change < -threshold:
+                status = "improvement"
+            rows.append({"benchmark": name, "metric": metric, "baseline": old, "current": new,
+                         "change": float(change), "status": status})
+    return rows
+
+
+def print_comparison(rows, only_changes=False):
+    marks = {"regression": "❌", "improvement": "✅", "ok": "  "}
+    for r in rows:
+        if only_changes and r["status"] == "ok":
+            continue
+        if not np.isfinite(r["change"]):
+            change = "(was 0)"
+        elif r["change"]:
+            change = f"({abs(r['change']):.1%} {'worse' if r['change'] > 0 else 'better'})"
+        else:
+            change = ""
+        print(f"{marks[r['status']]} {r['benchmark']:<34} {r['metric']:<22} "
+              f"{r['baseline']:>12.4g} -> {r['current']:<12.4g} {change}")
@@ -0,0 +1,82 @@
+import os
+import sys
+import argparse
+
+# Add project root to python path so we can import from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.benchmarks.results import save_results, load_results, compare_results, print_comparison, REGRESSION_THRESHOLD
+
+SUITES = ("micro", "load", "pipeline")
+
+
+def _ints(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def run_suites(args):
+    results = {}
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Unknown suite(s): {', '.join(sorted(unknown))} (choose from {', '.join(SUITES)})")
+    if "micro" in suites:
+        from src.benchmarks import micro
+        results.update(micro.run(history_rows=args.history_rows, repeat=args.repeat))
+    if "load" in suites:
+        from src.benchmarks import load
+        scenarios = [s for s in args.scenarios.split(",") if s] if args.scenarios else load.SCENARIOS
+        results.update(load.run(scenarios, _ints(args.concurrency), args.duration, args.url, args.stub_latency))
+    if "pipeline" in suites:
+        from src.benchmarks import pipeline
+        results.update(pipeline.run(_ints(args.sizes)))
+    path = save_results(results, args.out, options=vars(args))
+    print(f"\n📝 {len(results)} benchmark results written to {path}")
+    if args.baseline:
+        return compare(args.baseline, path, args.threshold)
+    return 0
+
+
+def compare(baseline_path, current_path, threshold=REGRESSION_THRESHOLD, show_all=False):
+    rows = compare_results(load_results(baseline_path), load_results(current_path), threshold)
+    print(f"\n⚖️  {current_path} vs. {baseline_path} (threshold {threshold:.0%})")
+    print_comparison(rows, only_changes=not show_all)
+    regressions = [r for r in rows if r["status"] == "regression"]
+    improvements = sum(r["status"] == "improvement" for r in rows)
+    print(f"{'❌' if regressions else '✅'} {len(regressions)} regression(s), {improvements} improvement(s) "
+          f"across {len(rows)} metrics")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite: micro-benchmarks, HTTP load and pipeline stages")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run benchmark suites and save the results as JSON")
+    run.add_argument("--suites", default=",".join(SUITES), help="comma-separated: micro,load,pipeline")
+    run.add_argument("--out", default=None, help="results file (default: data/benchmarks/results-<time>.json)")
+    run.add_argument("--baseline", default=None, help="compare against this results file afterwards")
+    run.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    run.add_argument("--history-rows", type=int, default=100_000, help="micro: synthetic history size")
+    run.add_argument("--repeat", type=int, default=200, help="micro: calls per single-row benchmark")
+    run.add_argument("--scenarios", default=None, help="load: comma-separated scenarios (default: all)")
+    run.add_argument("--concurrency", default="1,8,32", help="load: comma-separated concurrency levels")
+    run.add_argument("--duration", type=float, default=10.0, help="load: seconds per scenario and level")
+    run.add_argument("--url", default=None, help="load: test a running API instead of starting one")
+    run.add_argument("--stub-latency", type=float, default=0.05, help="load: stub upstream latency (s)")
+    run.add_argument("--sizes", default="1000,10000,100000,1000000", help="pipeline: raw rows per run")
+
+    cmp = sub.add_parser("compare", help="flag regressions between two results files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    cmp.add_argument("--all", action="store_true", help="also list unchanged metrics")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        sys.exit(run_suites(args))
+    sys.exit(compare(args.baseline, args.current, args.threshold, args.all))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import math
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+from src.data.history import write_raw_report, SNAPSHOT_COLS, PRICE_COLS, ARRIVAL_COLS
+
+# Agmarknet-shaped data of any size: one raw report per day, one row per variety, prices following
+# a per-variety random walk around a base price. Sizes are total raw rows, split into
+# ~sqrt(rows) varieties x ~sqrt(rows) daily reports (1k rows: 50 x 20, 1M rows: 1000 x 1000).
+GROUPS = ["Cereals", "Pulses", "Oil Seeds", "Vegetables", "Fruits", "Spices", "Fibre Crops"]
+VARIETIES_PER_COMMODITY = 5
+START_DATE = date(2023, 1, 1)
+
+
+def shape_for(n_rows, min_varieties=50, max_varieties=5000):
+    """(varieties, days) with varieties * days ~= n_rows."""
+    varieties = int(min(max_varieties, max(min_varieties, math.isqrt(n_rows))))
+    return varieties, max(3, -(-n_rows // varieties))
+
+
+def variety_keys(n_varieties):
+    rows = []
+    for k in range(n_varieties):
+        commodity = k // VARIETIES_PER_COMMODITY
+        rows.append((GROUPS[commodity % len(GROUPS)], f"Commodity {commodity:04d}", f"Variety {k % VARIETIES_PER_COMMODITY}"))
+    return pd.DataFrame(rows, columns=SNAPSHOT_COLS[:3])
+
+
+def daily_panels(n_varieties, n_days, seed=0, missing=0.05):
+    """(price, arrival, msp) with price/arrival as (n_days, n_varieties) matrices, ~`missing` of cells NaN."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(800, 9000, n_varieties)
+    walk = np.cumsum(rng.normal(0, 0.02, (n_days, n_varieties)), axis=0)
+    price = base * np.exp(walk - walk.mean(axis=0))
+    arrival = rng.gamma(2.0, 40.0, (n_days, n_varieties))
+    price[rng.random(price.shape) < missing] = np.nan
+    arrival[rng.random(arrival.shape) < missing] = np.nan
+    msp = np.where(rng.random(n_varieties) < 0.3, np.round(base * 0.9, -1), np.nan)
+    return price, arrival, msp
+
+
+def write_raw_reports(out_dir, n_rows, seed=0, next_day=False):
+    """
+    Writes daily raw CSVs totalling ~n_rows rows; returns the list of paths. With next_day, writes
+    only the report for the day after those (same varieties and price walks), i.e. a daily update.
+    """
+    n_varieties, n_days = shape_for(n_rows)
+    keys = variety_keys(n_varieties)
+    # Two leading days for the first report's lags, one trailing day for next_day
+    price, arrival, msp = daily_panels(n_varieties, n_days + 3, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for d in [n_days + 2] if next_day else range(2, n_days + 2):
+        report_day = START_DATE + timedelta(days=d)
+        df = keys.copy()
+        df['MSP'] = msp
+        for lag, (p_col, a_col) in enumerate(zip(PRICE_COLS, ARRIVAL_COLS)):
+            df[p_col] = np.round(price[d - lag], 2)
+            df[a_col] = np.round(arrival[d - lag], 2)
+        path = os.path.join(out_dir, f"agmarknet_{report_day.isoformat()}.csv")
+        write_raw_report(df, [report_day - timedelta(days=lag) for lag in range(len(PRICE_COLS))], path)
+        paths.append(path)
+    return paths
+
+
+def history_frame(n_rows, seed=0):
+    """The long history (what read_history returns) for ~n_rows (day, variety) observations, without CSVs."""
+    n_varieties, n_days = shape_for(n_rows)
+    keys = variety_keys(n_varieties)
+    price, arrival, msp = daily_panels(n_varieties, n_days, seed)
+    days = pd.date_range(pd.Timestamp(START_DATE), periods=n_days, freq='D')
+    frame = pd.DataFrame({
+        'Date': np.repeat(days.to_numpy(), n_varieties),
+        **{col: np.tile(keys[col].to_numpy(), n_days) for col in keys.columns},
+        'MSP': np.tile(msp, n_days),
+        'Price': price.ravel(),
+        'Arrival': arrival.ravel(),
+    })
+    return frame.dropna(subset=['Price', 'Arrival'], how='all').reset_index(drop=True)
@@ -0,0 +1,246 @@
+"""
+Concurrent multi-date backfill of Agmarknet reports.
+
+    python src/data/backfill.py --start 2025-01-01 --end 2025-12-31 --groups Cereals,Pulses --contexts 4
+
+One headless Chromium is shared by a bounded pool of browser contexts; each (date, group) task
+runs in whichever context is free. Finished tasks are recorded in a checkpoint, so an interrupted
+run resumes where it stopped. Output names depend only on (date, group), and files are renamed into
+place only once complete, so re-running never duplicates or half-writes a report.
+Use --base-url with src/utils/agmarknet_mirror.py to run against a local copy of the site.
+Like fetch_data.py this needs Playwright (pip install playwright && playwright install chromium).
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.data.history import parse_report_dates
+
+# CONFIG
+URL = "https://agmarknet.gov.in/"
+RAW_DATA_DIR = "data/raw"
+CHECKPOINT_PATH = os.path.join(RAW_DATA_DIR, ".backfill_checkpoint.json")
+ALL_GROUPS = "All Commodity Groups"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Page controls driven by the agent; override with --selectors file.json if the site changes
+DEFAULT_SELECTORS = {
+    "variety_dropdown": "#variety",
+    "individual_option": "text=Individual",
+    "date_input": "#date",
+    "group_select": "#group",
+    "go_button": "button:text-is('Go')",
+    "table_rows": "table tbody tr",
+    "download_button": "button[title='Download Report']",
+    "download_csv": "text=Download as CSV",
+}
+DATE_FORMAT = "%d-%m-%Y"
+
+
+class SiteConfig:
+    def __init__(self, base_url=URL, selectors=None, date_format=DATE_FORMAT, timeout_ms=60000, table_timeout_ms=30000):
+        self.base_url = base_url
+        self.selectors = {**DEFAULT_SELECTORS, **(selectors or {})}
+        self.date_format = date_format
+        self.timeout_ms = timeout_ms
+        self.table_timeout_ms = table_timeout_ms
+
+
+class BackfillTask:
+    def __init__(self, day, group):
+        self.day = day
+        self.group = group
+
+    @property
+    def id(self):
+        return f"{self.day.isoformat()}|{self.group}"
+
+    def output_path(self, raw_dir=RAW_DATA_DIR):
+        slug = re.sub(r"[^a-z0-9]+", "-", self.group.lower()).strip("-")
+        return os.path.join(raw_dir, f"agmarknet_{self.day.isoformat()}_{slug}.csv")
+
+
+class NoReportData(Exception):
+    """The site returned an empty report (market holiday / no arrivals); not worth retrying."""
+
+
+class Checkpoint:
+    """Per-task status in a JSON file, rewritten atomically after every finished task."""
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self.tasks = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.tasks = json.load(f).get("tasks", {})
+
+    def finished(self, task):
+        return self.tasks.get(task.id, {}).get("status") in ("done", "empty")
+
+    def record(self, task, **info):
+        self.tasks[task.id] = {**info, "updated_at": datetime.now().isoformat(timespec="seconds")}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"tasks": self.tasks}, f, indent=2, sort_keys=True)
+        os.replace(self.path + ".tmp", self.path)
+
+    def summary(self):
+        counts = {}
+        for info in self.tasks.values():
+            counts[info["status"]] = counts.get(info["status"], 0) + 1
+        return counts
+
+
+def plan_tasks(start, end, groups):
+    """Newest day first, so a partial run still covers the most useful recent history."""
+    days = [end - timedelta(days=i) for i in range((end - start).days + 1)]
+    return [BackfillTask(day, group) for day in days for group in groups]
+
+
+async def new_context(browser):
+    return await browser.new_context(user_agent=USER_AGENT, viewport={"width": 1366, "height": 768},
+                                     accept_downloads=True)
+
+
+async def fetch_report(context, site, task, path):
+    """Drives the report UI for one (date, group) and saves the CSV download to `path`."""
+    sel = site.selectors
+    page = await context.new_page()
+    page.set_default_timeout(site.timeout_ms)
+    page.on("dialog", lambda dialog: asyncio.ensure_future(dialog.accept()))
+    try:
+        await page.goto(site.base_url)
+        await page.wait_for_selector(sel["variety_dropdown"], state="visible")
+
+        await page.click(sel["variety_dropdown"])
+        await page.locator(sel["individual_option"]).first.click()
+        await page.keyboard.press("Escape")
+        await page.fill(sel["date_input"], task.day.strftime(site.date_format))
+        if task.group != ALL_GROUPS:
+            await page.select_option(sel["group_select"], label=task.group)
+        await page.click(sel["go_button"])
+
+        try:
+            await page.wait_for_selector(sel["table_rows"], timeout=site.table_timeout_ms)
+        except PlaywrightTimeout:
+            raise NoReportData(f"no table rows for {task.id}")
+
+        await page.click(sel["download_button"])
+        async with page.expect_download() as download_info:
+            await page.click(sel["download_csv"], force=True)
+        download = await download_info.value
+
+        part = path + ".part"
+        await download.save_as(part)
+        # Guard against the site silently ignoring the date filter
+        report_day = parse_report_dates(part)[0]
+        if report_day != task.day:
+            os.remove(part)
+            raise ValueError(f"asked for {task.day}, site returned the report for {report_day}")
+        os.replace(part, path)
+    finally:
+        await page.close()
+
+
+async def _worker(worker_id, browser, site, queue, checkpoint, raw_dir, retries):
+    context = await new_context(browser)
+    try:
+        while True:
+            try:
+                task = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            path = task.output_path(raw_dir)
+            for attempt in range(1, retries + 2):
+                start = time.perf_counter()
+                try:
+                    await fetch_report(context, site, task, path)
+                    checkpoint.record(task, status="done", path=path, attempts=attempt,
+                                      seconds=round(time.perf_counter() - start, 2))
+                    print(f"✅ [{worker_id}] {task.id} -> {path} ({time.perf_counter() - start:.1f}s)")
+                    break
+                except NoReportData:
+                    checkpoint.record(task, status="empty", attempts=attempt)
+                    print(f"💤 [{worker_id}] {task.id}: no data")
+                    break
+                except Exception as e:
+                    if attempt > retries:
+                        checkpoint.record(task, status="failed", attempts=attempt, error=str(e)[:300])
+                        print(f"❌ [{worker_id}] {task.id} failed after {attempt} attempts: {e}")
+                        break
+                    print(f"⚠️  [{worker_id}] {task.id} attempt {attempt} failed: {e}")
+                    # Fresh context: drops whatever state (dialogs, stuck menus) broke this attempt
+                    await context.close()
+                    context = await new_context(browser)
+                    await asyncio.sleep(min(30.0, 2.0 ** attempt) * random.uniform(0.5, 1.0))
+    finally:
+        await context.close()
+
+
+async def backfill(start, end, groups, site=None, contexts=4, retries=2, raw_dir=RAW_DATA_DIR,
+                   checkpoint_path=CHECKPOINT_PATH, headless=True):
+    """Fetches every (day, group) in [start, end] not already finished in the checkpoint."""
+    site = site or SiteConfig()
+    checkpoint = Checkpoint(checkpoint_path)
+    os.makedirs(raw_dir, exist_ok=True)
+
+    queue = asyncio.Queue()
+    pending = [t for t in plan_tasks(start, end, groups) if not checkpoint.finished(t)]
+    for task in pending:
+        queue.put_nowait(task)
+    print(f"🗓️  Backfill {start} .. {end}, {len(groups)} group(s): {len(pending)} task(s) to run, "
+          f"{contexts} context(s)")
+
+    started = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            workers = [_worker(i, browser, site, queue, checkpoint, raw_dir, retries)
+                       for i in range(min(contexts, len(pending)))]
+            await asyncio.gather(*workers)
+        finally:
+            await browser.close()
+
+    print(f"🏁 Backfill finished in {time.perf_counter() - started:.1f}s: {checkpoint.summary()}")
+    return checkpoint
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill Agmarknet reports over a date range")
+    parser.add_argument("--start", type=_parse_date, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=_parse_date, default=date.today(), help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--groups", default=ALL_GROUPS, help="comma-separated commodity groups")
+    parser.add_argument("--contexts", type=int, default=4, help="concurrent browser contexts")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--base-url", default=URL)
+    parser.add_argument("--selectors", help="JSON file overriding DEFAULT_SELECTORS")
+    parser.add_argument("--raw-dir", default=RAW_DATA_DIR)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--headful", action="store_true")
+    args = parser.parse_args()
+
+    selectors = None
+    if args.selectors:
+        with open(args.selectors) as f:
+            selectors = json.load(f)
+    groups = [g.strip() for g in args.groups.split(",") if g.strip()]
+    asyncio.run(backfill(args.start, args.end, groups, SiteConfig(args.base_url, selectors),
+                         contexts=args.contexts, retries=args.retries, raw_dir=args.raw_dir,
+                         checkpoint_path=args.checkpoint, headless=not args.headful))
+
+
+if __name__ == "__main__":
+    main()
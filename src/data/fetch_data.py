@@ -1,130 +1,249 @@
 import os
+import sys
 import time
 import re
+import argparse
 from datetime import datetime
+import pandas as pd
 from playwright.sync_api import sync_playwright
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.data.history import SNAPSHOT_COLS, write_raw_report
+
 # CONFIG
-URL = "https://agmarknet.gov.in/"
+URL = os.getenv("AGMARKNET_URL", "https://agmarknet.gov.in/")
 RAW_DATA_DIR = "data/raw"
 os.makedirs(RAW_DATA_DIR, exist_ok=True)
 
-def fetch_daily_data():
+# "fast": block non-essential resources and read the report straight from the XHR that fills
+# the table; "full": render everything and go through the UI download menu (also the fallback).
+# The pipeline always runs "full"; "fast" stays a CLI option until the XHR pattern and parser are
+# checked against a live capture (a HAR in tests/fixtures/agmarknet/, replayed by tests/test_fetch_data.py).
+FETCH_MODE = os.getenv("FETCH_MODE", "full")
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+BLOCKED_URL_PATTERN = re.compile(r"google-analytics|googletagmanager|doubleclick|facebook|hotjar|analytics\.js")
+# XHR that carries the report rows. The default URL and JSON shape are those of our local mirror
+# (src/utils/agmarknet_mirror.py), not yet confirmed against the live site: record one with
+#   python src/data/fetch_data.py --mode full --record-har tests/fixtures/agmarknet/<date>.har
+# and adjust this pattern and report_payload_to_snapshot to what it contains.
+REPORT_XHR_PATTERN = re.compile(os.getenv("AGMARKNET_REPORT_XHR", r"/api/report\b"))
+# The XHR fires right after "Go"; if it hasn't by then it isn't coming, so fall back quickly
+REPORT_XHR_TIMEOUT_MS = int(os.getenv("AGMARKNET_REPORT_XHR_TIMEOUT_MS", "5000"))
+REPORT_DATE_FORMAT = "%d-%m-%Y"
+
+
+def _block_non_essential(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_PATTERN.search(request.url):
+        return route.abort()
+    return route.continue_()
+
+
+def report_payload_to_snapshot(payload):
+    """
+    Report XHR JSON -> (wide snapshot frame, dates newest first), ready for write_raw_report.
+    Raises ValueError on an unexpected shape so the caller can fall back to the download path.
+    """
+    try:
+        dates = [datetime.strptime(d, REPORT_DATE_FORMAT).date() for d in payload["dates"]]
+        rows = [
+            [r["commodity_group"], r["commodity"], r["variety"], r.get("msp"), *r["prices"], *r["arrivals"]]
+            for r in payload["rows"]
+        ]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Unexpected report payload: {e!r}")
+    if len(dates) != 3 or not rows:
+        raise ValueError(f"Report payload has {len(dates)} dates and {len(rows)} rows")
+    df = pd.DataFrame(rows, columns=SNAPSHOT_COLS)
+    numeric = SNAPSHOT_COLS[3:]
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors='coerce')
+    return df, dates
+
+
+def _select_individual(page):
+    # ==========================================
+    # TASK 1: Select "Individual" in Variety Dropdown
+    # ==========================================
+    print("⚙️  Configuring filters: Variety -> Individual")
+    page.click("#variety")
+
+    # 1. Uncheck 'All' if needed (best effort)
+    try:
+        # Locator for 'All Varieties'.
+        all_var = page.locator("label").filter(has_text="All Varieties").first
+        # Find input
+        all_var_input = page.locator("input").filter(has=page.locator("xpath=..").filter(has_text="All Varieties")).first
+        # Simplification: just click label if checked?
+        # We skip unchecking 'All' specifically if we can't find it easily, 
+        # but 'Individual' tick is the priority. 
+        # Ideally selecting 'Individual' might auto-uncheck or we just live with it 
+        # (user said: "only tick-mark 'Individual'").
+        pass 
+    except:
+        pass
+
+    # 2. Check "Individual"
+    # Logic: Use text selector which works across tag types
+    try:
+        print("   Looking for 'Individual' option...")
+        individual_option = page.locator("text=Individual").first
+        individual_option.wait_for(state="visible", timeout=10000)
+        individual_option.click()
+        print("   Clicked 'Individual'.")
+    except Exception as e:
+        print(f"   Could not find 'Individual' option: {e}")
+        pass
+
+    # Close dropdown (press Escape)
+    page.keyboard.press("Escape")
+
+
+def _fetch_via_xhr(page, filename):
+    """Fast path: click Go, capture the report XHR and write it in the raw CSV layout (no download menu)."""
+    print("🚀 Clicking 'Go' and capturing the report response...")
+    with page.expect_response(lambda r: REPORT_XHR_PATTERN.search(r.url) and r.request.method in ("GET", "POST"),
+                              timeout=REPORT_XHR_TIMEOUT_MS) as response_info:
+        page.locator("button").filter(has_text=re.compile(r"^Go$")).click()
+    response = response_info.value
+    if not response.ok:
+        raise ValueError(f"Report request failed with HTTP {response.status}")
+    df, dates = report_payload_to_snapshot(response.json())
+    write_raw_report(df, dates, filename)
+    print(f"   Captured {len(df)} rows for {dates[0]}")
+
+
+def _fetch_via_download(page, filename):
+    """Full path: wait for the rendered table and save the CSV from the UI download menu."""
+    # ==========================================
+    # TASK 2: Click "Go" and Wait
+    # ==========================================
+    print("🚀 Clicking 'Go'...")
+    # The button has an aria-label "Apply filters..." which hides "Go" from get_by_role(name="Go").
+    # We use a text filter on the button element instead.
+    page.locator("button").filter(has_text=re.compile(r"^Go$")).click()
+
+    print("⏳ Waiting for data table generation...")
+    try:
+        page.wait_for_selector("table tbody tr", timeout=30000)
+        print("   Table generated.")
+    except:
+        print("⚠️  Timeout waiting for table (or no data found). Proceeding to check for download...")
+
+    # ==========================================
+    # TASK 3: Download CSV
+    # ==========================================
+    print("💾 Initiating download...")
+
+    # Locate the download button (Title="Download Report")
+    download_btn = page.locator("button[title='Download Report']")
+
+    if not download_btn.count():
+         print("   (Using fallback selector for download button)")
+         download_btn = page.locator("button:has(svg)").last 
+
+    # Handle potential confirmation dialogs
+    page.on("dialog", lambda dialog: dialog.accept())
+
+    # Trigger the download menu
+    download_btn.click()
+
+    # Wait for "Download as CSV" option and click it
+    with page.expect_download(timeout=60000) as download_info:
+        print("   Selecting 'Download as CSV'...")
+        # Use force=True to bypass overlapping checks if any
+        page.click("text=Download as CSV", force=True)
+
+    download = download_info.value
+
+    # Save file
+    download.save_as(filename)
+
+
+def fetch_daily_data(mode=FETCH_MODE, url=URL, har=None, record_har=None):
     """
     Acts as an in-house AI agent to fetch data from Agmarknet.
     Simulates human behavior to avoid bot detection and handle dynamic UI.
+    mode="fast" blocks images/fonts/styles/analytics and captures the report XHR directly,
+    falling back to the full UI download if that fails. `har` replays a recorded HAR instead of
+    the network (offline fixtures); `record_har` saves this run's traffic as a new fixture.
+    Returns {"path", "mode", "seconds"} or None on failure.
     """
+    started = time.perf_counter()
+    today = datetime.now().strftime("%Y-%m-%d")
+    filename = os.path.join(RAW_DATA_DIR, f"agmarknet_{today}.csv")
+    fast = mode == "fast"
+
     with sync_playwright() as p:
-        print("🕵️  Agent starting...")
+        print(f"🕵️  Agent starting ({mode} mode)...")
         # Launch browser. Headless=True for background execution.
-        browser = p.chromium.launch(headless=True, slow_mo=50) 
-        context = browser.new_context(
+        browser = p.chromium.launch(headless=True, slow_mo=0 if fast else 50)
+        context_args = dict(
             user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             viewport={"width": 1366, "height": 768}
         )
+        if record_har:
+            context_args.update(record_har_path=record_har, record_har_content="embed")
+        context = browser.new_context(**context_args)
+        if har:
+            context.route_from_har(har, not_found="abort")
+        elif fast:
+            context.route("**/*", _block_non_essential)
         page = context.new_page()
 
         try:
-            print(f"🌍 Navigating to {URL}...")
-            page.goto(URL, timeout=60000)
-            
+            print(f"🌍 Navigating to {url}...")
+            page.goto(url, timeout=60000, wait_until="domcontentloaded" if fast else "load")
+
             # Wait for the dashboard/dropdowns to interact
-            page.wait_for_load_state("networkidle")
+            if not fast:
+                page.wait_for_load_state("networkidle")
             page.wait_for_selector("#variety", state="visible", timeout=30000)
 
-            # ==========================================
-            # TASK 1: Select "Individual" in Variety Dropdown
-            # ==========================================
-            print("⚙️  Configuring filters: Variety -> Individual")
-            page.click("#variety")
-            
-            # 1. Uncheck 'All' if needed (best effort)
-            try:
-                # Locator for 'All Varieties'.
-                all_var = page.locator("label").filter(has_text="All Varieties").first
-                # Find input
-                all_var_input = page.locator("input").filter(has=page.locator("xpath=..").filter(has_text="All Varieties")).first
-                # Simplification: just click label if checked?
-                # We skip unchecking 'All' specifically if we can't find it easily, 
-                # but 'Individual' tick is the priority. 
-                # Ideally selecting 'Individual' might auto-uncheck or we just live with it 
-                # (user said: "only tick-mark 'Individual'").
-                pass 
-            except:
-                pass
-
-            # 2. Check "Individual"
-            # Logic: Use text selector which works across tag types
-            try:
-                print("   Looking for 'Individual' option...")
-                individual_option = page.locator("text=Individual").first
-                individual_option.wait_for(state="visible", timeout=10000)
-                individual_option.click()
-                print("   Clicked 'Individual'.")
-            except Exception as e:
-                print(f"   Could not find 'Individual' option: {e}")
-                pass
-
-            # Close dropdown (press Escape)
-            page.keyboard.press("Escape")
+            _select_individual(page)
 
-            # ==========================================
-            # TASK 2: Click "Go" and Wait
-            # ==========================================
-            print("🚀 Clicking 'Go'...")
-            # The button has an aria-label "Apply filters..." which hides "Go" from get_by_role(name="Go").
-            # We use a text filter on the button element instead.
-            page.locator("button").filter(has_text=re.compile(r"^Go$")).click()
+            used = mode
+            if fast:
+                try:
+                    _fetch_via_xhr(page, filename)
+                except Exception as e:
+                    print(f"⚠️  Fast path failed ({e}); falling back to the download menu")
+                    used = "full (fallback)"
+                    _fetch_via_download(page, filename)
+            else:
+                _fetch_via_download(page, filename)
 
-            print("⏳ Waiting for data table generation...")
-            try:
-                page.wait_for_selector("table tbody tr", timeout=30000)
-                print("   Table generated.")
-            except:
-                print("⚠️  Timeout waiting for table (or no data found). Proceeding to check for download...")
-
-            # ==========================================
-            # TASK 3: Download CSV
-            # ==========================================
-            print("💾 Initiating download...")
-            
-            # Locate the download button (Title="Download Report")
-            download_btn = page.locator("button[title='Download Report']")
-            
-            if not download_btn.count():
-                 print("   (Using fallback selector for download button)")
-                 download_btn = page.locator("button:has(svg)").last 
-            
-            # Handle potential confirmation dialogs
-            page.on("dialog", lambda dialog: dialog.accept())
-
-            # Trigger the download menu
-            download_btn.click()
-            
-            # Wait for "Download as CSV" option and click it
-            with page.expect_download(timeout=60000) as download_info:
-                print("   Selecting 'Download as CSV'...")
-                # Use force=True to bypass overlapping checks if any
-                page.click("text=Download as CSV", force=True)
-                
-            download = download_info.value
-            
-            # Save file
-            today = datetime.now().strftime("%Y-%m-%d")
-            filename = os.path.join(RAW_DATA_DIR, f"agmarknet_{today}.csv")
-            download.save_as(filename)
-            
-            print(f"✅ MISSION COMPLETE: Data saved to {filename}")
+            seconds = time.perf_counter() - started
+            print(f"✅ MISSION COMPLETE: Data saved to {filename} ({used}, {seconds:.1f}s)")
+            return {"path": filename, "mode": used, "seconds": round(seconds, 2)}
 
         except Exception as e:
-            print(f"❌ AGENT FAILURE: {e}")
+            print(f"❌ AGENT FAILURE: {e} (after {time.perf_counter() - started:.1f}s)")
             try:
                 page.screenshot(path="agent_error.png")
                 print("   Screenshot saved to agent_error.png")
             except:
                 pass
+            return None
         finally:
+            context.close()  # flushes record_har
             browser.close()
 
+def main():
+    parser = argparse.ArgumentParser(description="Fetch today's Agmarknet report")
+    parser.add_argument("--mode", choices=["fast", "full", "compare"], default=FETCH_MODE,
+                        help="compare runs both paths and prints their wall-clock times")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--har", help="replay a recorded HAR fixture instead of the network")
+    parser.add_argument("--record-har", help="record this run's traffic to a HAR fixture")
+    args = parser.parse_args()
+
+    if args.mode == "compare":
+        results = {m: fetch_daily_data(m, args.url, har=args.har) for m in ("full", "fast")}
+        for m, r in results.items():
+            print(f"⏱️  {m:>4}: " + (f"{r['seconds']:.2f}s ({r['mode']})" if r else "failed"))
+    else:
+        fetch_daily_data(args.mode, args.url, har=args.har, record_har=args.record_har)
+
 if __name__ == "__main__":
-    fetch_daily_data()
+    main()
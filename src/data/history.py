@@ -0,0 +1,265 @@
+import os
+import re
+import csv
+import json
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# CONFIG
+RAW_DIR = "data/raw"
+HISTORY_DIR = "data/history"
+MANIFEST_NAME = "manifest.json"
+PARTITION_FILE = "data.parquet"
+
+KEY_COLS = ['Commodity_Group', 'Commodity', 'Variety']
+SNAPSHOT_COLS = KEY_COLS + [
+    'MSP', 'Price_Today', 'Price_1DayAgo', 'Price_2DaysAgo',
+    'Arrival_Today', 'Arrival_1DayAgo', 'Arrival_2DaysAgo'
+]
+NUMERIC_COLS = SNAPSHOT_COLS[len(KEY_COLS):]
+PRICE_COLS = ['Price_Today', 'Price_1DayAgo', 'Price_2DaysAgo']
+ARRIVAL_COLS = ['Arrival_Today', 'Arrival_1DayAgo', 'Arrival_2DaysAgo']
+
+# One row per (Date, Commodity_Group, Commodity, Variety); Report_Date is the snapshot it came from
+HISTORY_SCHEMA = pa.schema([
+    ('Date', pa.date32()),
+    ('Commodity_Group', pa.string()),
+    ('Commodity', pa.string()),
+    ('Variety', pa.string()),
+    ('MSP', pa.float64()),
+    ('Price', pa.float64()),
+    ('Arrival', pa.float64()),
+    ('Report_Date', pa.date32()),
+    ('Source', pa.string()),
+])
+
+_HEADER_DATE = re.compile(r"(Price|Arrival) on (\d{1,2} \w{3}, \d{4})")
+_NA_VALUES = ['-', '--', 'NA', 'NR', '']
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_report_dates(path):
+    """
+    Reads the Agmarknet header rows ("Price on 30 Jan, 2026", ...) and returns the three
+    price dates, newest first. The first one is the report date of the snapshot.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next((row for _, row in zip(range(3), csv.reader(f)) if any(_HEADER_DATE.match(c.strip()) for c in row)), None)
+    if header is None:
+        raise ValueError(f"No 'Price on <date>' header row in {path}")
+    dates = [datetime.strptime(m.group(2), "%d %b, %Y").date()
+             for m in (_HEADER_DATE.match(c.strip()) for c in header) if m and m.group(1) == "Price"]
+    if len(dates) != len(PRICE_COLS):
+        raise ValueError(f"Expected {len(PRICE_COLS)} price dates in {path}, found {dates}")
+    return dates
+
+
+def read_snapshot(path):
+    """One raw report as a wide frame; numerics are parsed in the C reader (no per-column string passes)."""
+    dtypes = {col: str for col in KEY_COLS}
+    dtypes.update({col: np.float64 for col in NUMERIC_COLS})
+    read_opts = dict(skiprows=3, header=None, names=SNAPSHOT_COLS, usecols=range(len(SNAPSHOT_COLS)),
+                     na_values=_NA_VALUES, keep_default_na=False, thousands=',')
+    try:
+        df = pd.read_csv(path, dtype=dtypes, **read_opts)
+    except ValueError:
+        # Stray non-numeric cell somewhere: fall back to one coercing pass over the numeric block
+        df = pd.read_csv(path, dtype=str, **read_opts)
+        df[NUMERIC_COLS] = df[NUMERIC_COLS].apply(pd.to_numeric, errors='coerce')
+    return df.dropna(subset=KEY_COLS)
+
+
+def write_raw_report(df, dates, path_or_buf):
+    """
+    Writes a wide snapshot (SNAPSHOT_COLS) in Agmarknet's downloaded-CSV layout: two title rows,
+    then the dated header that parse_report_dates/read_snapshot expect. `dates` is newest first.
+    """
+    fmt = lambda d: d.strftime("%d %b, %Y")
+    blanks = [""] * len(SNAPSHOT_COLS)
+    title = blanks.copy()
+    title[5] = f"Marketwise Price & Arrival Report ({dates[0].strftime('%d-%m-%Y')})"
+    units = blanks.copy()
+    units[4], units[7] = "Price (Rs./Quintal)  ", "Arrival (Metric Tonnes)  "
+    header = ['Commodity Group', 'Commodity', 'Variety', f"MSP (Rs./Quintal) {dates[0].year}-{(dates[0].year + 1) % 100:02d}"] + \
+             [f"Price on {fmt(d)}" for d in dates] + [f"Arrival on {fmt(d)}" for d in dates]
+
+    body = df[SNAPSHOT_COLS].copy()
+    body[NUMERIC_COLS] = body[NUMERIC_COLS].apply(lambda s: s.map(lambda v: "-" if pd.isna(v) else f"{v:.2f}"))
+    close = False
+    if isinstance(path_or_buf, str):
+        path_or_buf, close = open(path_or_buf, "w", newline="", encoding="utf-8"), True
+    try:
+        writer = csv.writer(path_or_buf, lineterminator="\r\n")
+        writer.writerows([title, units, header])
+        writer.writerows(body.itertuples(index=False, name=None))
+    finally:
+        if close:
+            path_or_buf.close()
+
+
+def snapshot_to_long(df, dates, source):
+    """Wide snapshot (today / 1 day ago / 2 days ago) -> one row per day and variety."""
+    n = len(df)
+    long = pd.DataFrame({
+        'Date': np.repeat(np.array(dates, dtype='datetime64[D]'), n),
+        **{col: np.tile(df[col].to_numpy(), len(dates)) for col in KEY_COLS + ['MSP']},
+        'Price': np.concatenate([df[col].to_numpy() for col in PRICE_COLS]),
+        'Arrival': np.concatenate([df[col].to_numpy() for col in ARRIVAL_COLS]),
+    })
+    long['Report_Date'] = np.datetime64(dates[0], 'D')
+    long['Source'] = source
+    return _as_timestamps(long.dropna(subset=['Price', 'Arrival'], how='all'))
+
+
+def _as_timestamps(df):
+    # date32 columns come back as python dates; keep one datetime64[ns] unit throughout
+    return df.assign(**{col: pd.to_datetime(df[col]).astype('datetime64[ns]')
+                        for col in ('Date', 'Report_Date') if col in df.columns})
+
+
+def _partition_dir(store_dir, day):
+    return os.path.join(store_dir, f"date={pd.Timestamp(day).date().isoformat()}")
+
+
+def _to_table(df):
+    out = df.copy()
+    for col in ('Date', 'Report_Date'):
+        out[col] = pd.to_datetime(out[col]).dt.date
+    return pa.Table.from_pandas(out[HISTORY_SCHEMA.names], schema=HISTORY_SCHEMA, preserve_index=False)
+
+
+def _write_atomic(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def load_manifest(store_dir=HISTORY_DIR):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest, store_dir):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    os.makedirs(store_dir, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _merge_partition(store_dir, day, new_rows):
+    """Existing rows for `day` plus new ones; the newest report wins, ties go to the later ingest."""
+    path = os.path.join(_partition_dir(store_dir, day), PARTITION_FILE)
+    if os.path.exists(path):
+        existing = _as_timestamps(pq.read_table(path).to_pandas())
+        rows = pd.concat([existing, new_rows], ignore_index=True)
+    else:
+        rows = new_rows
+    rows = rows.sort_values('Report_Date', kind='stable').drop_duplicates(subset=KEY_COLS, keep='last')
+    _write_atomic(_to_table(rows.sort_values(KEY_COLS)), path)
+    return len(rows)
+
+
+def ingest_raw(raw_dir=RAW_DIR, store_dir=HISTORY_DIR):
+    """
+    Appends raw snapshots not yet in the manifest (by content hash) to the date-partitioned store.
+    Only the day partitions a new snapshot covers are read and rewritten, so a daily run costs
+    O(new data). Partitions are written before the manifest: a crash re-ingests the file next run.
+    Returns the list of newly ingested file names.
+    """
+    manifest = load_manifest(store_dir)
+    candidates = []
+    for path in sorted(os.listdir(raw_dir) if os.path.isdir(raw_dir) else []):
+        if not path.endswith(".csv"):
+            continue
+        full = os.path.join(raw_dir, path)
+        digest = file_sha256(full)
+        if digest in manifest["files"] or any(c[3] == digest for c in candidates):
+            continue  # already ingested, or a byte-identical copy under another name
+        try:
+            dates = parse_report_dates(full)
+        except ValueError as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        candidates.append((dates[0], path, full, digest, dates))
+
+    ingested = []
+    # Oldest report first, so a later report's revision of a shared day wins
+    for report_date, name, full, digest, dates in sorted(candidates):
+        long = snapshot_to_long(read_snapshot(full), dates, digest[:12])
+        for day, rows in long.groupby('Date', sort=True):
+            _merge_partition(store_dir, day, rows)
+        manifest["files"][digest] = {
+            "name": name,
+            "report_date": report_date.isoformat(),
+            "dates": [d.isoformat() for d in dates],
+            "rows": int(len(long)),
+            "ingested_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        _save_manifest(manifest, store_dir)
+        ingested.append(name)
+        print(f"📥 Ingested {name} (report {report_date}, {len(long)} rows)")
+    return ingested
+
+
+def list_partitions(store_dir=HISTORY_DIR):
+    """Sorted (date string, parquet path) pairs present in the store."""
+    if not os.path.isdir(store_dir):
+        return []
+    parts = []
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name, PARTITION_FILE)
+        if name.startswith("date=") and os.path.exists(path):
+            parts.append((name[5:], path))
+    return sorted(parts)
+
+
+def read_history(start=None, end=None, columns=None, store_dir=HISTORY_DIR):
+    """
+    Long-format history for start <= Date <= end (inclusive, dates or ISO strings).
+    Partitions outside the range are never opened.
+    """
+    start = pd.Timestamp(start).date().isoformat() if start is not None else None
+    end = pd.Timestamp(end).date().isoformat() if end is not None else None
+    paths = [path for day, path in list_partitions(store_dir)
+             if (start is None or day >= start) and (end is None or day <= end)]
+    if not paths:
+        return pd.DataFrame({name: pd.Series(dtype=object) for name in (columns or HISTORY_SCHEMA.names)})
+    table = pa.concat_tables([pq.read_table(path, columns=columns) for path in paths])
+    return _as_timestamps(table.to_pandas())
+
+
+def latest_snapshot(store_dir=HISTORY_DIR):
+    """
+    Newest report day in the wide raw-snapshot layout (Price_Today/1DayAgo/2DaysAgo, ...),
+    rebuilt from the last three day partitions only. Like the site's report, "N days ago" means
+    the Nth previous day with data, so a market holiday or a missed fetch doesn't leave a gap.
+    """
+    days = [day for day, _ in list_partitions(store_dir)][-len(PRICE_COLS):]
+    if not days:
+        return pd.DataFrame(columns=SNAPSHOT_COLS)
+    hist = read_history(days[0], days[-1], store_dir=store_dir)
+    rank = {pd.Timestamp(day): len(days) - 1 - i for i, day in enumerate(days)}
+    hist = hist.assign(_offset=hist['Date'].map(rank))
+
+    keys = hist[hist['_offset'] == 0][KEY_COLS + ['MSP']].drop_duplicates(KEY_COLS)
+    wide = hist.pivot(index=KEY_COLS, columns='_offset', values=['Price', 'Arrival'])
+    wide.columns = [(PRICE_COLS if kind == 'Price' else ARRIVAL_COLS)[off] for kind, off in wide.columns]
+    wide = wide.reindex(columns=PRICE_COLS + ARRIVAL_COLS)
+    out = keys.merge(wide.reset_index(), on=KEY_COLS, how='left')
+    return out[SNAPSHOT_COLS].reset_index(drop=True)
@@ -3,47 +3,39 @@ import numpy as np
 from sklearn.preprocessing import LabelEncoder
 import joblib
 import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.features.transform import CAT_COLS, FeatureTransformer, TRANSFORMER_PATH
+from src.features.feature_store import build_training_table, build_online_store, FEATURE_STORE_PATH
+from src.data.history import HISTORY_DIR, read_history
 
 # CONFIG
-INPUT_PATH = "data/processed/clean_data.csv"
 OUTPUT_PATH = "data/features/training_data.csv"
 ENCODER_PATH = "models/encoders.joblib"
 
 def build_features():
     print("🏗️  Building Features...")
     
-    if not os.path.exists(INPUT_PATH):
-        print(f"❌ Error: {INPUT_PATH} not found. Run preprocess first.")
-        return
-
     try:
-        df = pd.read_csv(INPUT_PATH)
-        
-        # --- 1. Feature Engineering ---
-        # Economic Signal: Is price above MSP?
-        if 'MSP' in df.columns and 'Price_Today' in df.columns:
-            df['msp_premium'] = df['Price_Today'] - df['MSP']
-        
-        # Momentum: Price change (Last Week vs Last Month proxies)
-        # Note: Depending on your raw data columns. 
-        # Using Price_1DayAgo and Price_2DaysAgo from your standardized schema:
-        if 'Price_1DayAgo' in df.columns and 'Price_2DaysAgo' in df.columns:
-            df['price_momentum'] = (df['Price_1DayAgo'] - df['Price_2DaysAgo']) / (df['Price_2DaysAgo'] + 1e-9)
-            
-            # Volatility (Std Dev of recent prices)
-            price_cols = ['Price_Today', 'Price_1DayAgo', 'Price_2DaysAgo']
-            df['price_volatility'] = df[price_cols].std(axis=1)
+        history = read_history(store_dir=HISTORY_DIR)
+        if history.empty:
+            print(f"❌ Error: no history in {HISTORY_DIR}. Run preprocess first.")
+            return False
 
-        # --- 2. Encoding & Saving Encoders ---
+        # One row per (day, variety) over the whole history, with lags and rolling windows
+        df = build_training_table(history)
+        
+        # --- 1. Encoding & Saving Encoders ---
         # This is the part we cannot skip. We must remember that "Gujarat" = 5.
         encoders = {}
-        cat_cols = ['Commodity_Group', 'Commodity', 'Variety']
-        
-        for col in cat_cols:
+        for col in CAT_COLS:
             if col in df.columns:
                 le = LabelEncoder()
-                # Convert to string to be safe, then encode
-                df[f'{col}_Encoded'] = le.fit_transform(df[col].astype(str))
+                # Convert to string to be safe, then fit
+                le.fit(history[col].astype(str))
                 # Store the encoder for later use in API
                 encoders[col] = le
         
@@ -52,17 +44,32 @@ def build_features():
         joblib.dump(encoders, ENCODER_PATH)
         print(f"💾 Encoders saved to {ENCODER_PATH}")
 
-        # --- 3. Final Prep ---
-        # Drop rows with NaNs (created by lag features)
-        df_final = df.dropna()
-        
-        # Save to features folder
+        # --- 2. Feature Engineering ---
+        # Same compiled transform the API uses, so training and serving can't skew.
+        # Note: msp_premium/volatility use yesterday's price; Price_Today is the target.
+        transformer = FeatureTransformer.from_encoders(encoders)
+        transformer.save(TRANSFORMER_PATH)
+        print(f"💾 Feature transformer saved to {TRANSFORMER_PATH}")
+
+        features = transformer.to_frame(transformer.transform_frame(df), index=df.index)
+        for col in transformer.feature_columns:
+            df[col] = features[col]
+
+        # --- 3. Online store for the API (features for the day after the latest report) ---
+        build_online_store(history, FEATURE_STORE_PATH)
+        print(f"💾 Online feature store saved to {FEATURE_STORE_PATH}")
+
+        # --- 4. Final Prep ---
+        # Rows without both price lags were already dropped; rolling windows may be NaN
+        # early in the history (LightGBM routes missing values itself)
         os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-        df_final.to_csv(OUTPUT_PATH, index=False)
-        print(f"✅ Features ready: {df_final.shape} rows saved to {OUTPUT_PATH}")
+        df.to_csv(OUTPUT_PATH, index=False)
+        print(f"✅ Features ready: {df.shape} rows saved to {OUTPUT_PATH}")
+        return True
 
     except Exception as e:
         print(f"❌ Failed to build features: {e}")
+        return False
 
 if __name__ == "__main__":
     build_features()
\ No newline at end of file
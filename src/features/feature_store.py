@@ -0,0 +1,192 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.features.transform import REQUIRED_INPUT_COLS, HISTORY_WINDOWS, PASSTHROUGH_COLS
+from src.models.tree_predictor import mmap_npz
+
+# Offline: rolling features over the daily history (src/data/history.py), one calendar-day panel
+# (days x varieties) so every window runs over all varieties at once.
+# Online: the feature row for the day after the latest report, per (Commodity, Variety).
+FEATURE_STORE_PATH = "models/feature_store.npz"
+KEY_COLS = ['Commodity_Group', 'Commodity', 'Variety']
+STORE_COLS = PASSTHROUGH_COLS
+
+
+def _rolling_sum(a, window):
+    """Sum over the trailing `window` rows (including the current one) along axis 0."""
+    c = np.cumsum(a, axis=0)
+    out = c.copy()
+    out[window:] -= c[:-window]
+    return out
+
+
+def _shift(a, n):
+    """Rows moved down by n days (row d holds day d - n); the first n rows become NaN."""
+    out = np.full_like(a, np.nan)
+    out[n:] = a[:-n]
+    return out
+
+
+def _window_stats(x, window, t):
+    """Mean, coefficient of variation and least-squares slope/mean of x over each trailing window, NaN-aware."""
+    mask = ~np.isnan(x)
+    xv = np.where(mask, x, 0.0)
+    tv = np.where(mask, t[:, None], 0.0)
+    n = _rolling_sum(mask.astype(np.float64), window)
+    s_x = _rolling_sum(xv, window)
+    s_xx = _rolling_sum(xv * xv, window)
+    s_t = _rolling_sum(tv, window)
+    s_tt = _rolling_sum(tv * tv, window)
+    s_tx = _rolling_sum(tv * xv, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, s_x / n, np.nan)
+        var = np.maximum(s_xx / n - mean * mean, 0.0)
+        cv = np.where(n > 1, np.sqrt(var) / mean, np.nan)
+        denom = n * s_tt - s_t * s_t
+        slope = np.where((n > 1) & (denom > 0), (n * s_tx - s_t * s_x) / denom, np.nan)
+        trend = slope / mean  # fractional change per day
+    return mean, cv, trend
+
+
+def daily_panel(history, through=None):
+    """
+    Scatters long history rows into (n_days, n_keys) float matrices on a continuous calendar.
+    `through` extends the calendar past the last observed day (e.g. to the day being predicted).
+    """
+    grouped = history.groupby(KEY_COLS, sort=True)
+    keys = grouped.size().index.to_frame(index=False)
+    key_idx = grouped.ngroup().to_numpy()
+    start = history['Date'].min()
+    end = history['Date'].max() if through is None else max(history['Date'].max(), pd.Timestamp(through))
+    days = pd.date_range(start, end, freq='D')
+    day_idx = (history['Date'] - start).dt.days.to_numpy()
+
+    panels = {}
+    for col in ('Price', 'Arrival', 'MSP'):
+        m = np.full((len(days), len(keys)), np.nan)
+        m[day_idx, key_idx] = history[col].to_numpy(dtype=np.float64)
+        panels[col] = m
+    # MSP is a season-level constant: carry the last announced value forward
+    panels['MSP'] = pd.DataFrame(panels['MSP']).ffill().to_numpy()
+    return days, keys, panels
+
+
+def feature_panels(days, panels):
+    """Every STORE_COLS feature as a (n_days, n_keys) matrix; row d only uses data up to d-1."""
+    price, arrival = panels['Price'], panels['Arrival']
+    past_price, past_arrival = _shift(price, 1), _shift(arrival, 1)
+    out = {
+        'MSP': panels['MSP'],
+        'Price_1DayAgo': past_price,
+        'Price_2DaysAgo': _shift(price, 2),
+        'Arrival_1DayAgo': past_arrival,
+        'Arrival_2DaysAgo': _shift(arrival, 2),
+    }
+    t = np.arange(len(days), dtype=np.float64)
+    for w in HISTORY_WINDOWS:
+        p_mean, p_cv, _ = _window_stats(past_price, w, t)
+        a_mean, _, a_trend = _window_stats(past_arrival, w, t)
+        out[f'price_mean_{w}d'] = p_mean
+        out[f'price_volatility_{w}d'] = p_cv
+        out[f'arrival_mean_{w}d'] = a_mean
+        out[f'arrival_trend_{w}d'] = a_trend
+    return out
+
+
+def build_training_table(history):
+    """One row per (Date, variety) with an observed price: keys, STORE_COLS features and Price_Today."""
+    days, keys, panels = daily_panel(history)
+    feats = feature_panels(days, panels)
+    d_idx, k_idx = np.nonzero(~np.isnan(panels['Price']))
+    table = keys.iloc[k_idx].reset_index(drop=True)
+    table.insert(0, 'Date', days[d_idx])
+    table['Price_Today'] = panels['Price'][d_idx, k_idx]
+    for col in STORE_COLS:
+        table[col] = feats[col][d_idx, k_idx]
+    return table.dropna(subset=REQUIRED_INPUT_COLS).reset_index(drop=True)
+
+
+def build_online_store(history, path=FEATURE_STORE_PATH):
+    """Writes the feature rows for the day after the latest observed day (what /predict forecasts)."""
+    last_day = history['Date'].max()
+    as_of = last_day + pd.Timedelta(days=1)
+    days, keys, panels = daily_panel(history, through=as_of)
+    feats = feature_panels(days, panels)
+    matrix = np.stack([feats[col][-1] for col in STORE_COLS], axis=1).astype(np.float32)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Uncompressed so the API can memory-map it
+    np.savez(path,
+             features=matrix,
+             columns=np.array(STORE_COLS),
+             keys=keys[KEY_COLS].to_numpy(dtype=str),
+             as_of=np.array([as_of.date().isoformat()]),
+             last_observed=np.array([last_day.date().isoformat()]))
+    return path
+
+
+class OnlineFeatureStore:
+    """Constant-time feature lookup by (Commodity, Variety) over the memory-mapped store matrix."""
+
+    def __init__(self, arrays):
+        self.features = arrays['features']
+        self.columns = [str(c) for c in arrays['columns']]
+        self.as_of = str(arrays['as_of'][0])
+        self.last_observed = str(arrays['last_observed'][0])
+        self.keys = keys = np.asarray(arrays['keys']).tolist()
+        self.groups = [group for group, _, _ in keys]
+        self._index = {(commodity, variety): i for i, (_, commodity, variety) in enumerate(keys)}
+        self._col = {col: i for i, col in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, commodity, variety):
+        """Row index for a variety, or None if it has no history."""
+        return self._index.get((str(commodity), str(variety)))
+
+    def fill(self, record):
+        """Copy of `record` with missing/None feature fields (and Commodity_Group) taken from the store."""
+        i = self.lookup(record.get('Commodity'), record.get('Variety'))
+        if i is None:
+            return record
+        filled = dict(record)
+        row = self.features[i].tolist()  # plain floats; per-element memmap access is slow
+        for col, j in self._col.items():
+            if filled.get(col) is None and row[j] == row[j]:  # skip NaN
+                filled[col] = row[j]
+        if filled.get('Commodity_Group') is None:
+            filled['Commodity_Group'] = self.groups[i]
+        return filled
+
+    def fill_frame(self, df):
+        """Vectorized fill for batches: NaN cells in store columns are replaced by the stored values."""
+        if 'Commodity' not in df.columns or 'Variety' not in df.columns:
+            return df
+        idx = np.array([self._index.get((str(c), str(v)), -1) for c, v in zip(df['Commodity'], df['Variety'])],
+                       dtype=np.intp)
+        hit = idx >= 0
+        if not hit.any():
+            return df
+        df = df.copy()
+        rows = np.asarray(self.features)[idx[hit]]
+        for col, j in self._col.items():
+            stored = np.full(len(df), np.nan)
+            stored[hit] = rows[:, j]
+            df[col] = df[col].where(df[col].notna(), stored) if col in df.columns else stored
+        if 'Commodity_Group' not in df.columns:
+            df['Commodity_Group'] = None
+        group_missing = hit & df['Commodity_Group'].isna().to_numpy()
+        df.loc[group_missing, 'Commodity_Group'] = [self.groups[i] for i in idx[group_missing]]
+        return df
+
+    def stats(self):
+        return {"keys": len(self), "as_of": self.as_of, "last_observed": self.last_observed}
+
+
+def load_feature_store(path=FEATURE_STORE_PATH, mmap=True):
+    if not os.path.exists(path):
+        return None
+    return OnlineFeatureStore(mmap_npz(path) if mmap else dict(np.load(path)))
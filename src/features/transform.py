@@ -0,0 +1,149 @@
+import os
+import numpy as np
+import pandas as pd
+import joblib
+
+# Shared feature schema. Training (build_features/train) and serving (src/api/app.py)
+# both go through FeatureTransformer so the column order and formulas can never drift.
+CAT_COLS = ['Commodity_Group', 'Commodity', 'Variety']
+NUMERIC_INPUT_COLS = ['MSP', 'Price_1DayAgo', 'Price_2DaysAgo',
+                      'Arrival_Today', 'Arrival_1DayAgo', 'Arrival_2DaysAgo']
+REQUIRED_INPUT_COLS = ['Price_1DayAgo', 'Price_2DaysAgo']
+# Trailing-window features over the daily history (src/features/feature_store.py), all from days before the target
+HISTORY_WINDOWS = (7, 14, 30)
+ROLLING_COLS = [f'{name}_{w}d' for name in ('price_mean', 'price_volatility', 'arrival_mean', 'arrival_trend')
+                for w in HISTORY_WINDOWS]
+# Same-day arrivals are never known for the day being forecast (the online store and forecast rows
+# leave them NaN), so current models don't train on them; the legacy layout still reads them
+SERVING_UNKNOWN_COLS = ['Arrival_Today']
+PASSTHROUGH_COLS = [col for col in NUMERIC_INPUT_COLS if col not in SERVING_UNKNOWN_COLS] + ROLLING_COLS
+DERIVED_COLS = ['msp_premium', 'price_momentum', 'price_volatility']
+# Integer category codes; the model treats these as LightGBM categorical features
+ENCODED_COLS = [f'{col}_Encoded' for col in CAT_COLS]
+FEATURE_COLUMNS = PASSTHROUGH_COLS + DERIVED_COLS + ENCODED_COLS
+# Layout of models trained before the rolling-window features (12 columns, encoders.joblib only)
+LEGACY_FEATURE_COLUMNS = NUMERIC_INPUT_COLS + DERIVED_COLS + ENCODED_COLS
+
+# Unknown-category policy: any label not seen during training (or missing) gets this code
+# (negative codes are 'missing' to LightGBM's categorical splits).
+UNKNOWN_CODE = -1
+
+TRANSFORMER_PATH = "models/feature_transformer.joblib"
+
+_SQRT2 = np.float32(np.sqrt(2.0))
+
+
+class FeatureTransformer:
+    """
+    Compiled feature transform: label->code dicts plus fixed column positions.
+    Writes features straight into float32 rows/matrices, no pandas on the single-row path.
+    """
+
+    def __init__(self, category_maps, unknown_code=UNKNOWN_CODE, feature_columns=FEATURE_COLUMNS):
+        self.category_maps = {col: dict(category_maps.get(col, {})) for col in CAT_COLS}
+        self.unknown_code = unknown_code
+        self.feature_columns = list(feature_columns)
+        self._index_columns()
+
+    def _index_columns(self):
+        self._idx = {col: i for i, col in enumerate(self.feature_columns)}
+        # Transformers pickled before a column existed keep their own (shorter) layout
+        self._passthrough = [col for col in NUMERIC_INPUT_COLS + ROLLING_COLS if col in self._idx]
+
+    @classmethod
+    def from_encoders(cls, encoders, unknown_code=UNKNOWN_CODE, feature_columns=FEATURE_COLUMNS):
+        """Builds the lookup dicts from the fitted LabelEncoders in models/encoders.joblib."""
+        maps = {col: {label: i for i, label in enumerate(le.classes_)} for col, le in encoders.items()}
+        return cls(maps, unknown_code=unknown_code, feature_columns=feature_columns)
+
+    @property
+    def n_features(self):
+        return len(self.feature_columns)
+
+    def empty(self, n_rows=None):
+        """Allocates an output row (n_rows=None) or matrix for transform_row/transform_frame."""
+        shape = (self.n_features,) if n_rows is None else (n_rows, self.n_features)
+        return np.empty(shape, dtype=np.float32)
+
+    def encode(self, col, label):
+        if label is None:
+            return self.unknown_code
+        return self.category_maps[col].get(str(label), self.unknown_code)
+
+    def transform_row(self, record, out=None):
+        """Featurizes one dict-like record into `out` (a float32 row). Missing numbers become NaN."""
+        if out is None:
+            out = self.empty()
+        idx = self._idx
+        for col in self._passthrough:
+            val = record.get(col)
+            out[idx[col]] = np.nan if val is None else float(val)
+
+        msp, p1, p2 = out[idx['MSP']], out[idx['Price_1DayAgo']], out[idx['Price_2DaysAgo']]
+        out[idx['msp_premium']] = p1 - msp
+        out[idx['price_momentum']] = (p1 - p2) / (p2 + 1e-9)
+        vol = abs(p1 - p2) / _SQRT2
+        out[idx['price_volatility']] = 0.0 if np.isnan(vol) else vol
+
+        for col in CAT_COLS:
+            out[idx[f'{col}_Encoded']] = self.encode(col, record.get(col))
+        return out
+
+    def transform_frame(self, df, out=None):
+        """Vectorized transform of a DataFrame into a float32 (n_rows, n_features) matrix."""
+        n = len(df)
+        if out is None:
+            out = self.empty(n)
+        idx = self._idx
+        for col in self._passthrough:
+            if col in df.columns:
+                out[:, idx[col]] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+            else:
+                out[:, idx[col]] = np.nan
+
+        msp, p1, p2 = out[:, idx['MSP']], out[:, idx['Price_1DayAgo']], out[:, idx['Price_2DaysAgo']]
+        np.subtract(p1, msp, out=out[:, idx['msp_premium']])
+        mom = out[:, idx['price_momentum']]
+        np.subtract(p1, p2, out=mom)
+        np.divide(mom, p2 + np.float32(1e-9), out=mom)
+        vol = out[:, idx['price_volatility']]
+        np.subtract(p1, p2, out=vol)
+        np.abs(vol, out=vol)
+        np.divide(vol, _SQRT2, out=vol)
+        vol[np.isnan(vol)] = 0.0
+
+        for col in CAT_COLS:
+            target = out[:, idx[f'{col}_Encoded']]
+            if col not in df.columns:
+                target[:] = self.unknown_code
+                continue
+            labels = df[col].astype(str).to_numpy()
+            codes = pd.Series(labels).map(self.category_maps[col])
+            target[:] = codes.fillna(self.unknown_code).to_numpy(dtype=np.float32)
+            target[df[col].isna().to_numpy()] = self.unknown_code
+        return out
+
+    def to_frame(self, matrix, index=None):
+        """Wraps a transformed matrix with feature names (for training / inspection)."""
+        return pd.DataFrame(matrix, columns=self.feature_columns, index=index)
+
+    def save(self, path=TRANSFORMER_PATH):
+        joblib.dump(self, path)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._index_columns()
+
+
+def load_transformer(path=TRANSFORMER_PATH, encoder_path=None, n_features=None):
+    """
+    Loads the saved transformer, or compiles one from legacy encoders.joblib if that's all we have.
+    The encoders-only fallback builds the legacy 12-column layout when `n_features` (the model's
+    n_features_in_) says the model predates the rolling-window features.
+    """
+    if os.path.exists(path):
+        return joblib.load(path)
+    if encoder_path and os.path.exists(encoder_path):
+        columns = LEGACY_FEATURE_COLUMNS if n_features == len(LEGACY_FEATURE_COLUMNS) else FEATURE_COLUMNS
+        return FeatureTransformer.from_encoders(joblib.load(encoder_path), feature_columns=columns)
+    return None
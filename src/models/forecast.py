@@ -0,0 +1,143 @@
+import os
+import sys
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import joblib
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.features.transform import load_transformer, REQUIRED_INPUT_COLS
+from src.features.feature_store import load_feature_store, KEY_COLS
+from src.models.tree_predictor import mmap_npz
+from src.models.registry import current_version, version_dir, REGISTRY_DIR
+
+# Next-day forecast for every variety in the latest report, scored in one batch after training.
+# The API memory-maps this table and answers /forecast (and plain Commodity+Variety /predict calls)
+# with a dict lookup instead of running the model.
+FORECAST_PATH = "models/forecast.npz"
+MODELS_DIR = "models"
+
+
+def _model_dir(registry_dir=REGISTRY_DIR):
+    """(directory, version) of the model the API serves: the registry's CURRENT, else the flat models/ files."""
+    version = current_version(registry_dir)
+    if version:
+        return version_dir(version, registry_dir), version
+    return MODELS_DIR, "local"
+
+
+def score_store(model, transformer, store):
+    """
+    Predictions for every store row that has the inputs /predict requires (i.e. varieties reported
+    on the latest days). Returns (row indices, predictions, last prices).
+    """
+    features = pd.DataFrame(np.asarray(store.features, dtype=np.float64), columns=store.columns)
+    keys = pd.DataFrame(store.keys, columns=KEY_COLS)
+    frame = pd.concat([keys, features], axis=1)
+    rows = np.flatnonzero(frame[REQUIRED_INPUT_COLS].notna().all(axis=1).to_numpy())
+    frame = frame.iloc[rows]
+    preds = model.predict(transformer.transform_frame(frame)) if len(rows) else np.empty(0)
+    return rows, np.asarray(preds, dtype=np.float64), frame['Price_1DayAgo'].to_numpy(dtype=np.float64)
+
+
+def build_forecast(path=FORECAST_PATH, registry_dir=REGISTRY_DIR):
+    """Scores the latest snapshot with the served model version and writes the forecast table."""
+    directory, version = _model_dir(registry_dir)
+    model_path = os.path.join(directory, "best_model.joblib")
+    store = load_feature_store(os.path.join(directory, "feature_store.npz"), mmap=False)
+    if store is None or not os.path.exists(model_path):
+        print(f"❌ Model {version} has no model or feature store in {directory}")
+        return False
+    model = joblib.load(model_path)
+    transformer = load_transformer(os.path.join(directory, "feature_transformer.joblib"),
+                                   os.path.join(directory, "encoders.joblib"), n_features=model.n_features_in_)
+    if transformer is None:
+        print(f"❌ Model {version} has no feature transformer or encoders in {directory}")
+        return False
+
+    rows, preds, last_price = score_store(model, transformer, store)
+    keys = np.asarray(store.keys)[rows]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Uncompressed so the API can memory-map it; written next to the target and renamed so a
+    # process that has the old table mapped keeps a consistent view
+    tmp = path + ".tmp.npz"
+    np.savez(tmp,
+             keys=keys.astype(str),
+             predicted=preds,
+             last_price=last_price,
+             model_version=np.array([version]),
+             as_of=np.array([store.as_of]),
+             last_observed=np.array([store.last_observed]),
+             created_at=np.array([datetime.now(timezone.utc).isoformat(timespec="seconds")]))
+    os.replace(tmp, path)
+    print(f"🔮 Forecast for {store.as_of}: {len(rows)} varieties scored with model {version} -> {path}")
+    return True
+
+
+class ForecastTable:
+    """O(1) forecast lookups by (Commodity, Variety), plus per-group and per-commodity row lists."""
+
+    def __init__(self, arrays, stamp=None):
+        self.predicted = arrays['predicted']
+        self.last_price = arrays['last_price']
+        self.model_version = str(arrays['model_version'][0])
+        self.as_of = str(arrays['as_of'][0])
+        self.last_observed = str(arrays['last_observed'][0])
+        self.created_at = str(arrays['created_at'][0])
+        self.stamp = stamp
+        self.keys = np.asarray(arrays['keys']).tolist()
+        self._index = {}
+        self._by_group = {}
+        self._by_commodity = {}
+        for i, (group, commodity, variety) in enumerate(self.keys):
+            self._index[(commodity, variety)] = i
+            self._by_group.setdefault(group, []).append(i)
+            self._by_commodity.setdefault(commodity, []).append(i)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, commodity, variety):
+        """Row index for a variety, or None if it isn't in the latest report."""
+        return self._index.get((str(commodity), str(variety)))
+
+    def rows(self, group=None, commodity=None):
+        """Row indices matching the filters (all rows without any)."""
+        if commodity is not None:
+            rows = self._by_commodity.get(str(commodity), [])
+            return [i for i in rows if self.keys[i][0] == group] if group is not None else rows
+        if group is not None:
+            return self._by_group.get(str(group), [])
+        return range(len(self.keys))
+
+    def records(self, rows):
+        rows = np.fromiter(rows, dtype=np.intp)
+        preds, last = np.asarray(self.predicted)[rows].tolist(), np.asarray(self.last_price)[rows].tolist()
+        return [{"Commodity_Group": self.keys[i][0], "Commodity": self.keys[i][1], "Variety": self.keys[i][2],
+                 "predicted_price_tomorrow": round(p, 2), "last_price": round(l, 2), "trend": "UP" if p > l else "DOWN"}
+                for i, p, l in zip(rows.tolist(), preds, last)]
+
+    def info(self):
+        return {"model_version": self.model_version, "as_of": self.as_of, "last_observed": self.last_observed,
+                "created_at": self.created_at, "varieties": len(self)}
+
+
+def load_forecast(path=FORECAST_PATH, mmap=True):
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return ForecastTable(mmap_npz(path) if mmap else dict(np.load(path)), stamp=(st.st_mtime_ns, st.st_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the latest snapshot into the forecast table")
+    parser.add_argument("--output", default=FORECAST_PATH)
+    args = parser.parse_args()
+    sys.exit(0 if build_forecast(args.output) else 1)
+
+
+if __name__ == "__main__":
+    main()
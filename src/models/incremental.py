@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.metrics import calculate_smape
+from src.features.transform import ENCODED_COLS
+from src.models.search import holdout_split, EARLY_STOPPING_ROUNDS
+from src.models.tree_predictor import file_sha256
+
+# Warm-start retraining: the binned Dataset of everything the current model was fully trained on
+# is cached in LightGBM's binary format, and each day's new rows are binned against it and boosted
+# on top of the previous model. A full retrain (which refreshes the cache) happens when the policy
+# in retrain_decision() says the warm-started model can't be trusted any more.
+CACHE_DIR = "data/cache/lgb"
+DATASET_CACHE_PATH = os.path.join(CACHE_DIR, "train.bin")
+STATE_PATH = os.path.join(CACHE_DIR, "state.json")
+
+INCREMENTAL_ROUNDS = 10          # trees added per warm start (more overfits a day's rows)
+MAX_INCREMENTAL_UPDATES = 14     # warm starts in a row before a full retrain
+MAX_NEW_ROW_FRACTION = 0.25      # new rows (vs. the cached base) above which we retrain from scratch
+DRIFT_TOLERANCE = 1.5            # full retrain if yesterday's model scores this much worse than its baseline
+
+DATASET_PARAMS = {"verbose": -1}
+
+
+def booster_params(params):
+    """sklearn-style params (n_estimators, random_state) as lgb.train params."""
+    out = {k: v for k, v in params.items() if k != "n_estimators"}
+    out.update(objective="regression", metric="mae", verbose=-1)
+    return out
+
+
+def schema_fingerprint(transformer, params):
+    """Changes whenever a warm start would be invalid: feature layout, category codes or params."""
+    payload = json.dumps({"columns": transformer.feature_columns, "categories": transformer.category_maps,
+                          "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def build_dataset(X, y, reference=None):
+    return lgb.Dataset(X, y, categorical_feature=ENCODED_COLS, reference=reference,
+                       params=DATASET_PARAMS, free_raw_data=False)
+
+
+def as_regressor(booster, params):
+    """Wraps a native Booster as a fitted LGBMRegressor, the type best_model.joblib and the API expect."""
+    # sklearn has no public way to adopt a Booster, so this sets the attributes LGBMRegressor.fit
+    # would, as of lightgbm==4.3.0 (requirements.txt). Re-check on any bump: tests/test_incremental.py
+    # round-trips a wrapped model through joblib, predict and the tree export.
+    model = lgb.LGBMRegressor(**params)
+    model._Booster = booster
+    model._n_features = model._n_features_in = booster.num_feature()
+    model._objective = "regression"
+    model._evals_result, model._best_iteration, model._best_score = {}, booster.best_iteration, booster.best_score
+    model.fitted_ = True
+    return model
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def retrain_decision(state, model_path, fingerprint, n_new, drift_smape=None, cache_path=DATASET_CACHE_PATH):
+    """("skip" | "incremental" | "full", reason)."""
+    if state is None or not os.path.exists(cache_path) or not os.path.exists(model_path):
+        return "full", "no warm-start state yet"
+    if state.get("model_sha256") != file_sha256(model_path):
+        return "full", "best_model.joblib was written by another training run"
+    if state.get("fingerprint") != fingerprint:
+        return "full", "features, category codes or params changed"
+    if n_new == 0:
+        return "skip", f"no rows after {state['trained_through']}"
+    if state.get("updates", 0) >= MAX_INCREMENTAL_UPDATES:
+        return "full", f"{state['updates']} warm starts since the last full retrain"
+    if n_new > MAX_NEW_ROW_FRACTION * state["base_rows"]:
+        return "full", f"{n_new} new rows is over {MAX_NEW_ROW_FRACTION:.0%} of the {state['base_rows']} cached"
+    if drift_smape is not None and drift_smape > DRIFT_TOLERANCE * state["baseline_smape"]:
+        return "full", f"SMAPE on new rows {drift_smape:.2f}% vs baseline {state['baseline_smape']:.2f}%"
+    return "incremental", f"{n_new} new rows"
+
+
+def full_retrain(X, y, dates, params, cache_path=DATASET_CACHE_PATH):
+    """
+    Early-stops on the newest days to pick the round count and baseline SMAPE, then refits on every
+    row and saves that binned Dataset as the warm-start cache. Returns (model, info).
+    """
+    start = time.perf_counter()
+    bparams = booster_params(params)
+    train_idx, valid_idx = holdout_split(dates)
+    train_ds = build_dataset(X.iloc[train_idx], y.iloc[train_idx])
+    valid_ds = build_dataset(X.iloc[valid_idx], y.iloc[valid_idx], reference=train_ds)
+    probe = lgb.train(bparams, train_ds, num_boost_round=params.get("n_estimators", 1000), valid_sets=[valid_ds],
+                      callbacks=[lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False)])
+    rounds = probe.best_iteration or probe.current_iteration()
+    smape = float(calculate_smape(y.iloc[valid_idx].to_numpy(), probe.predict(X.iloc[valid_idx], num_iteration=rounds)))
+
+    full_ds = build_dataset(X, y)
+    booster = lgb.train(bparams, full_ds, num_boost_round=rounds)
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    if os.path.exists(cache_path):
+        os.remove(cache_path)  # save_binary refuses to overwrite
+    full_ds.save_binary(cache_path)
+    return as_regressor(booster, params), {"seconds": time.perf_counter() - start, "smape": smape,
+                                          "rounds": rounds, "rows": len(X)}
+
+
+def warm_start(model, X_new, y_new, params, cache_path=DATASET_CACHE_PATH, rounds=INCREMENTAL_ROUNDS):
+    """Continues boosting `model` on the new rows, binned with the cached Dataset's bin mappers."""
+    start = time.perf_counter()
+    base = lgb.Dataset(cache_path, params=DATASET_PARAMS).construct()
+    new_ds = build_dataset(X_new, y_new, reference=base)
+    booster = lgb.train(booster_params(params), new_ds, num_boost_round=rounds, init_model=model.booster_)
+    return as_regressor(booster, params), {"seconds": time.perf_counter() - start, "rows": len(X_new)}
+
+
+def new_state(fingerprint, trained_through, info, model_path):
+    return {
+        "fingerprint": fingerprint,
+        "trained_through": trained_through,
+        "base_rows": info["rows"],
+        "baseline_smape": info["smape"],
+        "updates": 0,
+        "model_sha256": file_sha256(model_path),
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare_with_full(X, y, dates, params, replay_days=5):
+    """
+    Replays the last `replay_days` daily updates before the newest day both ways: a full retrain
+    on everything before day N-replay_days followed by one warm start per day, vs. one full retrain
+    on everything before the newest day. Both are scored on the newest day, which neither has seen.
+    """
+    dates = pd.to_datetime(pd.Series(dates, index=X.index)).dt.normalize()
+    days = np.sort(dates.unique())
+    if len(days) < replay_days + 3:
+        raise ValueError(f"Need at least {replay_days + 3} days to compare, found {len(days)}")
+    test = (dates == days[-1]).to_numpy()
+    base = (dates < days[-1 - replay_days]).to_numpy()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "train.bin")
+        model, _ = full_retrain(X[base], y[base], dates[base], params, cache_path=cache)
+        update_seconds = []
+        for day in days[-1 - replay_days:-1]:
+            rows = (dates == day).to_numpy()
+            model, info = warm_start(model, X[rows], y[rows], params, cache_path=cache)
+            update_seconds.append(info["seconds"])
+        incremental_smape = calculate_smape(y[test].to_numpy(), model.predict(X[test]))
+
+        seen = ~test
+        full_model, full_info = full_retrain(X[seen], y[seen], dates[seen], params,
+                                             cache_path=os.path.join(tmp, "full.bin"))
+        full_smape = calculate_smape(y[test].to_numpy(), full_model.predict(X[test]))
+
+    return {
+        "incremental_seconds": float(np.mean(update_seconds)),
+        "incremental_smape": float(incremental_smape),
+        "full_seconds": full_info["seconds"],
+        "full_smape": float(full_smape),
+    }
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# Local versioned model registry:
+#   models/registry/v0001/{best_model.joblib, best_model.npz, feature_transformer.joblib,
+#                          encoders.joblib, feature_store.npz, schema.json, metrics.json}
+#   models/registry/CURRENT   <- name of the version the API serves
+# Version directories are never modified after publishing, so a process can keep reading (and
+# memory-mapping) one while a newer version is published next to it.
+REGISTRY_DIR = "models/registry"
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 10
+SHADOW_LOG_PATH = "data/cache/shadow/predictions.jsonl"
+
+# Files that make up a servable version (source path in models/ -> name inside the version dir)
+MODEL_FILES = {
+    "models/best_model.joblib": "best_model.joblib",
+    "models/best_model.npz": "best_model.npz",
+    "models/feature_transformer.joblib": "feature_transformer.joblib",
+    "models/encoders.joblib": "encoders.joblib",
+    "models/feature_store.npz": "feature_store.npz",
+}
+REQUIRED_FILES = ["best_model.joblib", "feature_transformer.joblib"]
+
+
+def _write_atomic(path, text):
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir)
+                  if name.startswith("v") and name[1:].isdigit() and os.path.isdir(os.path.join(registry_dir, name)))
+
+
+def version_dir(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, version)
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        version = f.read().strip()
+    return version or None
+
+
+def set_current(version, registry_dir=REGISTRY_DIR):
+    """Points CURRENT at `version` (promote / roll back). Watching APIs pick it up on their next poll."""
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version: {version}")
+    _write_atomic(os.path.join(registry_dir, CURRENT_FILE), version + "\n")
+    print(f"📌 CURRENT -> {version}")
+
+
+def load_metadata(version, registry_dir=REGISTRY_DIR):
+    meta = {"version": version}
+    for name in ("metrics.json", "schema.json"):
+        path = os.path.join(version_dir(version, registry_dir), name)
+        if os.path.exists(path):
+            with open(path) as f:
+                meta[name[:-5]] = json.load(f)
+    return meta
+
+
+def feature_schema(transformer):
+    return {
+        "feature_columns": list(transformer.feature_columns),
+        "categories": {col: len(codes) for col, codes in transformer.category_maps.items()},
+        "unknown_code": transformer.unknown_code,
+    }
+
+
+def publish(metrics=None, files=MODEL_FILES, promote=True, registry_dir=REGISTRY_DIR, keep=KEEP_VERSIONS):
+    """
+    Copies the current model artifacts into a new version directory (staged under a temp name,
+    then renamed into place) and optionally makes it CURRENT. Returns the version name.
+    """
+    missing = [dst for src, dst in files.items() if dst in REQUIRED_FILES and not os.path.exists(src)]
+    if missing:
+        raise FileNotFoundError(f"Cannot publish without {', '.join(missing)}")
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = os.path.join(registry_dir, f".staging-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for src, dst in files.items():
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(staging, dst))
+
+    transformer_path = os.path.join(staging, "feature_transformer.joblib")
+    if os.path.exists(transformer_path):
+        from src.features.transform import load_transformer
+        with open(os.path.join(staging, "schema.json"), "w") as f:
+            json.dump(feature_schema(load_transformer(transformer_path)), f, indent=2)
+    with open(os.path.join(staging, "metrics.json"), "w") as f:
+        json.dump({**(metrics or {}), "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+                  f, indent=2, sort_keys=True, default=str)
+
+    # Another publisher may grab the same number; the rename fails and we take the next one
+    while True:
+        versions = list_versions(registry_dir)
+        version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+        try:
+            os.rename(staging, version_dir(version, registry_dir))
+            break
+        except OSError:
+            if not os.path.exists(version_dir(version, registry_dir)):
+                raise
+    print(f"📦 Published model {version} to {registry_dir}")
+    if promote:
+        set_current(version, registry_dir)
+    prune(keep, registry_dir)
+    return version
+
+
+def prune(keep=KEEP_VERSIONS, registry_dir=REGISTRY_DIR):
+    """Deletes the oldest versions beyond `keep`, never the CURRENT one."""
+    current = current_version(registry_dir)
+    for version in list_versions(registry_dir)[:-keep] if keep else []:
+        if version != current:
+            shutil.rmtree(version_dir(version, registry_dir), ignore_errors=True)
+
+
+def shadow_report(log_path=SHADOW_LOG_PATH):
+    """
+    Accuracy of shadow-scored predictions once the actual prices are in the history: SMAPE of
+    production vs. shadow on the same requests, per (production, shadow) version pair.
+    """
+    import pandas as pd
+    from src.data.history import read_history
+    from src.utils.metrics import calculate_smape
+
+    log = pd.read_json(log_path, lines=True).dropna(subset=["as_of"])
+    if log.empty:
+        return pd.DataFrame()
+    log["Date"] = pd.to_datetime(log["as_of"])
+    actual = read_history(log["Date"].min(), log["Date"].max(), columns=["Date", "Commodity", "Variety", "Price"])
+    scored = log.merge(actual, on=["Date", "Commodity", "Variety"], how="inner").dropna(subset=["Price"])
+    rows = []
+    for (prod, shadow), g in scored.groupby(["production", "shadow"]):
+        rows.append({"production": prod, "shadow": shadow, "requests": len(g),
+                     "production_smape": calculate_smape(g["Price"], g["production_pred"]),
+                     "shadow_smape": calculate_smape(g["Price"], g["shadow_pred"]),
+                     "production_p95_ms": g["production_ms"].quantile(0.95),
+                     "shadow_p95_ms": g["shadow_ms"].quantile(0.95)})
+    print(f"🕵️ {len(scored)} of {len(log)} shadow predictions have an actual price so far")
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local model registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    promote = sub.add_parser("promote", help="point CURRENT at a version (also used to roll back)")
+    promote.add_argument("version")
+    promote.add_argument("--no-forecast", action="store_true", help="don't rescore the forecast table")
+    publish_cmd = sub.add_parser("publish", help="publish the artifacts currently in models/")
+    publish_cmd.add_argument("--no-promote", action="store_true")
+    report = sub.add_parser("shadow-report", help="accuracy of shadow-scored predictions vs. actual prices")
+    report.add_argument("--log", default=SHADOW_LOG_PATH)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = current_version()
+        for version in list_versions():
+            metrics = load_metadata(version).get("metrics", {})
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  smape={metrics.get('smape', '-')}  published={metrics.get('published_at', '-')}")
+    elif args.command == "promote":
+        set_current(args.version)
+        if not args.no_forecast:
+            # /forecast only serves a table scored by the version the API serves
+            from src.models.forecast import build_forecast
+            build_forecast()
+    elif args.command == "shadow-report":
+        print(shadow_report(args.log).to_string(index=False))
+    else:
+        publish(promote=not args.no_promote)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.metrics import calculate_smape
+from src.features.transform import ENCODED_COLS
+
+# CONFIG
+N_TRIALS = 24
+N_SPLITS = 3
+EARLY_STOPPING_ROUNDS = 50
+MAX_ESTIMATORS = 2000
+PRUNE_STARTUP_TRIALS = 4  # trials that must finish a fold before anything is pruned on it
+HOLDOUT_FRACTION = 0.2  # newest share of days held out for validation
+
+BASE_PARAMS = {
+    "n_estimators": MAX_ESTIMATORS,
+    "subsample_freq": 1,
+    "verbose": -1,
+}
+
+
+def rolling_origin_splits(dates, n_splits=N_SPLITS, valid_days=None):
+    """
+    Expanding-window folds over calendar days: fold k trains on every day before its cutoff and
+    validates on the `valid_days` after it, cutoffs moving forward so the last fold validates on the
+    newest data. Returns [(train_idx, valid_idx), ...], oldest first.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).dt.normalize().to_numpy()
+    days = np.unique(dates)
+    n_splits = min(n_splits, len(days) - 1)
+    if n_splits < 1:
+        raise ValueError(f"Need at least 2 distinct days for a time split, found {len(days)}")
+    valid_days = valid_days or max(1, len(days) // (n_splits + 1))
+    valid_days = min(valid_days, (len(days) - 1) // n_splits)
+
+    folds = []
+    for k in range(n_splits):
+        end = len(days) - (n_splits - 1 - k) * valid_days
+        start = end - valid_days
+        train_idx = np.flatnonzero(dates < days[start])
+        valid_idx = np.flatnonzero((dates >= days[start]) & (dates <= days[end - 1]))
+        folds.append((train_idx, valid_idx))
+    return folds
+
+
+def holdout_split(dates, fraction=HOLDOUT_FRACTION):
+    """(train_idx, valid_idx): older days vs. the newest `fraction` of days."""
+    n_days = pd.to_datetime(pd.Series(dates)).dt.normalize().nunique()
+    return rolling_origin_splits(dates, n_splits=1, valid_days=max(1, round(n_days * fraction)))[0]
+
+
+def sample_params(rng):
+    """One point of the search space (log-uniform for scale-type parameters)."""
+    log_uniform = lambda lo, hi: float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+    return {
+        "learning_rate": round(log_uniform(0.01, 0.2), 4),
+        "num_leaves": int(round(log_uniform(15, 255))),
+        "max_depth": int(rng.choice([-1, 6, 8, 10, 12])),
+        "min_child_samples": int(round(log_uniform(5, 100))),
+        "subsample": round(float(rng.uniform(0.6, 1.0)), 3),
+        "colsample_bytree": round(float(rng.uniform(0.5, 1.0)), 3),
+        "reg_lambda": round(log_uniform(1e-3, 10.0), 4),
+    }
+
+
+class MedianPruner:
+    """
+    Stops a trial whose score on fold k is worse than the median of what other trials scored on
+    fold k. Scores live in a multiprocessing.Manager dict so every worker sees the others' results.
+    """
+
+    def __init__(self, manager, startup_trials=PRUNE_STARTUP_TRIALS):
+        self.scores = manager.dict()
+        self.lock = manager.Lock()
+        self.startup_trials = startup_trials
+
+    def report(self, step, score):
+        """Records `score` for fold `step`; returns True if the trial should stop."""
+        with self.lock:
+            seen = self.scores.get(step, [])
+            self.scores[step] = seen + [score]
+        return len(seen) >= self.startup_trials and score > float(np.median(seen))
+
+
+# Per-worker state, set once by the pool initializer instead of pickling the data for every trial
+_DATA = {}
+
+
+def _init_worker(X, y, folds, threads):
+    # Cap OpenMP before LightGBM spins up its thread pool in this process
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    _DATA.update(X=X, y=y, folds=folds, threads=threads)
+
+
+def run_trial(trial_id, params, pruner=None):
+    """Fits every fold in time order, reporting each fold's SMAPE to the pruner as it goes."""
+    import lightgbm as lgb
+
+    X, y, folds, threads = _DATA["X"], _DATA["y"], _DATA["folds"], _DATA["threads"]
+    start = time.perf_counter()
+    fold_scores, best_iterations = [], []
+    for step, (train_idx, valid_idx) in enumerate(folds):
+        model = lgb.LGBMRegressor(**BASE_PARAMS, **params, n_jobs=threads, random_state=42)
+        model.fit(
+            X.iloc[train_idx], y.iloc[train_idx],
+            eval_set=[(X.iloc[valid_idx], y.iloc[valid_idx])],
+            eval_metric="mae",
+            categorical_feature=ENCODED_COLS,
+            callbacks=[lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False)]
+        )
+        score = float(calculate_smape(y.iloc[valid_idx].to_numpy(), model.predict(X.iloc[valid_idx])))
+        fold_scores.append(score)
+        best_iterations.append(int(model.best_iteration_ or model.n_estimators))
+        if pruner is not None and step < len(folds) - 1 and pruner.report(step, score):
+            return {"trial": trial_id, "params": params, "state": "pruned", "fold_smape": fold_scores,
+                    "best_iterations": best_iterations, "seconds": time.perf_counter() - start}
+    return {"trial": trial_id, "params": params, "state": "complete", "fold_smape": fold_scores,
+            "cv_smape": float(np.mean(fold_scores)), "best_iterations": best_iterations,
+            "seconds": time.perf_counter() - start}
+
+
+def run_search(X, y, dates, n_trials=N_TRIALS, workers=None, threads_per_trial=None, n_splits=N_SPLITS,
+               seed=42, on_result=None):
+    """
+    Random search over sample_params() with rolling-origin CV, `workers` trials in parallel
+    processes, each LightGBM limited to `threads_per_trial` threads (workers x threads <= cores).
+    `on_result(result)` is called in this process as each trial finishes (e.g. to log it).
+    Returns all trial results, best (lowest cv_smape) first.
+    """
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, cores // 2)
+    threads_per_trial = threads_per_trial or max(1, cores // workers)
+    folds = rolling_origin_splits(dates, n_splits)
+    rng = np.random.default_rng(seed)
+    trials = [sample_params(rng) for _ in range(n_trials)]
+    print(f"🔎 Searching {n_trials} trials x {len(folds)} folds on {workers} worker(s) "
+          f"x {threads_per_trial} thread(s)")
+
+    # spawn: forked children would inherit the parent's OpenMP state
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    with ctx.Manager() as manager:
+        pruner = MedianPruner(manager)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(X, y, folds, threads_per_trial)) as pool:
+            futures = [pool.submit(run_trial, i, params, pruner) for i, params in enumerate(trials)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    return sorted(results, key=lambda r: (r["state"] != "complete", r.get("cv_smape", np.inf)))
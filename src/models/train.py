@@ -5,6 +5,7 @@ import joblib
 import mlflow
 import os
 import sys
+import argparse
 import warnings
 
 # Add parent directory to path
@@ -12,6 +13,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 
 from sklearn.model_selection import train_test_split
 from src.utils.metrics import calculate_smape
+from src.features.transform import load_transformer, TRANSFORMER_PATH, ENCODED_COLS
+from src.models.tree_predictor import export_tree_tables, TREE_MODEL_PATH
+from src.models.tree_predictor import file_sha256
+from src.models.search import run_search, holdout_split, BASE_PARAMS, N_TRIALS, HOLDOUT_FRACTION
+from src.models import incremental
+from src.models.registry import publish
 
 warnings.filterwarnings('ignore')
 
@@ -19,38 +26,171 @@ warnings.filterwarnings('ignore')
 DATA_PATH = 'data/features/training_data.csv'  # <--- UPDATED PATH
 MODEL_PATH = 'models/best_model.joblib'
 MLFLOW_EXPERIMENT_NAME = "Agri_Price_Prediction"
+# Every saved model is published to models/registry; set to 0 to publish without making it CURRENT
+# (e.g. to shadow-score it in the API first)
+PROMOTE_NEW_MODELS = os.getenv("PROMOTE_NEW_MODELS", "1") != "0"
 
-def train():
+PARAMS = {
+    "n_estimators": 1000,
+    "learning_rate": 0.05,
+    "max_depth": 10,
+    "num_leaves": 31,
+    "random_state": 42
+}
+
+
+def time_holdout(df):
+    """Train on older days, validate on the newest HOLDOUT_FRACTION of days (no future leakage)."""
+    if 'Date' not in df.columns:
+        print("⚠️ No Date column in training data (rebuild features); falling back to a random split")
+        return train_test_split(np.arange(len(df)), test_size=HOLDOUT_FRACTION, random_state=42)
+    return holdout_split(df['Date'])
+
+
+def log_trial(result):
+    """One nested MLflow run per search trial, with its per-fold scores as steps."""
+    with mlflow.start_run(run_name=f"trial_{result['trial']:03d}", nested=True):
+        mlflow.log_params(result["params"])
+        mlflow.set_tag("state", result["state"])
+        for step, score in enumerate(result["fold_smape"]):
+            mlflow.log_metric("fold_smape", score, step=step)
+        if "cv_smape" in result:
+            mlflow.log_metric("cv_smape", result["cv_smape"])
+        mlflow.log_metric("seconds", result["seconds"])
+    score = f"{result['cv_smape']:.4f}%" if "cv_smape" in result else \
+        f"pruned after fold {len(result['fold_smape'])}"
+    print(f"   trial {result['trial']:3d}: {score} ({result['seconds']:.1f}s)")
+
+
+def save_model(model, metrics=None):
+    joblib.dump(model, MODEL_PATH)
+    print(f" Model saved to {MODEL_PATH}")
+
+    # Flattened tree tables, so the API can still serve on a host without lightgbm
+    export_tree_tables(model, TREE_MODEL_PATH, source_path=MODEL_PATH)
+    print(f" Tree tables exported to {TREE_MODEL_PATH}")
+
+    # New registry version (model + transformer + feature store); the API hot-swaps to it
+    run = mlflow.active_run()
+    publish({**(metrics or {}), "mlflow_run_id": run.info.run_id if run else None}, promote=PROMOTE_NEW_MODELS)
+
+
+def train_search(X, y, dates, n_trials=N_TRIALS, workers=None, threads_per_trial=None):
+    """Parallel search with rolling-origin CV, then a refit of the best params on all rows."""
+    with mlflow.start_run(run_name="search"):
+        mlflow.log_params({"n_trials": n_trials, "workers": workers or "auto",
+                           "threads_per_trial": threads_per_trial or "auto"})
+        results = run_search(X, y, dates, n_trials=n_trials, workers=workers,
+                             threads_per_trial=threads_per_trial, on_result=log_trial)
+        best = results[0]
+        if best["state"] != "complete":
+            print("❌ Every trial was pruned; nothing to refit")
+            return False
+        pruned = sum(r["state"] == "pruned" for r in results)
+        print(f"🏆 Best trial {best['trial']}: CV SMAPE {best['cv_smape']:.4f}% ({pruned}/{len(results)} pruned)")
+
+        # Refit on everything, as many rounds as early stopping picked on average across folds
+        params = {**BASE_PARAMS, **best["params"], "random_state": 42,
+                  "n_estimators": max(1, int(np.mean(best["best_iterations"])))}
+        mlflow.log_params({f"best_{k}": v for k, v in params.items()})
+        mlflow.log_metrics({"smape": best["cv_smape"], "trials_pruned": pruned})
+
+        model = lgb.LGBMRegressor(**params)
+        model.fit(X, y, categorical_feature=ENCODED_COLS)
+        save_model(model, {"mode": "search", "smape": best["cv_smape"], "params": params})
+    return True
+
+def train_incremental(X, y, dates, transformer, compare=False):
+    """Warm-starts from the current model on rows newer than it has seen, or retrains in full (see incremental.retrain_decision)."""
+    dates = pd.to_datetime(dates)
+    state = incremental.load_state()
+    fingerprint = incremental.schema_fingerprint(transformer, PARAMS)
+    new_rows = (dates > pd.Timestamp(state["trained_through"])).to_numpy() if state else np.ones(len(X), dtype=bool)
+
+    previous, drift_smape = None, None
+    if state and os.path.exists(MODEL_PATH):
+        previous = joblib.load(MODEL_PATH)
+        if new_rows.any() and previous.n_features_in_ == X.shape[1]:
+            # Yesterday's model on today's rows: an honest out-of-sample score before it trains on them
+            drift_smape = float(calculate_smape(y[new_rows].to_numpy(), previous.predict(X[new_rows])))
+    mode, reason = incremental.retrain_decision(state, MODEL_PATH, fingerprint, int(new_rows.sum()), drift_smape)
+    print(f"🔁 Retrain mode: {mode} ({reason})")
+    if mode == "skip":
+        return True
+
+    with mlflow.start_run(run_name=f"retrain_{mode}"):
+        mlflow.log_params({**PARAMS, "mode": mode, "reason": reason[:250]})
+        trained_through = dates.max().date().isoformat()
+        if mode == "full":
+            model, info = incremental.full_retrain(X, y, dates, PARAMS)
+            print(f"✅ SMAPE Score: {info['smape']:.4f}% ({info['rounds']} rounds, {info['seconds']:.1f}s)")
+            mlflow.log_metrics({"smape": info["smape"], "rounds": info["rounds"]})
+            save_model(model, {"mode": "full", "smape": info["smape"], "params": PARAMS,
+                               "trained_through": trained_through})
+            state = incremental.new_state(fingerprint, trained_through, info, MODEL_PATH)
+        else:
+            model, info = incremental.warm_start(previous, X[new_rows], y[new_rows], PARAMS)
+            print(f"✅ Added {incremental.INCREMENTAL_ROUNDS} trees on {info['rows']} new rows in {info['seconds']:.1f}s")
+            save_model(model, {"mode": "warm_start", "baseline_smape": state["baseline_smape"],
+                               "new_rows_smape_before_update": drift_smape, "params": PARAMS,
+                               "trained_through": trained_through})
+            state.update(trained_through=trained_through, updates=state["updates"] + 1,
+                         model_sha256=file_sha256(MODEL_PATH))
+        incremental.save_state(state)
+        mlflow.log_metrics({"seconds": info["seconds"], "new_rows": int(new_rows.sum())})
+        if drift_smape is not None:
+            mlflow.log_metric("new_rows_smape_before_update", drift_smape)
+
+        if compare:
+            print("⚖️  Replaying recent days: warm starts vs. full retrain...")
+            result = incremental.compare_with_full(X, y, dates, PARAMS)
+            mlflow.log_metrics({f"compare_{k}": v for k, v in result.items()})
+            print(f"   incremental: {result['incremental_smape']:.4f}% SMAPE, {result['incremental_seconds']:.2f}s/update")
+            print(f"   full:        {result['full_smape']:.4f}% SMAPE, {result['full_seconds']:.2f}s")
+    return True
+
+def train(search=False, n_trials=N_TRIALS, workers=None, threads_per_trial=None, incremental_mode=False,
+          compare=False):
     # Setup MLflow
     mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
     
     print("🚀 Loading data for training...")
     if not os.path.exists(DATA_PATH):
         print(f" Data file not found: {DATA_PATH}")
-        return
+        return False
+
+    transformer = load_transformer(TRANSFORMER_PATH)
+    if transformer is None:
+        print(f" Feature transformer not found: {TRANSFORMER_PATH}. Run build_features first.")
+        return False
 
     df = pd.read_csv(DATA_PATH)
     
-    # Select only numeric features for LightGBM
-    # We drop the Target (Price_Today) and non-numeric columns
-    numeric_df = df.select_dtypes(include=[np.number])
-    
-    X = numeric_df.drop(columns=['Price_Today'])
-    y = numeric_df['Price_Today']
+    # Featurize through the shared transformer (same float32 matrix the API builds)
+    X = transformer.to_frame(transformer.transform_frame(df), index=df.index)
+    y = df['Price_Today']
     
-    # Split
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    if search:
+        dates = df['Date'] if 'Date' in df.columns else None
+        if dates is None:
+            print("❌ Search needs the Date column in the training data. Rebuild features first.")
+            return False
+        return train_search(X, y, dates, n_trials, workers, threads_per_trial)
+
+    if incremental_mode:
+        if 'Date' not in df.columns:
+            print("❌ Incremental retraining needs the Date column in the training data. Rebuild features first.")
+            return False
+        return train_incremental(X, y, df['Date'], transformer, compare)
+
+    # Split: newest days are the validation set
+    train_idx, test_idx = time_holdout(df)
+    X_train, X_test, y_train, y_test = X.iloc[train_idx], X.iloc[test_idx], y.iloc[train_idx], y.iloc[test_idx]
     
     with mlflow.start_run():
         print(" Training LightGBM...")
         
-        params = {
-            "n_estimators": 1000,
-            "learning_rate": 0.05,
-            "max_depth": 10,
-            "num_leaves": 31,
-            "random_state": 42
-        }
+        params = PARAMS
         
         mlflow.log_params(params)
         
@@ -59,6 +199,7 @@ def train():
             X_train, y_train,
             eval_set=[(X_test, y_test)],
             eval_metric="mae",
+            categorical_feature=ENCODED_COLS,
             callbacks=[lgb.early_stopping(stopping_rounds=50, verbose=False)]
         )
         
@@ -70,8 +211,19 @@ def train():
         mlflow.log_metric("smape", smape)
         
         # Save
-        joblib.dump(model, MODEL_PATH)
-        print(f" Model saved to {MODEL_PATH}")
+        save_model(model, {"mode": "full", "smape": float(smape), "params": params})
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the price model")
+    parser.add_argument("--search", action="store_true", help="hyperparameter search with rolling-origin CV")
+    parser.add_argument("--trials", type=int, default=N_TRIALS)
+    parser.add_argument("--workers", type=int, default=None, help="parallel trial processes (default: cores / 2)")
+    parser.add_argument("--threads-per-trial", type=int, default=None, help="LightGBM threads per trial")
+    parser.add_argument("--incremental", action="store_true", help="warm-start from the current model on new rows")
+    parser.add_argument("--compare-full", action="store_true", help="with --incremental: log warm starts vs. a full retrain")
+    args = parser.parse_args()
+    train(args.search, args.trials, args.workers, args.threads_per_trial, args.incremental, args.compare_full)
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    main()
@@ -0,0 +1,274 @@
+import os
+import sys
+import struct
+import hashlib
+import zipfile
+import numpy as np
+import joblib
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+# CONFIG
+MODEL_PATH = 'models/best_model.joblib'
+TREE_MODEL_PATH = 'models/best_model.npz'
+
+# LightGBM missing_type codes (see LightGBM tree.h NumericalDecision)
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+_ZERO_THRESHOLD = 1e-35
+
+# Objectives whose raw score is the prediction
+_IDENTITY_OBJECTIVES = ("regression", "regression_l1", "huber", "fair", "quantile", "mape")
+_EXP_OBJECTIVES = ("poisson", "gamma", "tweedie")
+
+# Max (rows x trees) cells evaluated at once, keeps temporaries small on big batches
+_CHUNK_CELLS = 1 << 21
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _flatten_tree(node, tables):
+    """Appends one dumped tree to the flat node tables, returns the index of its root."""
+    idx = len(tables['feature'])
+    tables['feature'].append(0)
+    tables['threshold'].append(0.0)
+    tables['left'].append(idx)
+    tables['right'].append(idx)
+    tables['default_left'].append(False)
+    tables['missing_type'].append(MISSING_NONE)
+    tables['value'].append(0.0)
+    tables['is_categorical'].append(False)
+    tables['cat_offset'].append(0)
+    tables['cat_len'].append(0)
+
+    if 'leaf_value' in node:
+        tables['value'][idx] = node['leaf_value']
+        return idx, 0
+
+    decision_type = node.get('decision_type', '<=')
+    if decision_type == '==':
+        # Categorical split: categories going left, stored as a bitset like LightGBM's cat_threshold
+        cats = [int(c) for c in str(node['threshold']).split('||')]
+        words = np.zeros(max(cats) // 32 + 1, dtype=np.uint32)
+        for c in cats:
+            words[c // 32] |= np.uint32(1 << (c % 32))
+        tables['is_categorical'][idx] = True
+        tables['cat_offset'][idx] = len(tables['cat_bits'])
+        tables['cat_len'][idx] = len(words)
+        tables['cat_bits'].extend(words.tolist())
+    elif decision_type == '<=':
+        tables['threshold'][idx] = node['threshold']
+    else:
+        raise NotImplementedError(f"Unsupported split type {decision_type!r}")
+
+    tables['feature'][idx] = node['split_feature']
+    tables['default_left'][idx] = node['default_left']
+    tables['missing_type'][idx] = _MISSING_TYPES[node['missing_type']]
+    left, left_depth = _flatten_tree(node['left_child'], tables)
+    right, right_depth = _flatten_tree(node['right_child'], tables)
+    tables['left'][idx] = left
+    tables['right'][idx] = right
+    return idx, 1 + max(left_depth, right_depth)
+
+
+def export_tree_tables(model, path=TREE_MODEL_PATH, source_path=None):
+    """
+    Flattens a trained LightGBM model (LGBMRegressor or Booster) into array-backed node tables
+    and saves them as an uncompressed .npz so they can be memory-mapped at load time.
+    Leaves point to themselves, so a fixed number of steps lands every row on its leaf.
+    """
+    booster = getattr(model, 'booster_', model)
+    dump = booster.dump_model()
+    objective = dump.get('objective', 'regression').split()[0]
+    if not objective.startswith(_IDENTITY_OBJECTIVES + _EXP_OBJECTIVES):
+        raise NotImplementedError(f"Unsupported objective for tree export: {objective}")
+    if dump.get('num_tree_per_iteration', 1) != 1:
+        raise NotImplementedError("Multi-output models are not supported")
+
+    tables = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'default_left', 'missing_type', 'value',
+                              'is_categorical', 'cat_offset', 'cat_len', 'cat_bits')}
+    roots, max_depth = [], 0
+    for tree in dump['tree_info']:
+        root, depth = _flatten_tree(tree['tree_structure'], tables)
+        roots.append(root)
+        max_depth = max(max_depth, depth)
+
+    arrays = {
+        'feature': np.asarray(tables['feature'], dtype=np.int32),
+        'threshold': np.asarray(tables['threshold'], dtype=np.float64),
+        'left': np.asarray(tables['left'], dtype=np.int32),
+        'right': np.asarray(tables['right'], dtype=np.int32),
+        'default_left': np.asarray(tables['default_left'], dtype=np.bool_),
+        'missing_type': np.asarray(tables['missing_type'], dtype=np.int8),
+        'value': np.asarray(tables['value'], dtype=np.float64),
+        'is_categorical': np.asarray(tables['is_categorical'], dtype=np.bool_),
+        'cat_offset': np.asarray(tables['cat_offset'], dtype=np.int32),
+        'cat_len': np.asarray(tables['cat_len'], dtype=np.int32),
+        'cat_bits': np.asarray(tables['cat_bits'], dtype=np.uint32),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': np.asarray([max_depth], dtype=np.int32),
+        'num_features': np.asarray([dump['max_feature_idx'] + 1], dtype=np.int32),
+        'average_output': np.asarray([bool(dump.get('average_output', False))]),
+        'objective': np.asarray([objective]),
+        'feature_names': np.asarray(dump.get('feature_names', [])),
+        'source_sha256': np.asarray([file_sha256(source_path) if source_path else '']),
+    }
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def mmap_npz(path):
+    """Memory-maps every member of an uncompressed .npz (np.load ignores mmap_mode for archives)."""
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as fh:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(zf.open(info))
+                continue
+            fh.seek(info.header_offset)
+            local_header = fh.read(30)
+            name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+            fh.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(fh)
+            if dtype.hasobject or 0 in shape or shape == ():
+                fh.seek(info.header_offset + 30 + name_len + extra_len)
+                arrays[name] = np.lib.format.read_array(fh)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', shape=shape,
+                                     order='F' if fortran else 'C', offset=fh.tell())
+    return arrays
+
+
+class TreeEnsemblePredictor:
+    """Vectorized NumPy evaluation of exported LightGBM trees: every tree, every row, one step per depth level."""
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.missing_type = arrays['missing_type']
+        self.value = arrays['value']
+        self.roots = np.asarray(arrays['roots'])
+        self.max_depth = int(arrays['max_depth'][0])
+        self.n_features_in_ = int(arrays['num_features'][0])
+        self.average_output = bool(arrays['average_output'][0])
+        self.objective = str(arrays['objective'][0])
+        self.feature_names = [str(f) for f in arrays['feature_names']]
+        self.source_sha256 = str(arrays['source_sha256'][0])
+        self.children = np.stack([self.left, self.right], axis=1).ravel().astype(np.intp)
+        self.is_leaf = np.asarray(self.left) == np.arange(len(self.left))
+        self._has_zero_missing = bool(np.any(np.asarray(self.missing_type) == MISSING_ZERO))
+        # Tables exported before categorical support have no categorical nodes
+        self.is_categorical = arrays.get('is_categorical')
+        self._has_categorical = self.is_categorical is not None and bool(np.any(self.is_categorical))
+        if self._has_categorical:
+            self.cat_offset = np.asarray(arrays['cat_offset'], dtype=np.intp)
+            self.cat_len = np.asarray(arrays['cat_len'], dtype=np.intp)
+            self.cat_bits = np.asarray(arrays['cat_bits'])
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _special_left(self, node, x):
+        """Direction for NaN / zero inputs, following LightGBM's missing-value rules."""
+        missing_type = self.missing_type[node]
+        is_nan = np.isnan(x)
+        x = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, x)
+        use_default = ((missing_type == MISSING_ZERO) & (np.abs(x) <= _ZERO_THRESHOLD)) | \
+                      ((missing_type == MISSING_NAN) & is_nan)
+        return np.where(use_default, self.default_left[node], x <= self.threshold[node])
+
+    def _categorical_left(self, node, x):
+        """LightGBM's categorical rule: left iff int(x) is in the node's category bitset; NaN/negative go right."""
+        x = np.where(np.isnan(x), -1.0, np.trunc(x))
+        word = np.floor_divide(x, 32.0)
+        inside = (x >= 0) & (word < self.cat_len[node])
+        left = np.zeros(len(x), dtype=np.bool_)
+        if inside.any():
+            v = x[inside].astype(np.int64)
+            bits = self.cat_bits[self.cat_offset[node[inside]] + (v >> 5)]
+            left[inside] = (bits >> (v & 31).astype(np.uint32)) & 1
+        return left
+
+    def _raw_scores(self, X):
+        n, n_trees = X.shape[0], self.n_trees
+        X_flat = X.ravel()
+        node = np.broadcast_to(self.roots, (n, n_trees)).astype(np.intp).ravel()
+        row_offset = np.repeat(np.arange(n, dtype=np.intp) * X.shape[1], n_trees)
+        # Only (row, tree) cells still sitting on a split node are advanced each level
+        active = np.flatnonzero(~np.take(self.is_leaf, node, mode='clip'))
+        while active.size:
+            cur = node[active]
+            # np.take(mode='clip') skips bounds checks; indices always come from the tables themselves
+            x = np.take(X_flat, row_offset[active] + np.take(self.feature, cur, mode='clip'), mode='clip')
+            go_left = x <= np.take(self.threshold, cur, mode='clip')
+            # Only NaN (and zero, for zero-as-missing models) need the missing-value rules
+            special = np.isnan(x)
+            if self._has_zero_missing:
+                special |= np.abs(x) <= _ZERO_THRESHOLD
+            if special.any():
+                go_left[special] = self._special_left(cur[special], x[special])
+            if self._has_categorical:
+                cat = np.take(self.is_categorical, cur, mode='clip')
+                if cat.any():
+                    go_left[cat] = self._categorical_left(cur[cat], x[cat])
+            # children is [left, right] interleaved, so one gather picks the next node
+            nxt = np.take(self.children, 2 * cur + (~go_left), mode='clip')
+            node[active] = nxt
+            active = active[~np.take(self.is_leaf, nxt, mode='clip')]
+        return np.take(self.value, node, mode='clip').reshape(n, n_trees).sum(axis=1)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+
+        chunk = max(1, _CHUNK_CELLS // max(self.n_trees, 1))
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], chunk):
+            out[start:start + chunk] = self._raw_scores(X[start:start + chunk])
+
+        if self.average_output:
+            out /= max(self.n_trees, 1)
+        if self.objective.startswith(_EXP_OBJECTIVES):
+            np.exp(out, out=out)
+        return out
+
+
+def load_tree_model(path=TREE_MODEL_PATH, mmap=True):
+    arrays = mmap_npz(path) if mmap else dict(np.load(path))
+    return TreeEnsemblePredictor(arrays)
+
+
+def export_model(model_path=MODEL_PATH, tree_model_path=TREE_MODEL_PATH):
+    print(f"🌳 Exporting tree tables from {model_path}...")
+    model = joblib.load(model_path)
+    export_tree_tables(model, tree_model_path, source_path=model_path)
+    predictor = load_tree_model(tree_model_path)
+    print(f"✅ {predictor.n_trees} trees (max depth {predictor.max_depth}) saved to {tree_model_path}")
+    return predictor
+
+
+if __name__ == "__main__":
+    export_model()
@@ -0,0 +1,253 @@
+import os
+import glob
+import json
+import fnmatch
+import time
+import inspect
+import hashlib
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+MANIFEST_PATH = "data/pipeline_manifest.json"
+
+
+class StageFailed(Exception):
+    pass
+
+
+class Stage:
+    """
+    One pipeline step. `inputs`/`outputs` are files, directories or glob patterns; `code` lists the
+    source files whose contents count as the stage's code (default: the module defining `func`),
+    and `version` is bumped by hand for changes the hashes can't see (e.g. an external API).
+    `func` fails by raising or returning False. `always_run` stages (e.g. fetching from the web)
+    have no hashable inputs and run every time; `optional` ones don't block dependents on failure.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), version="1", code=None, deps=(),
+                 always_run=False, optional=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.version = str(version)
+        self.code = list(code) if code is not None else [inspect.getsourcefile(func)]
+        self.deps = set(deps)
+        self.always_run = always_run
+        self.optional = optional
+
+
+def _expand(path):
+    """Files behind a path, directory or glob pattern, sorted; temp/partial files are ignored."""
+    if any(ch in path for ch in "*?["):
+        matches = glob.glob(path, recursive=True)
+    elif os.path.isdir(path):
+        matches = [os.path.join(root, name) for root, _, files in os.walk(path) for name in files]
+    else:
+        matches = [path] if os.path.exists(path) else []
+    return sorted(p for p in matches if os.path.isfile(p) and not p.endswith((".tmp", ".part", ".pyc")))
+
+
+def _covers(output, path):
+    output = output.rstrip("/")
+    return path == output or path.startswith(output + "/") or fnmatch.fnmatch(path, output)
+
+
+class FileHasher:
+    """sha256 of file contents, memoized on (size, mtime) so unchanged files are never re-read."""
+
+    def __init__(self, cache=None):
+        self.cache = dict(cache or {})
+        self._lock = threading.Lock()
+
+    def file(self, path):
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            hit = self.cache.get(path)
+        if hit and hit[:2] == stamp:
+            return hit[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.cache[path] = stamp + [digest]
+        return digest
+
+    def paths(self, paths):
+        """Digest of every file under `paths`. Directories/globs hash contents only, so a re-fetched
+        file that's identical to one we already have (new name, same bytes) doesn't trigger a rerun."""
+        h = hashlib.sha256()
+        for path in paths:
+            digests = sorted({self.file(f) for f in _expand(path)})
+            h.update(path.encode() + b"\0" + "".join(digests).encode() + b"\n")
+        return h.hexdigest()
+
+    def live_entries(self):
+        with self._lock:
+            entries = list(self.cache.items())  # stages running in parallel may still be adding
+        return {path: entry for path, entry in entries if os.path.exists(path)}
+
+
+class Pipeline:
+    """
+    Small DAG executor. Dependencies come from `deps` plus any stage whose outputs another
+    stage reads. A stage is skipped when its key (version + code + input contents) matches the
+    manifest and its outputs are still what it last wrote. Stages run as soon as their
+    dependencies finish, up to `workers` at a time.
+    """
+
+    def __init__(self, stages, manifest_path=MANIFEST_PATH, workers=4):
+        self.stages = {s.name: s for s in stages}
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self._lock = threading.Lock()
+        for stage in stages:
+            for other in stages:
+                if other is not stage and any(_covers(out, inp) or _covers(inp, out)
+                                              for out in other.outputs for inp in stage.inputs):
+                    stage.deps.add(other.name)
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(name, trail):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Pipeline cycle: {' -> '.join(trail + [name])}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+                visit(dep, trail + [name])
+            state[name] = "done"
+
+        for name in self.stages:
+            visit(name, [])
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {"stages": {}, "files": {}}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    def stage_key(self, stage, hasher):
+        h = hashlib.sha256()
+        h.update(f"{stage.name}\0{stage.version}\0".encode())
+        h.update(hasher.paths(stage.code).encode())
+        h.update(hasher.paths(stage.inputs).encode())
+        return h.hexdigest()
+
+    def _is_fresh(self, stage, key, record, hasher):
+        if stage.always_run or not record or record.get("key") != key:
+            return False
+        if not all(_expand(out) for out in stage.outputs):
+            return False
+        return record.get("outputs") == hasher.paths(stage.outputs)
+
+    def _run_stage(self, stage, manifest, hasher, force):
+        start = time.perf_counter()
+        record = manifest["stages"].get(stage.name)
+        key = self.stage_key(stage, hasher)
+        if stage.name not in force and self._is_fresh(stage, key, record, hasher):
+            return {"status": "skipped", "cache": "hit", "seconds": round(time.perf_counter() - start, 3)}
+
+        print(f"\n[STAGE] {stage.name}")
+        result = stage.func()
+        if result is False:
+            raise StageFailed(f"{stage.name} reported failure")
+        missing = [out for out in stage.outputs if not _expand(out)]
+        if missing:
+            raise StageFailed(f"{stage.name} did not produce {', '.join(missing)}")
+        # Re-key after running: always_run stages (fetch) may have changed their own inputs
+        record = {
+            "key": self.stage_key(stage, hasher),
+            "outputs": hasher.paths(stage.outputs),
+            "version": stage.version,
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            manifest["stages"][stage.name] = record
+            # Saved per stage, so a crash later in the run keeps what already finished
+            manifest["files"] = hasher.live_entries()
+            self._save_manifest(manifest)
+        return {"status": "ran", "cache": "miss", "seconds": round(time.perf_counter() - start, 3)}
+
+    def run(self, force=(), only=None, on_result=None):
+        """
+        Runs the DAG; `force` names stages to rerun regardless of the manifest, `only` limits the
+        run to those stages (and what they depend on). Returns {stage: {status, cache, seconds}};
+        `on_result(stage, result)` is also called as each stage finishes.
+        """
+        force = set(self.stages) if force == "all" else set(force)
+        selected = set(self.stages)
+        if only:
+            selected, todo = set(), list(only)
+            while todo:
+                name = todo.pop()
+                if name not in selected:
+                    selected.add(name)
+                    todo.extend(self.stages[name].deps)
+
+        manifest = self._load_manifest()
+        hasher = FileHasher(manifest.get("files"))
+        results = {}
+        remaining = {name: self.stages[name].deps & selected for name in selected}
+
+        def blocked(name):
+            return any(results.get(dep, {}).get("status") in ("failed", "blocked")
+                       and not self.stages[dep].optional for dep in self.stages[name].deps)
+
+        def run_one(stage):
+            start = time.perf_counter()
+            try:
+                return self._run_stage(stage, manifest, hasher, force)
+            except Exception as e:
+                print(f"❌ Stage '{stage.name}' failed: {e}")
+                return {"status": "failed", "cache": "miss", "seconds": round(time.perf_counter() - start, 3),
+                        "error": str(e)}
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while remaining or running:
+                for name in [n for n, deps in remaining.items() if not deps]:
+                    del remaining[name]
+                    if blocked(name):
+                        results[name] = {"status": "blocked", "cache": None, "seconds": None}
+                        if on_result:
+                            on_result(name, results[name])
+                        for deps in remaining.values():
+                            deps.discard(name)
+                        continue
+                    running[pool.submit(run_one, self.stages[name])] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if on_result:
+                        on_result(name, results[name])
+                    for deps in remaining.values():
+                        deps.discard(name)
+
+        manifest["files"] = hasher.live_entries()
+        manifest["last_run"] = {
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - started, 3),
+            "stages": results,
+        }
+        self._save_manifest(manifest)
+        return results
@@ -1,38 +1,152 @@
 import sys
 import os
+import time
+import argparse
 
 # Add project root to python path so we can import from src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+import mlflow
+
+from src.pipeline.dag import Stage, Pipeline, MANIFEST_PATH
 from src.data.fetch_data import fetch_daily_data
 from src.data.preprocess import clean_data
 from src.features.build_features import build_features
 from src.models.train import train
+from src.models.forecast import build_forecast
+from src.utils import telemetry
+
+# CONFIG
+MLFLOW_EXPERIMENT_NAME = "Pipeline_Runs"
+# Last run's stage timings for Prometheus (node_exporter textfile collector; the API's /metrics serves it too)
+PIPELINE_METRICS_PATH = os.getenv("PIPELINE_METRICS_PATH", "data/metrics/pipeline.prom")
+
+
+def fetch():
+    # Always the UI download: the fast XHR path is CLI-only until a live HAR fixture backs it
+    return fetch_daily_data(mode="full") is not None
+
+
+def retrain():
+    # Daily runs warm-start from the current model; incremental.py decides when to retrain in full
+    return train(incremental_mode=True)
+
+
+# Each stage re-runs only when its code, version or input contents change. Bump `version`
+# for changes the hashes can't see (new site layout, changed external data, ...).
+STAGES = [
+    Stage("fetch", fetch, outputs=["data/raw"],
+          code=["src/data/fetch_data.py"], always_run=True, optional=True),
+    Stage("clean", clean_data, inputs=["data/raw/*.csv"],
+          outputs=["data/history", "data/processed/clean_data.csv"],
+          code=["src/data/preprocess.py", "src/data/history.py"]),
+    Stage("features", build_features, inputs=["data/history"],
+          outputs=["data/features/training_data.csv", "models/encoders.joblib",
+                   "models/feature_transformer.joblib", "models/feature_store.npz"],
+          code=["src/features", "src/data/history.py"]),
+    Stage("train", retrain, inputs=["data/features/training_data.csv", "models/feature_transformer.joblib"],
+          outputs=["models/best_model.joblib", "models/best_model.npz"],
+          code=["src/models/train.py", "src/models/incremental.py", "src/models/tree_predictor.py",
+                "src/features/transform.py"]),
+    # Scores the latest snapshot with the registry's CURRENT version (reruns when it's promoted)
+    Stage("forecast", build_forecast,
+          inputs=["models/best_model.joblib", "models/feature_store.npz", "models/registry/CURRENT"],
+          outputs=["models/forecast.npz"],
+          code=["src/models/forecast.py", "src/features/transform.py", "src/features/feature_store.py"]),
+]
+
+
+def failed_stages(results):
+    """Stages that failed or were blocked, ignoring optional ones (a failed fetch reuses yesterday's data)."""
+    optional = {s.name for s in STAGES if s.optional}
+    return [name for name, r in results.items() if r["status"] in ("failed", "blocked") and name not in optional]
+
+
+def log_pipeline_run(results, seconds):
+    """One MLflow run per pipeline run: wall time and cache hit/miss per stage."""
+    try:
+        mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+        with mlflow.start_run(run_name="pipeline"):
+            mlflow.log_params({f"{name}_status": r["status"] for name, r in results.items()})
+            metrics = {"total_seconds": seconds,
+                       "stages_run": sum(r["status"] == "ran" for r in results.values()),
+                       "stages_skipped": sum(r["status"] == "skipped" for r in results.values())}
+            for name, r in results.items():
+                if r["seconds"] is not None:
+                    metrics[f"{name}_seconds"] = r["seconds"]
+                metrics[f"{name}_cache_hit"] = int(r["cache"] == "hit")
+            mlflow.log_metrics(metrics)
+    except Exception as e:
+        print(f"⚠️ Could not log pipeline run to MLflow: {e}")
 
-def run_pipeline():
+
+def export_pipeline_metrics(results, seconds, path=PIPELINE_METRICS_PATH):
+    """Writes the run's per-stage wall times as gauges; the file is replaced on every run."""
+    registry = telemetry.Registry()
+    stage_seconds = registry.gauge("pipeline_stage_duration_seconds", "Wall time of each stage in the last pipeline run.",
+                                   ("stage", "status", "cache"))
+    for name, r in results.items():
+        if r["seconds"] is not None:
+            stage_seconds.set(r["seconds"], name, r["status"], r["cache"] or "none")
+    registry.gauge("pipeline_run_duration_seconds", "Wall time of the last pipeline run.").set(seconds)
+    registry.gauge("pipeline_failed_stages", "Required stages that failed or were blocked in the last run.").set(
+        len(failed_stages(results)))
+    registry.gauge("pipeline_last_run_timestamp_seconds", "Unix time the last pipeline run finished.").set(time.time())
+    try:
+        telemetry.write_textfile(registry, path)
+    except OSError as e:
+        print(f"⚠️ Could not write pipeline metrics: {e}")
+
+
+def run_pipeline(force=(), only=None, skip_fetch=False, workers=4, log_mlflow=True):
     print("="*50)
     print("🚜 KsetrikahGPT: STARTING PIPELINE")
     print("="*50)
-    
-    # 1. Fetch
-    print("\n[STEP 1] Fetching Data...")
-    fetch_daily_data()
-    
-    # 2. Clean
-    print("\n[STEP 2] Cleaning Data...")
-    clean_data()
-    
-    # 3. Features
-    print("\n[STEP 3] Engineering Features...")
-    build_features()
-    
-    # 4. Train
-    print("\n[STEP 4] Training Model...")
-    train()
-    
+
+    # One trace per run: each stage is a span, logged as it finishes and again in the run summary
+    trace = telemetry.Trace()
+
+    def on_stage(name, r):
+        if r["seconds"] is not None:
+            trace.spans.append((name, r["seconds"]))
+        telemetry.log_event("pipeline_stage", run_id=trace.request_id, stage=name, status=r["status"],
+                            cache=r["cache"], duration_ms=round(r["seconds"] * 1000, 3) if r["seconds"] is not None else None)
+
+    stages = [s for s in STAGES if not (skip_fetch and s.name == "fetch")]
+    start = time.perf_counter()
+    results = Pipeline(stages, MANIFEST_PATH, workers=workers).run(force=force, only=only, on_result=on_stage)
+    seconds = round(time.perf_counter() - start, 3)
+    telemetry.log_event("pipeline_run", run_id=trace.request_id, failed=failed_stages(results),
+                        duration_ms=round(seconds * 1000, 3), spans=trace.span_ms())
+    export_pipeline_metrics(results, seconds)
+
     print("\n" + "="*50)
-    print("✅ PIPELINE FINISHED")
+    for name, r in results.items():
+        took = f"{r['seconds']:.2f}s" if r["seconds"] is not None else "-"
+        print(f"  {name:<10} {r['status']:<8} {took:>9}  cache {r['cache'] or '-'}")
+    failed = failed_stages(results)
+    print(f"{'❌ PIPELINE FAILED' if failed else '✅ PIPELINE FINISHED'} in {seconds:.2f}s")
     print("="*50)
 
+    if log_mlflow:
+        log_pipeline_run(results, seconds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fetch -> clean -> features -> train -> forecast pipeline")
+    parser.add_argument("--force", default="", help="comma-separated stages to rerun regardless of the manifest, or 'all'")
+    parser.add_argument("--only", default="", help="comma-separated stages to run (plus the stages they depend on)")
+    parser.add_argument("--skip-fetch", action="store_true", help="use the raw files already on disk")
+    parser.add_argument("--workers", type=int, default=4, help="independent stages run in parallel")
+    parser.add_argument("--no-mlflow", action="store_true")
+    args = parser.parse_args()
+
+    force = "all" if args.force == "all" else [s for s in args.force.split(",") if s]
+    only = [s for s in args.only.split(",") if s] or None
+    results = run_pipeline(force, only, args.skip_fetch, args.workers, not args.no_mlflow)
+    sys.exit(1 if failed_stages(results) else 0)
+
+
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    main()
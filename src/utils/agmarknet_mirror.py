@@ -0,0 +1,211 @@
+"""
+Local stand-in for the Agmarknet report page (testing the fetch agent and backfill offline).
+
+    python src/utils/agmarknet_mirror.py --port 8088 --template data/raw/agmarknet_2026-02-03.csv
+
+then point the agent at it:
+    python src/data/backfill.py --base-url http://127.0.0.1:8088/ --start 2025-01-01 --end 2025-01-07
+
+The page reproduces the controls the agent drives (variety dropdown with "Individual", report date,
+commodity group, "Go", the report table and the Download -> "Download as CSV" menu). The table is
+filled from a JSON XHR (/api/report), and the page pulls font/image/analytics assets like the real SPA.
+Reports for any date are synthesized from one raw template by relabelling the dates and jittering prices.
+"""
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.data.history import read_snapshot, write_raw_report, PRICE_COLS, ARRIVAL_COLS
+
+TEMPLATE_PATH = "data/raw/agmarknet_2026-02-03.csv"
+DATE_FORMAT = "%d-%m-%Y"
+ALL_GROUPS = "All Commodity Groups"
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Agmarknet (mirror)</title>
+<link rel="stylesheet" href="/assets/site.css">
+<script src="/assets/analytics.js" async></script>
+</head><body>
+<img src="/assets/banner.jpg" alt="banner" width="600">
+<div id="filters">
+  <div id="variety" tabindex="0">Variety
+    <div id="variety-menu" style="display:none">
+      <label><input type="checkbox" checked> All Varieties</label>
+      <label><input type="checkbox" id="individual"> Individual</label>
+    </div>
+  </div>
+  <input id="date" type="text" placeholder="dd-mm-yyyy" value="__TODAY__">
+  <select id="group">__GROUPS__</select>
+  <button aria-label="Apply filters and generate report">Go</button>
+</div>
+<table id="report"><thead><tr><th>Commodity Group</th><th>Commodity</th><th>Variety</th></tr></thead><tbody></tbody></table>
+<button title="Download Report"><svg width="10" height="10"></svg></button>
+<div id="download-menu" style="display:none"><a id="csv" href="#">Download as CSV</a></div>
+<script>
+const q = (s) => document.querySelector(s);
+q('#variety').addEventListener('click', () => { q('#variety-menu').style.display = 'block'; });
+document.addEventListener('keydown', (e) => { if (e.key === 'Escape') q('#variety-menu').style.display = 'none'; });
+let params = null;
+q('button[aria-label^="Apply"]').addEventListener('click', async () => {
+  params = new URLSearchParams({date: q('#date').value, group: q('#group').value,
+                                individual: q('#individual').checked ? '1' : '0'});
+  const tbody = q('#report tbody');
+  tbody.innerHTML = '';
+  const res = await fetch('/api/report?' + params);
+  const data = await res.json();
+  for (const r of data.rows) {
+    const tr = document.createElement('tr');
+    tr.innerHTML = `<td>${r.commodity_group}</td><td>${r.commodity}</td><td>${r.variety}</td>`;
+    tbody.appendChild(tr);
+  }
+});
+q('button[title="Download Report"]').addEventListener('click', () => {
+  q('#download-menu').style.display = 'block';
+  q('#csv').setAttribute('href', '/download.csv?' + params);
+  q('#csv').setAttribute('download', 'report.csv');
+});
+</script>
+</body></html>
+"""
+
+
+class MirrorConfig:
+    def __init__(self, template=TEMPLATE_PATH, latency=0.0, asset_latency=0.2, asset_bytes=200_000,
+                 fail_first=0, empty_weekday=None):
+        self.template = read_snapshot(template)
+        self.groups = sorted(self.template['Commodity_Group'].unique())
+        self.latency = latency              # seconds before each report/XHR response
+        self.asset_latency = asset_latency  # seconds for fonts/images/analytics (what the fast path blocks)
+        self.asset_bytes = asset_bytes
+        self.fail_first = fail_first        # fail this many report requests per (date, group) with a 503
+        self.empty_weekday = empty_weekday  # weekday (0=Mon) with no market data, like a holiday
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def should_fail(self, key):
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            return self.calls[key] <= self.fail_first
+
+    def report(self, day, group):
+        """Synthetic wide report for `day`: template rows with a deterministic per-day price jitter."""
+        if self.empty_weekday is not None and day.weekday() == self.empty_weekday:
+            return self.template.iloc[0:0], []
+        df = self.template if group in (None, "", ALL_GROUPS) else \
+            self.template[self.template['Commodity_Group'] == group]
+        df = df.copy()
+        rng = np.random.default_rng(zlib.crc32(day.isoformat().encode()))
+        for cols in (PRICE_COLS, ARRIVAL_COLS):
+            df[cols] = (df[cols] * rng.uniform(0.9, 1.1, size=(len(df), len(cols)))).round(2)
+        return df, [day - timedelta(days=i) for i in range(len(PRICE_COLS))]
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _report_args(self, query):
+        day = datetime.strptime(query.get("date", [""])[0], DATE_FORMAT).date()
+        return day, query.get("group", [ALL_GROUPS])[0]
+
+    def do_GET(self):
+        cfg = self.config
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path == "/":
+                groups = "".join(f"<option>{g}</option>" for g in [ALL_GROUPS] + cfg.groups)
+                page = PAGE.replace("__GROUPS__", groups).replace("__TODAY__", datetime.now().strftime(DATE_FORMAT))
+                return self._send(200, page.encode(), "text/html; charset=utf-8")
+            if url.path.startswith("/assets/"):
+                time.sleep(cfg.asset_latency)
+                kind = "text/css" if url.path.endswith(".css") else \
+                       "application/javascript" if url.path.endswith(".js") else "image/jpeg"
+                body = b"/* */" if kind != "image/jpeg" else b"\xff" * cfg.asset_bytes
+                return self._send(200, body, kind)
+            if url.path in ("/api/report", "/download.csv"):
+                day, group = self._report_args(query)
+                time.sleep(cfg.latency)
+                if cfg.should_fail((url.path, day, group)):
+                    return self._send(503, b'{"error": "mirror failure"}', "application/json")
+                df, dates = cfg.report(day, group)
+                if url.path == "/api/report":
+                    return self._send(200, json.dumps(report_json(df, dates)).encode(), "application/json")
+                buf = io.StringIO()
+                if dates:
+                    write_raw_report(df, dates, buf)
+                return self._send(200, buf.getvalue().encode(), "text/csv")
+            self._send(404, b"not found", "text/plain")
+        except ValueError as e:
+            self._send(400, json.dumps({"error": str(e)}).encode(), "application/json")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def report_json(df, dates):
+    """Shape of the report XHR: per-row values with the dates they refer to (newest first)."""
+    return {
+        "report_date": dates[0].strftime(DATE_FORMAT) if dates else None,
+        "dates": [d.strftime(DATE_FORMAT) for d in dates],
+        "rows": [{
+            "commodity_group": r.Commodity_Group, "commodity": r.Commodity, "variety": r.Variety,
+            "msp": None if np.isnan(r.MSP) else r.MSP,
+            "prices": [None if np.isnan(v) else v for v in (r.Price_Today, r.Price_1DayAgo, r.Price_2DaysAgo)],
+            "arrivals": [None if np.isnan(v) else v for v in (r.Arrival_Today, r.Arrival_1DayAgo, r.Arrival_2DaysAgo)],
+        } for r in df.itertuples(index=False)],
+    }
+
+
+def start_mirror_server(host="127.0.0.1", port=0, **config):
+    """Starts the mirror in a daemon thread; returns (server, base_url). port=0 picks a free port."""
+    handler = type("ConfiguredMirrorHandler", (MirrorHandler,), {"config": MirrorConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Agmarknet report mirror")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--template", default=TEMPLATE_PATH)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--asset-latency", type=float, default=0.2)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--empty-weekday", type=int, default=None)
+    args = parser.parse_args()
+
+    server, url = start_mirror_server(args.host, args.port, template=args.template, latency=args.latency,
+                                      asset_latency=args.asset_latency, fail_first=args.fail_first,
+                                      empty_weekday=args.empty_weekday)
+    print(f"🪞 Agmarknet mirror on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
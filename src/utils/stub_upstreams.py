@@ -0,0 +1,147 @@
+"""
+Local stand-in for the OpenRouter and ElevenLabs APIs (testing and benchmarks).
+
+    python src/utils/stub_upstreams.py --port 8089 --latency 0.2 --fail-first 1
+
+then run the API with
+    OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1 ELEVENLABS_BASE_URL=http://127.0.0.1:8089/v1
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REPLY_TEXT = "The leaves show early blight. Remove infected leaves and spray a copper-based fungicide."
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, token_delay=0.01, fail_first=0, fail_status=503,
+                 audio_bytes=48000, audio_chunk=4096, reply_text=REPLY_TEXT):
+        self.latency = latency            # seconds before the first byte
+        self.token_delay = token_delay    # seconds between streamed chunks
+        self.fail_first = fail_first      # fail this many requests per path with fail_status
+        self.fail_status = fail_status
+        self.audio_bytes = audio_bytes
+        self.audio_chunk = audio_chunk
+        self.reply_text = reply_text
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def should_fail(self, key):
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            return self.calls[key] <= self.fail_first
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    config = StubConfig()
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(body or b"{}")
+        except ValueError:
+            return {}
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def do_POST(self):
+        cfg = self.config
+        payload = self._read_json()
+        route = "chat" if self.path.endswith("/chat/completions") else \
+                "tts" if "/text-to-speech/" in self.path else None
+        if route is None:
+            return self._send(404, b'{"error": "not found"}')
+        time.sleep(cfg.latency)
+        if cfg.should_fail(route):
+            return self._send(cfg.fail_status, b'{"error": "stub failure"}', headers={"Retry-After": "0"})
+
+        try:
+            if route == "chat":
+                self._chat(payload)
+            else:
+                self._tts(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-stream
+
+    def _chat(self, payload):
+        cfg = self.config
+        if not payload.get("stream"):
+            body = {"choices": [{"message": {"role": "assistant", "content": cfg.reply_text}}],
+                    "model": payload.get("model")}
+            return self._send(200, json.dumps(body).encode())
+
+        self._start_chunked("text/event-stream")
+        for word in cfg.reply_text.split(" "):
+            chunk = {"choices": [{"delta": {"content": word + " "}}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            time.sleep(cfg.token_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _tts(self, payload):
+        cfg = self.config
+        self._start_chunked("audio/mpeg")
+        seed = (payload.get("text") or "").encode() or b"\0"
+        sent = 0
+        while sent < cfg.audio_bytes:
+            n = min(cfg.audio_chunk, cfg.audio_bytes - sent)
+            self._write_chunk((seed * (n // len(seed) + 1))[:n])
+            sent += n
+            time.sleep(cfg.token_delay)
+        self._write_chunk(b"")
+
+
+def start_stub_server(host="127.0.0.1", port=0, **config):
+    """Starts the stub in a daemon thread; returns (server, base_url). port=0 picks a free port."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": StubConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenRouter + ElevenLabs server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.host, args.port, latency=args.latency, token_delay=args.token_delay,
+                                    fail_first=args.fail_first, fail_status=args.fail_status)
+    print(f"🧪 Stub upstreams on {url}  (OpenRouter: {url}/api/v1, ElevenLabs: {url}/v1)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import json
+import math
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Latency spans, counters/gauges/histograms and their Prometheus text exposition (format 0.0.4),
+# without a client library. Recording is a perf_counter pair, a lock and a bisect, cheap enough
+# to leave on for every request. Spans also land on the current trace (one per request or pipeline
+# stage), which is what the structured timing log lines are built from.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base for the metric types; label values are passed positionally, in `labelnames` order.
+    With `fn`, values are read at scrape time instead: fn() returns a number (no labels) or
+    {labelvalues tuple: number}, so counters a component already keeps cost nothing per request.
+    """
+    type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), fn=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _check(self, labelvalues):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        return tuple(str(v) for v in labelvalues)
+
+    def samples(self):
+        """[(suffix, labelvalues, extra labels, value)] for render()."""
+        if self.fn is None:
+            with self._lock:
+                return [("", labels, (), value) for labels, value in self._values.items()]
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [("", tuple(str(v) for v in labels), (), value) for labels, value in values.items()
+                if value is not None]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, labels, extra)} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        key = self._check(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, *labelvalues):
+        key = self._check(labelvalues)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labelvalues, amount=1):
+        key = self._check(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        key = self._check(labelvalues)
+        i = bisect.bisect_left(self.buckets, value)  # first bucket with value <= bound
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        out = []
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                out.append(("_bucket", labels, (("le", _number(float(bound))),), cumulative))
+            out.append(("_sum", labels, (), total))
+            out.append(("_count", labels, (), cumulative))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=(), fn=None):
+        return self._add(Counter(name, documentation, labelnames, fn))
+
+    def gauge(self, name, documentation, labelnames=(), fn=None):
+        return self._add(Gauge(name, documentation, labelnames, fn))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """The whole registry in Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+
+def write_textfile(registry, path):
+    """Writes the registry for node_exporter's textfile collector (atomically, it may be mid-scrape)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("stage_duration_seconds", "Time spent in each instrumented stage.", ("stage",))
+
+
+class Trace:
+    """Spans recorded under one request (or pipeline stage), in the order they finished."""
+    __slots__ = ("request_id", "started", "spans")
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def span_ms(self):
+        """{span name: ms}; repeated spans (e.g. one per streamed chunk) are summed."""
+        out = {}
+        for name, seconds in self.spans:
+            out[name] = out.get(name, 0.0) + seconds * 1000
+        return {name: round(ms, 3) for name, ms in out.items()}
+
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+def current_trace():
+    return _current.get()
+
+
+def start_trace(request_id=None):
+    """Makes a new trace current for this thread/context; returns it."""
+    trace = Trace(request_id)
+    _current.set(trace)
+    return trace
+
+
+def end_trace():
+    _current.set(None)
+
+
+def record(name, seconds):
+    """Records a span measured elsewhere (a worker process, a proxy header)."""
+    STAGE_SECONDS.observe(seconds, name)
+    trace = _current.get()
+    if trace is not None:
+        trace.spans.append((name, seconds))
+
+
+@contextmanager
+def span(name):
+    """Times the block as stage `name`: into the stage histogram and onto the current trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def log_event(event, **fields):
+    """One structured log line (JSON) on stdout."""
+    print(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str, ensure_ascii=False))
+
+
+def time_first(items, name, start):
+    """Passes `items` through, recording the time from `start` to the first item as span `name`."""
+    first = True
+    for item in items:
+        if first:
+            record(name, time.perf_counter() - start)
+            first = False
+        yield item
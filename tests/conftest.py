@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project as `src.…`, like the scripts do
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
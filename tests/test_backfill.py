@@ -0,0 +1,92 @@
+import os
+import json
+import asyncio
+from datetime import date
+
+import pytest
+
+from src.data.backfill import BackfillTask, Checkpoint, SiteConfig, backfill, plan_tasks
+from src.data.history import parse_report_dates
+from src.utils.agmarknet_mirror import start_mirror_server
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "..", "data", "raw", "agmarknet_2026-02-03.csv")
+START, END = date(2026, 2, 1), date(2026, 2, 2)
+
+
+def _chromium_available():
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            p.chromium.launch().close()
+        return True
+    except Exception:
+        return False
+
+
+needs_chromium = pytest.mark.skipif(not _chromium_available(), reason="Playwright Chromium not installed")
+
+
+@pytest.fixture
+def mirror():
+    server, url = start_mirror_server(template=TEMPLATE, asset_latency=0.0)
+    yield url, server.RequestHandlerClass.config
+    server.shutdown()
+    server.server_close()
+
+
+def _run(url, groups, raw_dir, checkpoint_path):
+    return asyncio.run(backfill(START, END, groups, SiteConfig(url, timeout_ms=15000, table_timeout_ms=5000),
+                                contexts=2, retries=1, raw_dir=str(raw_dir), checkpoint_path=str(checkpoint_path)))
+
+
+@needs_chromium
+def test_backfill_against_mirror_is_idempotent_and_resumable(mirror, tmp_path):
+    url, config = mirror
+    groups = config.groups[:2]
+    checkpoint_path = tmp_path / "checkpoint.json"
+    tasks = plan_tasks(START, END, groups)
+
+    checkpoint = _run(url, groups, tmp_path, checkpoint_path)
+    assert checkpoint.summary() == {"done": 4}
+    for task in tasks:
+        path = task.output_path(str(tmp_path))
+        assert os.path.basename(path).startswith(f"agmarknet_{task.day.isoformat()}_")
+        assert parse_report_dates(path)[0] == task.day
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+    # Forget two tasks, as if the run had been interrupted after the other two
+    state = json.loads(checkpoint_path.read_text())
+    for task in tasks[2:]:
+        del state["tasks"][task.id]
+    checkpoint_path.write_text(json.dumps(state))
+    calls = dict(config.calls)
+    outputs = {t.id: os.path.getmtime(t.output_path(str(tmp_path))) for t in tasks[:2]}
+
+    checkpoint = _run(url, groups, tmp_path, checkpoint_path)
+    assert checkpoint.summary() == {"done": 4}
+    refetched = {key for key, n in config.calls.items() if n != calls.get(key)}
+    assert {(day, group) for _, day, group in refetched} == {(t.day, t.group) for t in tasks[2:]}
+    assert outputs == {t.id: os.path.getmtime(t.output_path(str(tmp_path))) for t in tasks[:2]}
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [os.path.basename(t.output_path(str(tmp_path))) for t in tasks] + ["checkpoint.json"])
+
+
+def test_output_paths_depend_only_on_day_and_group(tmp_path):
+    task = BackfillTask(START, "Oil Seeds & Fruits")
+    assert task.output_path(str(tmp_path)) == str(tmp_path / "agmarknet_2026-02-01_oil-seeds-fruits.csv")
+    assert [t.id for t in plan_tasks(START, END, ["A", "B"])] == \
+        ["2026-02-02|A", "2026-02-02|B", "2026-02-01|A", "2026-02-01|B"]
+
+
+def test_checkpoint_survives_reload(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    done, empty, failed = (BackfillTask(START, g) for g in ("A", "B", "C"))
+    checkpoint = Checkpoint(path)
+    checkpoint.record(done, status="done")
+    checkpoint.record(empty, status="empty")
+    checkpoint.record(failed, status="failed")
+
+    reloaded = Checkpoint(path)
+    assert reloaded.finished(done) and reloaded.finished(empty)
+    assert not reloaded.finished(failed)  # failed tasks are retried on the next run
+    assert not os.path.exists(path + ".tmp")
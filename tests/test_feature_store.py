@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.benchmarks.synthetic import history_frame
+from src.features.feature_store import STORE_COLS, build_training_table, build_online_store, load_feature_store
+from src.features.transform import FEATURE_COLUMNS, LEGACY_FEATURE_COLUMNS, SERVING_UNKNOWN_COLS, FeatureTransformer
+
+
+def test_model_features_are_all_known_at_serving_time(tmp_path):
+    history = history_frame(5000)
+    table = build_training_table(history)
+    store = load_feature_store(build_online_store(history, str(tmp_path / "store.npz")))
+
+    assert not set(SERVING_UNKNOWN_COLS) & set(FEATURE_COLUMNS)
+    assert store.columns == STORE_COLS
+    assert set(STORE_COLS) <= set(table.columns)
+    # Every stored feature is populated for the next day about as often as in training,
+    # so serving doesn't push rows down a missing-value branch training rarely saw
+    features = np.asarray(store.features, dtype=np.float64)
+    for i, col in enumerate(STORE_COLS):
+        served = np.isnan(features[:, i]).mean()
+        trained = table[col].isna().mean()
+        assert served <= trained + 0.1, col
+
+
+def test_legacy_layout_still_reads_same_day_arrivals():
+    t = FeatureTransformer({}, feature_columns=LEGACY_FEATURE_COLUMNS)
+    row = t.transform_row({"MSP": 1.0, "Price_1DayAgo": 2.0, "Price_2DaysAgo": 3.0, "Arrival_Today": 7.0})
+    assert row[LEGACY_FEATURE_COLUMNS.index("Arrival_Today")] == 7.0
@@ -0,0 +1,34 @@
+import os
+import glob
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.data import fetch_data
+from src.data.history import parse_report_dates, read_snapshot
+
+# HARs recorded from the live site with --record-har; the fast path is only trusted against these
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "agmarknet", "*.har")))
+
+
+@pytest.mark.skipif(not FIXTURES, reason="no live Agmarknet HAR recorded yet (fetch_data.py --record-har)")
+@pytest.mark.parametrize("har", FIXTURES, ids=os.path.basename)
+def test_fast_and_full_agree_on_recorded_har(har, tmp_path, monkeypatch):
+    paths = {}
+    for mode in ("full", "fast"):
+        monkeypatch.setattr(fetch_data, "RAW_DATA_DIR", str(tmp_path))
+        result = fetch_data.fetch_daily_data(mode=mode, har=har)
+        assert result is not None, f"{mode} replay failed"
+        assert result["mode"] == mode, "fast path fell back to the download menu"
+        paths[mode] = shutil.move(result["path"], tmp_path / f"{mode}.csv")
+
+    assert parse_report_dates(paths["fast"]) == parse_report_dates(paths["full"])
+    pd.testing.assert_frame_equal(read_snapshot(paths["fast"]), read_snapshot(paths["full"]))
+
+
+def test_report_payload_rejects_unexpected_shape():
+    with pytest.raises(ValueError):
+        fetch_data.report_payload_to_snapshot({"rows": []})
+    with pytest.raises(ValueError):
+        fetch_data.report_payload_to_snapshot({"dates": ["01-02-2026"], "rows": [{}]})
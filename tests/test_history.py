@@ -0,0 +1,43 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.data.history import SNAPSHOT_COLS, ingest_raw, latest_snapshot, list_partitions, write_raw_report
+
+
+def _report(path, dates, prices, arrivals):
+    df = pd.DataFrame([["Vegetables", "Onion", "Red", np.nan, *prices, *arrivals]], columns=SNAPSHOT_COLS)
+    write_raw_report(df, dates, str(path))
+
+
+def test_latest_snapshot_counts_report_days_not_calendar_days(tmp_path):
+    raw, store = tmp_path / "raw", tmp_path / "history"
+    raw.mkdir()
+    # Market closed on the 2nd: the report for the 4th lists the 4th, 3rd and 1st
+    _report(raw / "agmarknet_2026-02-04.csv", [date(2026, 2, 4), date(2026, 2, 3), date(2026, 2, 1)],
+            [1400.0, 1300.0, 1100.0], [40.0, 30.0, 10.0])
+    ingest_raw(str(raw), str(store))
+    assert [day for day, _ in list_partitions(str(store))] == ["2026-02-01", "2026-02-03", "2026-02-04"]
+
+    row = latest_snapshot(str(store)).iloc[0]
+    assert (row["Price_Today"], row["Price_1DayAgo"], row["Price_2DaysAgo"]) == (1400.0, 1300.0, 1100.0)
+    assert (row["Arrival_Today"], row["Arrival_1DayAgo"], row["Arrival_2DaysAgo"]) == (40.0, 30.0, 10.0)
+
+
+def test_latest_snapshot_uses_only_the_last_three_partitions(tmp_path):
+    raw, store = tmp_path / "raw", tmp_path / "history"
+    raw.mkdir()
+    _report(raw / "a.csv", [date(2026, 2, 3), date(2026, 2, 2), date(2026, 2, 1)],
+            [1300.0, 1200.0, 1100.0], [30.0, 20.0, 10.0])
+    _report(raw / "b.csv", [date(2026, 2, 5), date(2026, 2, 4), date(2026, 2, 3)],
+            [1500.0, 1400.0, 1300.0], [50.0, 40.0, 30.0])
+    ingest_raw(str(raw), str(store))
+
+    snapshot = latest_snapshot(str(store))
+    assert len(snapshot) == 1
+    assert snapshot.loc[0, ["Price_Today", "Price_1DayAgo", "Price_2DaysAgo"]].tolist() == [1500.0, 1400.0, 1300.0]
+
+
+def test_latest_snapshot_of_empty_store(tmp_path):
+    assert latest_snapshot(str(tmp_path)).columns.tolist() == SNAPSHOT_COLS
@@ -0,0 +1,51 @@
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from src.benchmarks.synthetic import history_frame
+from src.features.feature_store import build_training_table
+from src.features.transform import CAT_COLS, FEATURE_COLUMNS, FeatureTransformer
+from src.models import incremental
+from src.models.tree_predictor import export_tree_tables, load_tree_model
+
+PARAMS = {"n_estimators": 200, "learning_rate": 0.1, "num_leaves": 15, "random_state": 0}
+
+
+def _training_data():
+    table = build_training_table(history_frame(6000))
+    transformer = FeatureTransformer({col: {label: i for i, label in enumerate(sorted(table[col].unique()))}
+                                      for col in CAT_COLS})
+    X = transformer.to_frame(transformer.transform_frame(table))
+    return X, table['Price_Today'], table['Date']
+
+
+def test_wrapped_boosters_survive_warm_start_joblib_and_export(tmp_path):
+    X, y, dates = _training_data()
+    new = (dates >= dates.max() - pd.Timedelta(days=2)).to_numpy()
+    cache_path = str(tmp_path / "train.bin")
+
+    model, info = incremental.full_retrain(X[~new], y[~new], dates[~new], PARAMS, cache_path=cache_path)
+    assert isinstance(model, lgb.LGBMRegressor)
+    assert model.n_features_in_ == len(FEATURE_COLUMNS) and info["rounds"] >= 1
+
+    updated, _ = incremental.warm_start(model, X[new], y[new], PARAMS, cache_path=cache_path, rounds=5)
+    assert updated.booster_.current_iteration() == model.booster_.current_iteration() + 5
+
+    path = tmp_path / "best_model.joblib"
+    joblib.dump(updated, path)
+    loaded = joblib.load(path)
+    assert loaded.n_features_in_ == len(FEATURE_COLUMNS)
+    assert list(loaded.feature_name_) == FEATURE_COLUMNS
+    expected = updated.booster_.predict(X)
+    np.testing.assert_allclose(loaded.predict(X), expected, rtol=1e-9)
+    np.testing.assert_allclose(loaded.predict(X.to_numpy(dtype=np.float32)), expected, rtol=1e-6)
+
+    # A second warm start from the reloaded model (tomorrow's run) works the same way
+    again, _ = incremental.warm_start(loaded, X[new], y[new], PARAMS, cache_path=cache_path, rounds=5)
+    assert again.booster_.current_iteration() == updated.booster_.current_iteration() + 5
+
+    # The API's NumPy fallback reads the same trees
+    export_tree_tables(loaded, str(tmp_path / "best_model.npz"))
+    predictor = load_tree_model(str(tmp_path / "best_model.npz"))
+    np.testing.assert_allclose(predictor.predict(X.to_numpy()), expected, rtol=1e-6, atol=1e-6)
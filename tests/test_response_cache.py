@@ -0,0 +1,132 @@
+import time
+import threading
+
+import pytest
+
+from src.api import response_cache
+from src.api.response_cache import ResponseCache, FlightTimeout
+
+
+def _run_concurrently(n, target):
+    results, errors = [None] * n, [None] * n
+    start = threading.Barrier(n)
+
+    def run(i):
+        start.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return results, errors
+
+
+def test_concurrent_callers_share_one_compute():
+    cache = ResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return "reply"
+
+    results, errors = _run_concurrently(8, lambda: cache.get_or_compute("k", compute))
+    assert errors == [None] * 8
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ["coalesced"] * 7 + ["miss"]
+    assert {value for value, _ in results} == {"reply"}
+    assert cache.get_or_compute("k", compute) == ("reply", "hit")
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_leader_error_reaches_followers_and_is_not_cached():
+    cache = ResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ConnectionError("upstream down")
+
+    results, errors = _run_concurrently(5, lambda: cache.get_or_compute("k", compute))
+    assert len(calls) == 1
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert cache.stats()["errors"] == 1 and cache.stats()["in_flight"] == 0
+
+    # Not cached: the next caller computes again
+    assert cache.get_or_compute("k", lambda: "ok") == ("ok", "miss")
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=60)
+    cache.put("k", "v")
+
+    now[0] += 59
+    assert cache.get("k") == "v"
+    now[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1
+    assert cache.get_or_compute("k", lambda: "fresh") == ("fresh", "miss")
+
+
+def test_lru_eviction_by_entry_count():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key)
+    cache.get("a")
+    cache.put("c", "c")
+    assert cache.get("b") is None and cache.get("a") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_follower_times_out_on_a_stuck_leader():
+    cache = ResponseCache(wait_timeout=0.2)
+    source, flight = cache.begin("k")
+    assert source == "miss"
+
+    start = time.perf_counter()
+    with pytest.raises(FlightTimeout):
+        cache.get_or_compute("k", lambda: pytest.fail("a follower must not compute"))
+    assert 0.2 <= time.perf_counter() - start < 1.0
+
+    # A streaming follower's deadline covers the whole replay, not each wait for the next part
+    def trickle():
+        for i in range(10):
+            time.sleep(0.05)
+            flight.append(str(i))
+
+    threading.Thread(target=trickle, daemon=True).start()
+    _, follower = cache.begin("k")
+    received = []
+    with pytest.raises(FlightTimeout):
+        for part in cache.follow(follower):
+            received.append(part)
+    assert 0 < len(received) < 10
+    assert cache.stats()["timeouts"] == 2
+
+    # The leader finishing later still completes the flight for everyone else
+    cache.complete("k", flight, "late reply")
+    assert cache.get("k") == "late reply"
+
+
+def test_streaming_follower_replays_leader_parts():
+    cache = ResponseCache(wait_timeout=5)
+    _, flight = cache.begin("k")
+    flight.append("a")
+    _, follower = cache.begin("k")
+
+    def finish():
+        time.sleep(0.05)
+        flight.append("b")
+        cache.complete("k", flight, "ab")
+
+    threading.Thread(target=finish).start()
+    assert list(cache.follow(follower)) == ["a", "b"]
+    assert follower.value == "ab"
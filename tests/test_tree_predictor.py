@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+import lightgbm as lgb
+
+from src.models.tree_predictor import export_tree_tables, load_tree_model
+
+N_ROWS = 2000
+N_FEATURES = 6
+
+
+def _data(seed=0, missing=0.1, zeros=0.05):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(N_ROWS, N_FEATURES))
+    X[:, -1] = rng.integers(0, 12, N_ROWS)  # categorical column
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + (X[:, -1] % 3) + rng.normal(0, 0.1, N_ROWS)
+    X[rng.random(X.shape) < missing] = np.nan
+    X[rng.random(X.shape) < zeros] = 0.0
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(N_FEATURES)]), y
+
+
+def _export(model, tmp_path, mmap=True):
+    path = tmp_path / "model.npz"
+    export_tree_tables(model, str(path))
+    return load_tree_model(str(path), mmap=mmap)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"zero_as_missing": True},
+    {"use_missing": False},
+    {"objective": "regression_l1"},
+])
+@pytest.mark.parametrize("categorical", [False, True])
+def test_matches_lgbm_predict(tmp_path, params, categorical):
+    X, y = _data()
+    model = lgb.LGBMRegressor(n_estimators=60, num_leaves=31, min_child_samples=5, verbose=-1, random_state=0,
+                              **params)
+    model.fit(X, y, categorical_feature=[X.columns[-1]] if categorical else "auto")
+    predictor = _export(model, tmp_path)
+
+    X_test, _ = _data(seed=1)
+    expected = model.predict(X_test)
+    np.testing.assert_allclose(predictor.predict(X_test.to_numpy()), expected, rtol=1e-9, atol=1e-9)
+    # Single rows go through the same code path as batches
+    for i in range(20):
+        row = X_test.to_numpy()[i]
+        assert predictor.predict(row)[0] == pytest.approx(expected[i], rel=1e-9, abs=1e-9)
+
+
+def test_matches_exp_objective_and_unseen_categories(tmp_path):
+    X, y = _data()
+    model = lgb.LGBMRegressor(objective="poisson", n_estimators=40, verbose=-1, random_state=0)
+    model.fit(X, np.abs(y), categorical_feature=[X.columns[-1]])
+    predictor = _export(model, tmp_path, mmap=False)
+
+    X_test, _ = _data(seed=2)
+    X_test.iloc[:50, -1] = [-1, 99, 1e6, np.nan, 3.7] * 10  # unknown, negative, huge, NaN, fractional codes
+    np.testing.assert_allclose(predictor.predict(X_test.to_numpy()), model.predict(X_test), rtol=1e-9, atol=1e-9)
+
+
+def test_rejects_wrong_width(tmp_path):
+    X, y = _data()
+    predictor = _export(lgb.LGBMRegressor(n_estimators=5, verbose=-1).fit(X, y), tmp_path)
+    with pytest.raises(ValueError):
+        predictor.predict(np.zeros((1, N_FEATURES + 1)))
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from src.api.tts_cache import DiskStore, MemoryLRU, TTSCache, tts_cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TTSCache(str(tmp_path / "tts"), memory_bytes=1000, disk_bytes=10_000)
+
+
+def _clip(n, fill=b"a"):
+    return [fill * 100] * n
+
+
+def test_stream_through_caches_complete_clip(cache):
+    key = tts_cache_key("hello", "en", "voice", "model")
+    assert b"".join(cache.stream_through(key, iter(_clip(3)))) == b"a" * 300
+    assert cache.get(key) == b"a" * 300
+    assert cache.counters["stored"] == 1 and cache.counters["aborted"] == 0
+
+
+def test_upstream_error_mid_stream_is_not_cached(cache):
+    def failing():
+        yield b"a" * 100
+        raise ConnectionError("upstream dropped")
+
+    chunks = []
+    with pytest.raises(ConnectionError):
+        for chunk in cache.stream_through("k", failing()):
+            chunks.append(chunk)
+    assert chunks == [b"a" * 100]
+    assert cache.memory.get("k") is None and cache.disk.get("k") is None
+    assert cache.counters["aborted"] == 1 and cache.counters["stored"] == 0
+
+
+def test_client_disconnect_is_not_cached(cache):
+    stream = cache.stream_through("k", iter(_clip(5)))
+    next(stream)
+    stream.close()  # what the WSGI server does when the client goes away
+    assert cache.get("k") is None
+    assert cache.counters["aborted"] == 1 and cache.counters["stored"] == 0
+
+
+def test_memory_lru_stays_within_budget():
+    lru = MemoryLRU(max_bytes=250)
+    for i in range(5):
+        lru.put(i, b"x" * 100)
+        assert lru.size <= 250
+    assert [lru.get(i) is not None for i in range(5)] == [False, False, False, True, True]
+
+    lru.get(3)
+    lru.put(5, b"x" * 100)  # evicts 4, the least recently used
+    assert lru.get(4) is None and lru.get(3) is not None
+    lru.put(3, b"x" * 50)  # replacing a key re-counts its bytes
+    assert lru.size == 150 and len(lru) == 2
+
+    lru.put("big", b"x" * 251)  # larger than the whole budget: not stored, nothing evicted
+    assert lru.get("big") is None and lru.size == 150
+
+
+def test_disk_eviction_trims_oldest_to_90_percent(tmp_path):
+    store = DiskStore(str(tmp_path), max_bytes=1000)
+    for i in range(10):
+        key = f"{i:02d}" + "0" * 62
+        store.put(key, b"x" * 100)
+        os.utime(store._path(key), (i, i))  # deterministic recency
+    assert store.size == 1000
+
+    store.put("10" + "0" * 62, b"x" * 100)  # over budget: drop oldest until <= 900 bytes
+    assert store.size == 900
+    assert store.get("00" + "0" * 62) is None and store.get("01" + "0" * 62) is None
+    assert store.get("02" + "0" * 62) is not None and store.get("10" + "0" * 62) is not None
+    assert DiskStore(str(tmp_path), max_bytes=1000).size == 900  # size survives a restart
+
+
+def test_disk_hit_refills_memory(tmp_path):
+    directory = str(tmp_path / "tts")
+    TTSCache(directory, 1000, 10_000).put("k", b"clip")
+    cache = TTSCache(directory, 1000, 10_000)  # fresh process: empty memory tier
+    assert cache.get("k") == b"clip" and cache.get("k") == b"clip"
+    assert cache.counters["disk_hits"] == 1 and cache.counters["memory_hits"] == 1
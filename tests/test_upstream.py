@@ -0,0 +1,177 @@
+import time
+import socket
+import asyncio
+
+import httpx
+import pytest
+
+from src.api import upstream
+from src.api.upstream import AsyncUpstreamClient, UpstreamClient, UpstreamBusy
+from src.utils.stub_upstreams import start_stub_server
+
+CHAT = "/api/v1/chat/completions"
+BODY = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**config):
+        server, url = start_stub_server(**config)
+        servers.append(server)
+        return url, server.RequestHandlerClass.config
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """Records (free slots, Retry-After) at every backoff and skips the sleep."""
+    seen = []
+    clients = []
+
+    def fake_backoff(attempt, base, cap, retry_after=None):
+        seen.append((clients[0]._slots._value, retry_after))
+        return 0
+
+    monkeypatch.setattr(upstream, "backoff_delay", fake_backoff)
+    return seen, clients
+
+
+def _async_client(url, **kwargs):
+    return AsyncUpstreamClient("stub", url, **{"max_concurrency": 2, "backoff_base": 0.01, **kwargs})
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_async_retries_then_succeeds(stub, backoffs, status):
+    url, config = stub(fail_first=2, fail_status=status)
+    seen, clients = backoffs
+
+    async def run():
+        client = _async_client(url, max_retries=2)
+        clients.append(client)
+        try:
+            resp = await client.post(CHAT, json=BODY)
+        finally:
+            await client.aclose()
+        return resp, client
+
+    resp, client = asyncio.run(run())
+    assert resp.status_code == 200
+    assert resp.json()["choices"][0]["message"]["content"]
+    assert config.calls["chat"] == 3
+    # both backoffs happened with the slot given back, and Retry-After was passed through
+    assert seen == [(2, "0"), (2, "0")]
+    assert client._slots._value == 2
+
+
+def test_async_gives_up_after_max_retries(stub, backoffs):
+    url, config = stub(fail_first=10, fail_status=503)
+    _, clients = backoffs
+
+    async def run():
+        client = _async_client(url, max_retries=1)
+        clients.append(client)
+        try:
+            return await client.post(CHAT, json=BODY), client
+        finally:
+            await client.aclose()
+
+    resp, client = asyncio.run(run())
+    assert resp.status_code == 503
+    assert config.calls["chat"] == 2
+    assert client._slots._value == 2
+
+
+def test_async_connect_failure_is_retried_and_releases(backoffs):
+    seen, clients = backoffs
+    with socket.socket() as sock:  # a port nothing listens on
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    async def run():
+        client = _async_client(f"http://127.0.0.1:{port}", max_retries=2)
+        clients.append(client)
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await client.post(CHAT, json=BODY)
+        finally:
+            await client.aclose()
+        return client
+
+    client = asyncio.run(run())
+    assert seen == [(2, None), (2, None)]
+    assert client._slots._value == 2
+
+
+def test_async_stream_holds_slot_until_exit(stub):
+    url, config = stub(token_delay=0)
+
+    async def run():
+        client = _async_client(url)
+        try:
+            async with client.stream("POST", CHAT, json={**BODY, "stream": True}) as resp:
+                held = client._slots._value
+                lines = [line async for line in resp.aiter_lines() if line.startswith("data: ")]
+            return held, lines, client._slots._value
+        finally:
+            await client.aclose()
+
+    held, lines, after = asyncio.run(run())
+    assert held == 1 and after == 2
+    assert lines[-1] == "data: [DONE]"
+
+
+def test_async_bounds_concurrency(stub):
+    url, config = stub(latency=0.2)
+
+    async def run():
+        client = _async_client(url, max_concurrency=2)
+        try:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.post(CHAT, json=BODY) for _ in range(6)))
+            return responses, time.perf_counter() - start, client._slots._value
+        finally:
+            await client.aclose()
+
+    responses, elapsed, free = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 6
+    assert elapsed >= 0.6  # three waves of two
+    assert free == 2
+
+
+def test_async_queue_timeout_raises_busy(stub):
+    url, config = stub(latency=0.5)
+
+    async def run():
+        client = _async_client(url, max_concurrency=1, queue_timeout=0.05)
+        try:
+            first = asyncio.create_task(client.post(CHAT, json=BODY))
+            await asyncio.sleep(0.1)
+            with pytest.raises(UpstreamBusy):
+                await client.post(CHAT, json=BODY)
+            assert (await first).status_code == 200
+            return client._slots._value
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == 1
+
+
+def test_sync_releases_slot_during_backoff(stub, backoffs):
+    url, config = stub(fail_first=1, fail_status=429)
+    seen, clients = backoffs
+    client = UpstreamClient("stub", url, max_concurrency=2)
+    clients.append(client)
+    try:
+        resp = client.post(CHAT, json=BODY)
+    finally:
+        client.close()
+    assert resp.status_code == 200
+    assert config.calls["chat"] == 2
+    assert seen == [(2, "0")]
+    assert client._slots._value == 2